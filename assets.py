@@ -0,0 +1,190 @@
+"""
+Caché en memoria de archivos estáticos con variantes precomprimidas
+
+Al arrancar se leen todos los archivos de un directorio estático y se guardan
+en memoria junto con sus versiones gzip (y brotli, si está instalado). Cada
+archivo se sirve con un ETag fuerte derivado de su contenido, respondiendo
+304 cuando el navegador ya lo tiene. Las referencias a los archivos dentro
+de los HTML se reescriben a URLs con `?v=<hash>`, que se sirven como
+inmutables: al cambiar el archivo cambia la URL.
+
+Con HUB_DEV=1 el directorio se vuelve a revisar en cada petición para
+recoger los cambios sin reiniciar.
+"""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEV_MODE = os.environ.get("HUB_DEV") == "1"
+
+# Por debajo de este tamaño comprimir no compensa
+MIN_COMPRESS_SIZE = 256
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+CACHE_IMMUTABLE = "public, max-age=31536000, immutable"
+CACHE_REVALIDATE = "no-cache"
+
+
+class Asset:
+    """Un archivo en memoria con sus variantes comprimidas"""
+
+    __slots__ = ("name", "media_type", "body", "gzip", "br", "digest", "mtime")
+
+    def __init__(self, name: str, media_type: str, body: bytes, mtime: float = 0.0):
+        self.name = name
+        self.media_type = media_type
+        self.body = body
+        self.mtime = mtime
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.gzip: Optional[bytes] = None
+        self.br: Optional[bytes] = None
+        if len(body) >= MIN_COMPRESS_SIZE and media_type.startswith(COMPRESSIBLE_TYPES):
+            comprimido = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(comprimido) < len(body):
+                self.gzip = comprimido
+            if brotli is not None:
+                comprimido = brotli.compress(body, quality=11)
+                if len(comprimido) < len(body):
+                    self.br = comprimido
+
+
+def _accepted_encodings(header: str) -> Set[str]:
+    """Codificaciones aceptadas según Accept-Encoding (las de q=0 no cuentan)"""
+    aceptadas = set()
+    for parte in header.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        parametros = parametros.replace(" ", "")
+        if parametros in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if nombre:
+            aceptadas.add(nombre.lower())
+    return aceptadas
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(valor.strip().removeprefix("W/") == etag for valor in header.split(","))
+
+
+def asset_response(request: Request, asset: Asset, immutable: bool = False) -> Response:
+    """Respuesta para `asset`: comprimida si el cliente lo acepta y 304 si ya la tiene"""
+    aceptadas = _accepted_encodings(request.headers.get("accept-encoding", ""))
+    if asset.br is not None and "br" in aceptadas:
+        codificacion, cuerpo = "br", asset.br
+    elif asset.gzip is not None and "gzip" in aceptadas:
+        codificacion, cuerpo = "gzip", asset.gzip
+    else:
+        codificacion, cuerpo = None, asset.body
+
+    # Cada representación tiene su propio ETag fuerte
+    etag = f'"{asset.digest}-{codificacion}"' if codificacion else f'"{asset.digest}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CACHE_IMMUTABLE if immutable else CACHE_REVALIDATE,
+        "Vary": "Accept-Encoding",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if codificacion:
+        headers["Content-Encoding"] = codificacion
+    return Response(content=cuerpo, media_type=asset.media_type, headers=headers)
+
+
+class AssetCache:
+    """Archivos de `directory` servidos en memoria bajo `url_prefix`"""
+
+    def __init__(self, directory: Path, url_prefix: str, dev: Optional[bool] = None):
+        self.directory = Path(directory)
+        self.url_prefix = url_prefix.rstrip("/")
+        self.dev = DEV_MODE if dev is None else dev
+        self.assets: Dict[str, Asset] = {}
+        self._references = re.compile(re.escape(self.url_prefix) + r"/([\w./-]+)")
+        self.load()
+
+    def load(self):
+        """Leer todo el directorio; los HTML al final, para reescribirlos con los hashes ya calculados"""
+        # Se rellena en sitio: rewrite() usa los archivos ya cargados
+        self.assets = {}
+        if not self.directory.is_dir():
+            return
+        archivos = sorted(
+            (ruta for ruta in self.directory.rglob("*") if ruta.is_file()),
+            key=lambda ruta: ruta.suffix == ".html",
+        )
+        for ruta in archivos:
+            nombre = ruta.relative_to(self.directory).as_posix()
+            self.assets[nombre] = self._load_file(nombre, ruta)
+
+    def _load_file(self, name: str, path: Path) -> Asset:
+        media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+        body = path.read_bytes()
+        if path.suffix == ".html":
+            body = self.rewrite(body.decode("utf-8")).encode("utf-8")
+        return Asset(name, media_type, body, path.stat().st_mtime)
+
+    def _refresh(self):
+        """Modo desarrollo: recargar si algún archivo se ha añadido, borrado o modificado"""
+        actuales = {
+            ruta.relative_to(self.directory).as_posix(): ruta.stat().st_mtime
+            for ruta in self.directory.rglob("*") if ruta.is_file()
+        } if self.directory.is_dir() else {}
+        if actuales.keys() != self.assets.keys() or any(
+            self.assets[nombre].mtime != mtime for nombre, mtime in actuales.items()
+        ):
+            self.load()
+
+    def url(self, name: str) -> str:
+        """URL versionada de un archivo (la simple si no existe)"""
+        if self.dev:
+            self._refresh()
+        asset = self.assets.get(name)
+        if asset is None:
+            return f"{self.url_prefix}/{name}"
+        return f"{self.url_prefix}/{name}?v={asset.digest}"
+
+    def rewrite(self, text: str) -> str:
+        """Sustituir las referencias `<url_prefix>/<archivo>` por sus URLs versionadas"""
+        def versionar(coincidencia: re.Match) -> str:
+            asset = self.assets.get(coincidencia.group(1))
+            if asset is None:
+                return coincidencia.group(0)
+            return f"{self.url_prefix}/{asset.name}?v={asset.digest}"
+        return self._references.sub(versionar, text)
+
+    def get(self, name: str) -> Optional[Asset]:
+        if self.dev:
+            self._refresh()
+        return self.assets.get(name)
+
+    def response(self, request: Request, name: str) -> Optional[Response]:
+        """Respuesta para `name` (comprimida si el cliente lo acepta), o None si no existe"""
+        asset = self.get(name)
+        if asset is None:
+            return None
+        # Las URLs con el hash del contenido no cambian nunca de contenido
+        return asset_response(request, asset, immutable=request.query_params.get("v") == asset.digest)
+
+    def mount(self, app: FastAPI, path: str = "/static"):
+        """Registrar en `app` la ruta que sirve los archivos (sustituye a StaticFiles)"""
+        async def serve_asset(request: Request, name: str):
+            respuesta = self.response(request, name)
+            if respuesta is None:
+                return Response(status_code=404)
+            return respuesta
+
+        app.add_api_route(f"{path}/{{name:path}}", serve_asset, methods=["GET", "HEAD"], include_in_schema=False)
@@ -2,9 +2,11 @@
 Clase base para todos los juegos
 """
 from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 
+import metrics
+from assets import AssetCache
+
 class BaseGame:
     """Interfaz base que todos los juegos deben implementar"""
     
@@ -19,6 +21,11 @@ class BaseGame:
             description=self.description
         )
         
+        # Métricas comunes etiquetadas con el nombre del juego (se exportan en /metrics del hub).
+        # Cada juego informa de sus conexiones y salas con track_connections()/track_rooms()
+        # y usa message(), broadcast_latency y send_failure() desde sus manejadores.
+        self.metrics = metrics.for_game(self.name)
+        
         # Configurar rutas estáticas del juego
         self._setup_static_files()
         
@@ -26,10 +33,12 @@ class BaseGame:
         """Configurar archivos estáticos del juego"""
         game_dir = Path(__file__).parent / "games" / self.name
         
-        # Montar archivos estáticos si existen
+        # Servir archivos estáticos desde memoria si existen
         static_dir = game_dir / "static"
+        self.assets = None
         if static_dir.exists():
-            self.app.mount("/static", StaticFiles(directory=str(static_dir)), name=f"{self.name}_static")
+            self.assets = AssetCache(static_dir, f"/games/{self.name}/static")
+            self.assets.mount(self.app, "/static")
             
     def get_routes(self):
         """Obtener información de rutas del juego (para el hub)"""
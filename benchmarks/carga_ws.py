@@ -0,0 +1,409 @@
+"""
+Generador de carga WebSocket para el 3 en raya
+
+Simula jugadores reales contra /games/3-in-row/ws/{sala_id}/{jugador}: cada
+sala la crea un jugador y se une otro, juegan partidas completas con
+jugadas aleatorias (pero reproducibles con la semilla), piden revancha y,
+en paralelo, varios clientes consultan el lobby. Con --emparejamiento los
+dos jugadores piden `buscar_partida` en lugar de crear y unirse a una sala. Al final informa del
+rendimiento (jugadas por segundo), la latencia de ida y vuelta de cada
+jugada (p50/p90/p99) y la memoria del servidor por sala, y guarda todo en
+un JSON para comparar entre commits.
+
+Sin --url arranca el hub en un subproceso en localhost (así se puede medir
+su memoria); con --url ataca a un servidor ya en marcha.
+
+Uso:
+    python benchmarks/carga_ws.py --escenario estandar
+    python benchmarks/carga_ws.py --salas 2000 --partidas 3 --semilla 7 --salida resultado.json
+    python benchmarks/carga_ws.py --escenario estandar --emparejamiento
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import websockets
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+# Escenarios predefinidos: mismos parámetros (y semilla) => misma carga
+ESCENARIOS = {
+    "humo": {"salas": 10, "partidas": 2, "lobby": 2, "concurrencia": 20},
+    "estandar": {"salas": 500, "partidas": 3, "lobby": 20, "concurrencia": 200},
+    "estres": {"salas": 2500, "partidas": 3, "lobby": 50, "concurrencia": 400},
+}
+
+
+def percentiles(valores: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p90/p99/máximo en milisegundos"""
+    if not valores:
+        return {"p50": None, "p90": None, "p99": None, "max": None, "n": 0}
+    ordenados = sorted(valores)
+
+    def p(q: float) -> float:
+        return round(ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))] * 1000, 3)
+
+    return {"p50": p(0.50), "p90": p(0.90), "p99": p(0.99), "max": round(ordenados[-1] * 1000, 3), "n": len(ordenados)}
+
+
+def rss_bytes(pid: int) -> Optional[int]:
+    """Memoria residente de un proceso (solo Linux)"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) * 1024
+    except OSError:
+        return None
+    return None
+
+
+def commit_actual() -> Optional[str]:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def subir_limite_descriptores():
+    """Cada jugador es un socket: subir el límite de ficheros abiertos al máximo permitido"""
+    blando, duro = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if blando < duro:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (duro, duro))
+
+
+class Servidor:
+    """Hub en un subproceso de uvicorn en un puerto libre de localhost"""
+
+    def __init__(self, env: Dict[str, str]):
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            self.puerto = s.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.puerto}"
+        self.proceso = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(self.puerto), "--log-level", "warning"],
+            cwd=RAIZ,
+            env={**os.environ, "HUB_LOG_LEVEL": "WARNING", **env},
+        )
+
+    def esperar_listo(self, timeout: float = 30.0):
+        limite = time.time() + timeout
+        while time.time() < limite:
+            try:
+                urllib.request.urlopen(f"{self.url}/games/3-in-row/salas", timeout=1).read()
+                return
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("El servidor no arrancó a tiempo")
+
+    def detener(self):
+        self.proceso.terminate()
+        try:
+            self.proceso.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.proceso.kill()
+
+
+class Resultados:
+    def __init__(self):
+        self.latencias_jugada: List[float] = []
+        self.latencias_lobby: List[float] = []
+        self.latencias_union: List[float] = []
+        self.jugadas = 0
+        self.partidas = 0
+        self.reinicios = 0
+        self.mensajes_recibidos = 0
+        self.errores: Dict[str, int] = {}
+
+    def error(self, motivo: str):
+        self.errores[motivo] = self.errores.get(motivo, 0) + 1
+
+
+class Jugador:
+    """Un WebSocket con una tarea lectora que deja los mensajes en una cola"""
+
+    def __init__(self, nombre: str, ws, resultados: Resultados):
+        self.nombre = nombre
+        self.ws = ws
+        self.resultados = resultados
+        self.cola: asyncio.Queue = asyncio.Queue()
+        self.lector = asyncio.create_task(self._leer())
+
+    async def _leer(self):
+        try:
+            async for texto in self.ws:
+                self.resultados.mensajes_recibidos += 1
+                self.cola.put_nowait(json.loads(texto))
+        except websockets.ConnectionClosed:
+            pass
+        self.cola.put_nowait({"tipo": "_cerrada"})
+
+    async def enviar(self, mensaje: Dict):
+        await self.ws.send(json.dumps(mensaje))
+
+    async def esperar(self, tipo: str, timeout: float) -> Dict:
+        """Siguiente mensaje de `tipo`, descartando los demás"""
+        while True:
+            mensaje = await asyncio.wait_for(self.cola.get(), timeout)
+            if mensaje["tipo"] == tipo:
+                return mensaje
+            if mensaje["tipo"] in ("error", "_cerrada"):
+                raise RuntimeError(f"{mensaje['tipo']} esperando {tipo}: {mensaje.get('mensaje', '')}")
+
+    async def cerrar(self):
+        await self.ws.close()
+        self.lector.cancel()
+
+
+async def conectar(url_ws: str, sala_id: str, nombre: str, resultados: Resultados) -> Jugador:
+    ws = await websockets.connect(f"{url_ws}/{sala_id}/{nombre}", max_size=None, open_timeout=60, ping_interval=None)
+    return Jugador(nombre, ws, resultados)
+
+
+async def preparar_sala(indice: int, args, url_ws: str, resultados: Resultados, semaforo: asyncio.Semaphore):
+    """Crear la sala y unir al segundo jugador; devuelve los jugadores y el estado inicial"""
+    async with semaforo:
+        creador = await conectar(url_ws, "temp", f"c{indice}", resultados)
+        await creador.enviar({"tipo": "crear_sala", "clave": "k", "jugador": creador.nombre, "variante": args.variante})
+        sala_id = (await creador.esperar("sala_creada", args.timeout))["sala_id"]
+
+        rival = await conectar(url_ws, sala_id, f"r{indice}", resultados)
+        inicio = time.perf_counter()
+        await rival.enviar({"tipo": "unir_sala", "clave": "k", "jugador": rival.nombre})
+        sala = (await rival.esperar("unido_exitoso", args.timeout))["sala"]
+        await creador.esperar("estado_actualizado", args.timeout)
+        resultados.latencias_union.append(time.perf_counter() - inicio)
+        return creador, rival, sala
+
+
+async def buscar_partida(indice: int, args, url_ws: str, resultados: Resultados, semaforo: asyncio.Semaphore):
+    """Un jugador que pide `buscar_partida`; devuelve el jugador y la sala en la que le emparejan"""
+    async with semaforo:
+        jugador = await conectar(url_ws, "temp", f"j{indice}", resultados)
+    inicio = time.perf_counter()
+    await jugador.enviar({"tipo": "buscar_partida", "variante": args.variante})
+    sala = (await jugador.esperar("partida_encontrada", args.timeout))["sala"]
+    resultados.latencias_union.append(time.perf_counter() - inicio)
+    return jugador, sala
+
+
+async def emparejar_salas(args, url_ws: str, resultados: Resultados, semaforo: asyncio.Semaphore):
+    """Lanzar dos jugadores por sala a buscar partida y agruparlos por la sala que les toca.
+
+    Cualquiera puede emparejarse con cualquiera, así que el primer jugador de
+    la sala hace de creador.
+    """
+    buscados = await asyncio.gather(
+        *(buscar_partida(i, args, url_ws, resultados, semaforo) for i in range(args.salas * 2)),
+        return_exceptions=True,
+    )
+    por_sala: Dict[str, Dict[str, object]] = {}
+    for buscado in buscados:
+        if isinstance(buscado, BaseException):
+            resultados.error(f"emparejar {type(buscado).__name__}")
+            continue
+        jugador, sala = buscado
+        por_sala.setdefault(sala["id"], {"sala": sala})[jugador.nombre] = jugador
+    salas = []
+    for grupo in por_sala.values():
+        sala = grupo["sala"]
+        if all(nombre in grupo for nombre in sala["jugadores"]):
+            salas.append((grupo[sala["jugadores"][0]], grupo[sala["jugadores"][1]], sala))
+    return salas
+
+
+async def jugar_sala(indice: int, creador: Jugador, rival: Jugador, sala: Dict, args, resultados: Resultados):
+    """Partidas completas con jugadas aleatorias reproducibles y revancha entre partidas"""
+    rng = random.Random(f"{args.semilla}-{indice}")
+    jugadores = {creador.nombre: creador, rival.nombre: rival}
+    try:
+        for partida in range(args.partidas):
+            tablero = list(sala["tablero"])
+            por_simbolo = {simbolo: jugadores[nombre] for nombre, simbolo in sala["simbolos"].items()}
+            turno, estado = sala["turno"], sala["estado"]
+
+            while estado == "jugando":
+                mueve = por_simbolo[turno]
+                espera = rival if mueve is creador else creador
+                posicion = rng.choice([i for i, casilla in enumerate(tablero) if not casilla])
+
+                inicio = time.perf_counter()
+                await mueve.enviar({"tipo": "movimiento", "posicion": posicion})
+                delta = await mueve.esperar("delta", args.timeout)
+                resultados.latencias_jugada.append(time.perf_counter() - inicio)
+                await espera.esperar("delta", args.timeout)
+
+                resultados.jugadas += 1
+                tablero[delta["posicion"]] = delta["simbolo"]
+                turno, estado = delta["turno"], delta["estado"]
+            resultados.partidas += 1
+
+            if partida + 1 < args.partidas:
+                await creador.enviar({"tipo": "solicitar_reinicio"})
+                await creador.esperar("reinicio_pendiente", args.timeout)
+                await rival.esperar("reinicio_pendiente", args.timeout)
+                await rival.enviar({"tipo": "solicitar_reinicio"})
+                sala = (await creador.esperar("partida_reiniciada", args.timeout))["sala"]
+                await rival.esperar("partida_reiniciada", args.timeout)
+                resultados.reinicios += 1
+    except (RuntimeError, asyncio.TimeoutError, websockets.ConnectionClosed) as e:
+        resultados.error(type(e).__name__ if not isinstance(e, RuntimeError) else str(e).split(":")[0])
+
+
+async def consultar_lobby(indice: int, args, url_ws: str, resultados: Resultados, parar: asyncio.Event):
+    """Un cliente que pide el listado de salas cada `intervalo_lobby` segundos (con desfase aleatorio)"""
+    rng = random.Random(f"{args.semilla}-lobby-{indice}")
+    cliente = await conectar(url_ws, "lista", "salas", resultados)
+    try:
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            await cliente.enviar({"tipo": "obtener_salas"})
+            await cliente.esperar("lista_salas", args.timeout)
+            resultados.latencias_lobby.append(time.perf_counter() - inicio)
+            try:
+                await asyncio.wait_for(parar.wait(), args.intervalo_lobby * rng.uniform(0.5, 1.5))
+            except asyncio.TimeoutError:
+                pass
+    except (RuntimeError, asyncio.TimeoutError, websockets.ConnectionClosed) as e:
+        resultados.error(f"lobby {type(e).__name__}")
+    finally:
+        await cliente.cerrar()
+
+
+async def ejecutar(args, url: str, pid_servidor: Optional[int]) -> Dict:
+    url_ws = url.replace("http", "ws", 1) + "/games/3-in-row/ws"
+    resultados = Resultados()
+    semaforo = asyncio.Semaphore(args.concurrencia)
+
+    rss_base = rss_bytes(pid_servidor) if pid_servidor else None
+
+    # Fase 1: crear y llenar todas las salas
+    inicio_preparacion = time.perf_counter()
+    if args.emparejamiento:
+        salas = await emparejar_salas(args, url_ws, resultados, semaforo)
+    else:
+        preparadas = await asyncio.gather(
+            *(preparar_sala(i, args, url_ws, resultados, semaforo) for i in range(args.salas)),
+            return_exceptions=True,
+        )
+        salas = [sala for sala in preparadas if not isinstance(sala, BaseException)]
+        for fallo in preparadas:
+            if isinstance(fallo, BaseException):
+                resultados.error(f"preparar {type(fallo).__name__}")
+    duracion_preparacion = time.perf_counter() - inicio_preparacion
+    rss_salas = rss_bytes(pid_servidor) if pid_servidor else None
+
+    # Fase 2: todas las salas juegan a la vez mientras se consulta el lobby
+    parar = asyncio.Event()
+    consultas = [asyncio.create_task(consultar_lobby(i, args, url_ws, resultados, parar)) for i in range(args.lobby)]
+    inicio_juego = time.perf_counter()
+    await asyncio.gather(*(jugar_sala(i, *sala, args, resultados) for i, sala in enumerate(salas)))
+    duracion_juego = time.perf_counter() - inicio_juego
+    rss_pico = rss_bytes(pid_servidor) if pid_servidor else None
+    parar.set()
+    await asyncio.gather(*consultas)
+
+    for creador, rival, _ in salas:
+        await creador.cerrar()
+        await rival.cerrar()
+
+    bytes_por_sala = None
+    if rss_base is not None and rss_salas is not None and salas:
+        bytes_por_sala = round((rss_salas - rss_base) / len(salas))
+
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit_actual(),
+        "parametros": {
+            "escenario": args.escenario,
+            "salas": args.salas,
+            "jugadores": args.salas * 2,
+            "partidas": args.partidas,
+            "lobby": args.lobby,
+            "variante": args.variante,
+            "emparejamiento": args.emparejamiento,
+            "semilla": args.semilla,
+            "concurrencia": args.concurrencia,
+            "url": args.url,
+        },
+        "salas_preparadas": len(salas),
+        "preparacion_s": round(duracion_preparacion, 3),
+        "juego_s": round(duracion_juego, 3),
+        "jugadas": resultados.jugadas,
+        "jugadas_por_s": round(resultados.jugadas / duracion_juego, 1) if duracion_juego else None,
+        "partidas": resultados.partidas,
+        "reinicios": resultados.reinicios,
+        "mensajes_recibidos": resultados.mensajes_recibidos,
+        "latencia_jugada_ms": percentiles(resultados.latencias_jugada),
+        "latencia_union_ms": percentiles(resultados.latencias_union),
+        "latencia_lobby_ms": percentiles(resultados.latencias_lobby),
+        # Incluye las dos conexiones de cada sala, no solo su estado
+        "memoria": {
+            "rss_base_mb": None if rss_base is None else round(rss_base / 2**20, 1),
+            "rss_salas_mb": None if rss_salas is None else round(rss_salas / 2**20, 1),
+            "rss_pico_mb": None if rss_pico is None else round(rss_pico / 2**20, 1),
+            "bytes_por_sala": bytes_por_sala,
+        },
+        "errores": resultados.errores,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escenario", choices=ESCENARIOS, default="humo")
+    parser.add_argument("--salas", type=int, help="salas simultáneas (dos jugadores por sala)")
+    parser.add_argument("--partidas", type=int, help="partidas por sala")
+    parser.add_argument("--lobby", type=int, help="clientes consultando el lobby")
+    parser.add_argument("--concurrencia", type=int, help="salas preparándose a la vez")
+    parser.add_argument("--intervalo-lobby", type=float, default=1.0)
+    parser.add_argument("--variante", default="3-en-raya")
+    parser.add_argument("--emparejamiento", action="store_true", help="emparejar con buscar_partida en lugar de crear salas")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--url", help="servidor ya arrancado (p. ej. http://127.0.0.1:8000)")
+    parser.add_argument("--salida", help="fichero JSON de resultados (por defecto benchmarks/resultados/...)")
+    parser.add_argument("--env", action="append", default=[], metavar="CLAVE=VALOR",
+                        help="variables de entorno para el servidor arrancado por el benchmark")
+    args = parser.parse_args()
+
+    for clave, valor in ESCENARIOS[args.escenario].items():
+        if getattr(args, clave) is None:
+            setattr(args, clave, valor)
+
+    subir_limite_descriptores()
+    servidor = None
+    if args.url is None:
+        servidor = Servidor(dict(par.split("=", 1) for par in args.env))
+        servidor.esperar_listo()
+    try:
+        resultado = asyncio.run(ejecutar(args, args.url or servidor.url, servidor.proceso.pid if servidor else None))
+    finally:
+        if servidor:
+            servidor.detener()
+
+    salida = Path(args.salida) if args.salida else (
+        RAIZ / "benchmarks" / "resultados" / f"carga_ws-{args.escenario}-{resultado['commit'] or 'local'}.json"
+    )
+    salida.parent.mkdir(parents=True, exist_ok=True)
+    salida.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+    latencia = resultado["latencia_jugada_ms"]
+    print(f"\n{resultado['salas_preparadas']} salas, {resultado['jugadas']} jugadas en {resultado['juego_s']} s "
+          f"→ {resultado['jugadas_por_s']} jugadas/s")
+    print(f"latencia jugada: p50 {latencia['p50']} ms, p99 {latencia['p99']} ms, máx {latencia['max']} ms")
+    print(f"memoria por sala: {resultado['memoria']['bytes_por_sala']} bytes   errores: {resultado['errores'] or 'ninguno'}")
+    print(f"resultados en {salida}")
+
+
+if __name__ == "__main__":
+    main()
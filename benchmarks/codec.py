@@ -0,0 +1,80 @@
+"""
+Microbenchmark de los codecs JSON con los mensajes reales del 3 en raya
+
+Uso: python benchmarks/codec.py [--repeticiones N]
+"""
+import argparse
+import importlib
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+juego = importlib.import_module("games.3-in-row")
+codec = importlib.import_module("games.3-in-row.codec")
+
+
+def preparar_mensajes():
+    """Construir una sala en juego y los mensajes que se envían sobre ella"""
+    manager = juego.SalaManager()
+    sala_id = manager.crear_sala("clave", "ana")
+    manager.unir_sala(sala_id, "clave", "beto")
+    sala = manager.obtener_info_sala(sala_id)
+    turno = {simbolo: jugador for jugador, simbolo in sala.simbolos.items()}
+    for posicion in (0, 4, 8):
+        manager.hacer_movimiento(sala_id, posicion, turno[sala.turno])
+
+    for i in range(50):
+        manager.crear_sala("clave", f"jugador-{i}")
+    salas, _ = manager.obtener_salas_publicas()
+
+    return manager, sala_id, {
+        "actualizar_tablero": {
+            "tipo": "actualizar_tablero",
+            "tablero": sala.tablero.a_lista(),
+            "turno": sala.turno,
+            "estado": sala.estado,
+            "ganador": sala.ganador,
+            "marcador": sala.marcador,
+            "partidas_jugadas": sala.partidas_jugadas,
+        },
+        "estado_actualizado": {"tipo": "estado_actualizado", "sala": juego.sala_a_json(sala)},
+        "lista_salas": {"tipo": "lista_salas", "salas": salas, "siguiente_cursor": None},
+    }
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Microsegundos por llamada (mejor de 5 rondas)"""
+    return min(timeit.repeat(funcion, number=repeticiones, repeat=5)) / repeticiones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeticiones", type=int, default=20000)
+    args = parser.parse_args()
+
+    manager, sala_id, mensajes = preparar_mensajes()
+    print(f"\nCodec activo: {codec.NOMBRE}  (disponibles: {', '.join(codec.CODECS)})\n")
+    print(f"{'mensaje':<24}{'bytes':>8}" + "".join(f"{nombre + ' µs':>14}" for nombre in codec.CODECS))
+
+    for tipo, mensaje in mensajes.items():
+        tamano = len(codec.dumps(mensaje).encode())
+        tiempos = [medir(lambda d=dumps: d(mensaje), args.repeticiones) for dumps, _ in codec.CODECS.values()]
+        print(f"{tipo:<24}{tamano:>8}" + "".join(f"{t:>14.2f}" for t in tiempos))
+
+    # Sala cacheada por versión: solo se codifica el envoltorio del mensaje
+    manager.sala_codificada(sala_id)
+    cacheado = medir(
+        lambda: codec.componer({"tipo": "estado_actualizado"}, sala=manager.sala_codificada(sala_id)),
+        args.repeticiones,
+    )
+    print(f"\nestado_actualizado con sala cacheada ({codec.NOMBRE}): {cacheado:.2f} µs")
+
+    texto = codec.dumps(mensajes["estado_actualizado"])
+    for nombre, (_, loads) in codec.CODECS.items():
+        print(f"loads estado_actualizado ({nombre}): {medir(lambda l=loads: l(texto), args.repeticiones):.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
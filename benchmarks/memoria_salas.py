@@ -0,0 +1,103 @@
+"""
+Memoria por sala: dict anidado (formato anterior) frente a `Sala` con __slots__
+
+Crea N salas en espera con cada representación y mide con tracemalloc los
+bytes que retienen. Con --manager mide también las salas creadas a través
+de `SalaManager` con el almacén en memoria (incluye los índices del lobby y
+la rueda de expiración).
+
+Uso: python benchmarks/memoria_salas.py [--salas N] [--manager]
+"""
+import argparse
+import gc
+import importlib
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+juego = importlib.import_module("games.3-in-row")
+sala_mod = importlib.import_module("games.3-in-row.sala")
+tablero_mod = importlib.import_module("games.3-in-row.tablero")
+almacen_mod = importlib.import_module("games.3-in-row.almacen")
+
+
+def sala_dict(i: int) -> dict:
+    """Sala en espera con la forma que tenía antes en `SalaManager.salas`"""
+    creador = f"jugador-{i}"
+    return {
+        "id": str(uuid.uuid4())[:8],
+        "clave": f"clave-{i}",
+        "jugadores": [creador],
+        "simbolos": {creador: "X"},
+        "variante": "3-en-raya",
+        "tablero": tablero_mod.crear_tablero("3-en-raya"),
+        "turno": "X",
+        "estado": "esperando",
+        "ganador": None,
+        "creador": creador,
+        "timestamp": time.time(),
+        "reinicio_pendiente": [],
+        "marcador": {creador: 0},
+        "partidas_jugadas": 0,
+        "version": 1,
+        "ultima_jugada": None
+    }
+
+
+def sala_slots(i: int):
+    return sala_mod.Sala(sala_mod.nuevo_id_sala(), f"clave-{i}", f"jugador-{i}")
+
+
+def medir(crear, n: int) -> float:
+    """Bytes retenidos por sala (incluye el id, la clave y el nombre del creador)"""
+    gc.collect()
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    salas = {}
+    for i in range(n):
+        sala = crear(i)
+        salas[i] = sala
+    gc.collect()
+    usado = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    del salas
+    return usado / n
+
+
+def medir_manager(n: int) -> float:
+    manager = juego.SalaManager(almacen=almacen_mod.AlmacenMemoria())
+    gc.collect()
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    for i in range(n):
+        manager.crear_sala(f"clave-{i}", f"jugador-{i}")
+    gc.collect()
+    usado = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    return usado / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--salas", type=int, default=100_000)
+    parser.add_argument("--manager", action="store_true", help="medir también SalaManager con AlmacenMemoria")
+    args = parser.parse_args()
+
+    antes = medir(sala_dict, args.salas)
+    despues = medir(sala_slots, args.salas)
+    print(f"\n{args.salas} salas en espera")
+    print(f"{'representación':<28}{'bytes/sala':>12}{'MB total':>12}")
+    for nombre, por_sala in (("dict anidado (anterior)", antes), ("Sala con __slots__", despues)):
+        print(f"{nombre:<28}{por_sala:>12.0f}{por_sala * args.salas / 2**20:>12.1f}")
+    print(f"\nAhorro: {antes - despues:.0f} bytes/sala ({(1 - despues / antes) * 100:.0f}%)")
+
+    if args.manager:
+        print(f"SalaManager + AlmacenMemoria (con índices): {medir_manager(args.salas):.0f} bytes/sala")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Motor de tableros N×M con reglas de k en raya (gomoku, conecta 4, ...)
+
+La detección de victoria solo recorre las líneas que pasan por la última
+jugada, así que el coste por movimiento es O(k) sea cual sea el tamaño del
+tablero. Para evaluar muchos tableros a la vez (bots, autojuego, análisis)
+`ganadores_lote` ofrece un modo vectorizado con NumPy, que es opcional.
+"""
+from typing import Dict, Iterable, List, Optional
+
+try:
+    import numpy as np
+except ImportError:  # NumPy solo es necesario para el modo por lotes
+    np = None
+
+VACIA = 0
+SIMBOLOS = ("", "X", "O")
+CODIGOS = {"X": 1, "O": 2}
+
+# Direcciones (fila, columna) de las cuatro líneas que pasan por una casilla
+DIRECCIONES = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+
+class Variante:
+    """Reglas de un juego de k en raya"""
+
+    __slots__ = ("nombre", "filas", "columnas", "en_raya", "gravedad")
+
+    def __init__(self, nombre: str, filas: int, columnas: int, en_raya: int, gravedad: bool = False):
+        if en_raya > max(filas, columnas):
+            raise ValueError(f"No caben {en_raya} en raya en un tablero {filas}x{columnas}")
+        self.nombre = nombre
+        self.filas = filas
+        self.columnas = columnas
+        self.en_raya = en_raya
+        self.gravedad = gravedad
+
+    @property
+    def casillas(self) -> int:
+        return self.filas * self.columnas
+
+
+VARIANTES: Dict[str, Variante] = {
+    v.nombre: v for v in (
+        Variante("3-en-raya", 3, 3, 3),
+        Variante("gomoku", 15, 15, 5),
+        Variante("conecta-4", 6, 7, 4, gravedad=True),
+    )
+}
+
+
+class TableroK:
+    """Tablero N×M genérico. Las casillas se numeran por filas: fila * columnas + columna"""
+
+    __slots__ = ("variante", "celdas", "ocupadas", "_alturas")
+
+    def __init__(self, variante: Variante):
+        self.variante = variante
+        self.celdas = bytearray(variante.casillas)
+        self.ocupadas = 0
+        # Con gravedad: primera fila libre (desde abajo) de cada columna
+        self._alturas = [variante.filas - 1] * variante.columnas if variante.gravedad else None
+
+    @property
+    def filas(self) -> int:
+        return self.variante.filas
+
+    @property
+    def columnas(self) -> int:
+        return self.variante.columnas
+
+    @property
+    def gravedad(self) -> bool:
+        return self.variante.gravedad
+
+    def ocupada(self, posicion: int) -> bool:
+        return self.celdas[posicion] != VACIA
+
+    def resolver(self, posicion: int) -> Optional[int]:
+        """Casilla donde acaba una jugada en `posicion`, o None si no es válida.
+
+        Con gravedad la ficha cae a la fila libre más baja de su columna.
+        """
+        if not isinstance(posicion, int) or not 0 <= posicion < len(self.celdas):
+            return None
+        if self._alturas is not None:
+            columna = posicion % self.columnas
+            fila = self._alturas[columna]
+            return fila * self.columnas + columna if fila >= 0 else None
+        return None if self.celdas[posicion] else posicion
+
+    def colocar(self, posicion: int, simbolo: str):
+        self.celdas[posicion] = CODIGOS[simbolo]
+        self.ocupadas += 1
+        if self._alturas is not None:
+            self._alturas[posicion % self.columnas] -= 1
+
+    def gana_con(self, posicion: int, simbolo: str) -> bool:
+        """Comprobar si la jugada en `posicion` completa k en raya de `simbolo`"""
+        codigo = CODIGOS[simbolo]
+        celdas, filas, columnas = self.celdas, self.filas, self.columnas
+        fila, columna = divmod(posicion, columnas)
+
+        for df, dc in DIRECCIONES:
+            seguidas = 1
+            for sentido in (1, -1):
+                f, c = fila + df * sentido, columna + dc * sentido
+                while 0 <= f < filas and 0 <= c < columnas and celdas[f * columnas + c] == codigo:
+                    seguidas += 1
+                    f += df * sentido
+                    c += dc * sentido
+            if seguidas >= self.variante.en_raya:
+                return True
+        return False
+
+    def lleno(self) -> bool:
+        return self.ocupadas == len(self.celdas)
+
+    def libres(self) -> Iterable[int]:
+        if self._alturas is not None:
+            return [f * self.columnas + c for c, f in enumerate(self._alturas) if f >= 0]
+        return [i for i, celda in enumerate(self.celdas) if celda == VACIA]
+
+    def copia(self) -> "TableroK":
+        otro = TableroK.__new__(TableroK)
+        otro.variante = self.variante
+        otro.celdas = bytearray(self.celdas)
+        otro.ocupadas = self.ocupadas
+        otro._alturas = list(self._alturas) if self._alturas is not None else None
+        return otro
+
+    def a_lista(self) -> List[str]:
+        return [SIMBOLOS[celda] for celda in self.celdas]
+
+
+def apilar(tableros: Iterable[TableroK]):
+    """Convertir tableros de la misma variante en un array (B, filas, columnas) de int8"""
+    _requiere_numpy()
+    tableros = list(tableros)
+    if not tableros:
+        raise ValueError("No hay tableros que apilar")
+    variante = tableros[0].variante
+    datos = b"".join(bytes(t.celdas) for t in tableros)
+    return np.frombuffer(datos, dtype=np.int8).reshape(len(tableros), variante.filas, variante.columnas)
+
+
+def ganadores_lote(tableros, en_raya: int):
+    """Ganador de cada tablero de un lote (B, filas, columnas): 0 ninguno, 1 X, 2 O.
+
+    Cada dirección se evalúa con k desplazamientos del lote completo, sin bucles
+    en Python por tablero ni por casilla.
+    """
+    _requiere_numpy()
+    tableros = np.asarray(tableros)
+    _, filas, columnas = tableros.shape
+    resultado = np.zeros(len(tableros), dtype=np.int8)
+
+    # Se evalúa O primero para que X prevalezca en tableros inválidos con ambos ganadores
+    for codigo in (2, 1):
+        fichas = tableros == codigo
+        gana = np.zeros(len(tableros), dtype=bool)
+        for df, dc in DIRECCIONES:
+            alto = filas - (en_raya - 1) * df
+            ancho = columnas - (en_raya - 1) * abs(dc)
+            if alto <= 0 or ancho <= 0:
+                continue
+            c0 = en_raya - 1 if dc < 0 else 0
+            linea = np.ones((len(tableros), alto, ancho), dtype=bool)
+            for i in range(en_raya):
+                f, c = i * df, c0 + i * dc
+                linea &= fichas[:, f:f + alto, c:c + ancho]
+            gana |= linea.any(axis=(1, 2))
+        resultado[gana] = codigo
+    return resultado
+
+
+def _requiere_numpy():
+    if np is None:
+        raise RuntimeError("El modo por lotes requiere numpy (pip install numpy)")
@@ -2,19 +2,40 @@
 Adaptador completo para el juego 3 en Raya (3-in-row)
 """
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
-from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, FileResponse, RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from pathlib import Path
-import json
-import uuid
 import time
+import hashlib
+import secrets
 import random
-from typing import Dict, List
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple, Union
 import sys
 import os
+import asyncio
+
+from . import codec
+from .difusion import Conexion
+from .almacen import AlmacenMemoria, AlmacenSalas, crear_almacen
+from .bus import crear_bus
+from .metricas import metricas
+from .lobby import DifusorLobby
+from .espectadores import FUSION_ESPECTADOR, DifusorEspectadores
+from .actores import Actores
+from .emparejamiento import ColaEmparejamiento, Espera
+from . import bot
+from .sala import Sala, nuevo_id_sala, nuevo_token
+from .tablero import crear_tablero
+from board_engine import VARIANTES
+from assets import AssetCache
+from hub_logging import get_logger
+from monitor import profiler
+import leaderboard
 
 # --- CONFIGURACIÓN BÁSICA ---
+log = get_logger("3-in-row")
+
 app = FastAPI(
     title="3 en Raya Online",
     description="Juego clásico de 3 en raya para dos jugadores",
@@ -37,220 +58,941 @@ TEMPLATES_DIR.mkdir(exist_ok=True)
 # Configurar templates
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
-# Montar archivos estáticos
-app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
+# Archivos estáticos en memoria, comprimidos y con URLs versionadas
+assets = AssetCache(STATIC_DIR, "/games/3-in-row/static")
+assets.mount(app, "/static")
 
 # --- LÓGICA COMPLETA DEL JUEGO ---
-conexiones: Dict[str, WebSocket] = {}
+conexiones: Dict[str, Conexion] = {}
 jugador_sala: Dict[str, str] = {}
 
+# Segundos que una sala en espera permanece visible en el lobby
+LOBBY_TTL = 600
+# Tamaño de página por defecto y máximo del listado de salas
+LOBBY_LIMITE_POR_DEFECTO = 50
+LOBBY_LIMITE_MAXIMO = 200
+# Segundos máximos que se reutiliza una instantánea de GET /salas aunque el lobby no cambie
+# (las salas más antiguas que LOBBY_TTL dejan de listarse sin que haya ningún cambio)
+LOBBY_CACHE_TTL = 1.0
+# Tema del bus por el que los workers se reenvían los cambios del lobby
+TEMA_LOBBY = "lobby"
+# Tema del bus por el que el worker que expira una sala avisa a los demás
+# (solo uno gana el borrado en SQLite; los otros también tienen jugadores de esa sala)
+TEMA_EXPIRADAS = "salas_expiradas"
+
+# Segundos de inactividad tras los que se libera una sala, según su estado.
+# Se pueden ajustar con TRES_EN_RAYA_TTL_<ESTADO> (p. ej. TRES_EN_RAYA_TTL_JUGANDO=900)
+TTL_POR_ESTADO = {
+    estado: float(os.environ.get(f"TRES_EN_RAYA_TTL_{estado.upper()}", ttl))
+    for estado, ttl in {
+        "esperando": 900,
+        "jugando": 1800,
+        "terminado": 600,
+    }.items()
+}
+# Intervalo (segundos) entre pasadas del limpiador de salas
+INTERVALO_LIMPIEZA = 1.0
+
+# Segundos que se guarda el puesto de un jugador desconectado para que pueda reanudar
+# con su token (0 = sale de la sala en cuanto se desconecta)
+GRACIA_RECONEXION = float(os.environ.get("TRES_EN_RAYA_GRACIA", "30"))
+# Últimas difusiones de cada sala que se guardan para reenviar a quien reanuda
+HISTORIAL_DIFUSIONES = 32
+
+# Nombres de la ruta del WebSocket que no son jugadores (lobby, espectadores, conexión previa)
+NOMBRES_RESERVADOS = ("temp", "salas", "espectador")
+
 class SalaManager:
-    def __init__(self):
-        self.salas: Dict[str, Dict] = {}
+    def __init__(self, ttl_por_estado: Optional[Dict[str, float]] = None,
+                 almacen: Optional[AlmacenSalas] = None):
+        # Estado de las salas: en memoria o compartido entre workers (ver almacen.py)
+        self.almacen = almacen if almacen is not None else crear_almacen(resolucion=INTERVALO_LIMPIEZA)
+        # Expiración de salas inactivas
+        self.ttl_por_estado = {**TTL_POR_ESTADO, **(ttl_por_estado or {})}
+        self.total_expiradas = 0
+        # Sala proyectada y codificada para la web, por versión: sala_id -> (versión, texto)
+        self._codificadas: Dict[str, Tuple[int, str]] = {}
+        # Últimos mensajes difundidos en cada sala con la versión que producen (para reanudar)
+        self._historial: Dict[str, Deque[Tuple[int, str]]] = {}
+        # Aviso de salas que aparecen (resumen) o desaparecen (None) del lobby
+        self.al_cambiar_lobby: Optional[Callable[[str, Optional[Dict]], None]] = None
+        # Aviso de partidas terminadas (victoria o empate)
+        self.al_terminar_partida: Optional[Callable[[Sala], None]] = None
     
-    def crear_sala(self, clave: str, creador: str) -> str:
-        sala_id = str(uuid.uuid4())[:8]
-        self.salas[sala_id] = {
-            "id": sala_id,
-            "clave": clave,
-            "jugadores": [creador],
-            "simbolos": {creador: "X"},
-            "tablero": [""] * 9,
-            "turno": "X",
-            "estado": "esperando",
-            "ganador": None,
-            "creador": creador,
-            "timestamp": time.time(),
-            "reinicio_pendiente": [],
-            "marcador": {creador: 0},
-            "partidas_jugadas": 0
-        }
-        print(f"✓ Sala creada: {sala_id} por {creador}")
+    def crear_sala(self, clave: str, creador: str, variante: str = "3-en-raya",
+                   dificultad_bot: Optional[str] = None) -> str:
+        """Crear una sala; con `dificultad_bot` el rival es la máquina y la partida empieza ya"""
+        with self.almacen.bloqueo():
+            sala_id = nuevo_id_sala()
+            while self.almacen.existe(sala_id):
+                sala_id = nuevo_id_sala()
+            sala = Sala(sala_id, clave, creador, variante)
+            if dificultad_bot is not None:
+                sala.bot = dificultad_bot
+                sala.agregar_jugador(bot.NOMBRE_BOT, "O")
+                sala.turno = random.choice(["X", "O"])
+                sala.estado = "jugando"
+            self.almacen.insertar(sala, self._vencimiento(sala), self._es_publica(sala))
+        self._avisar_lobby(sala)
+        log.info("✓ Sala creada por %s", creador, extra={"sala_id": sala_id, "jugador": creador})
         return sala_id
     
+    def crear_partida(self, jugador_a: str, jugador_b: str, variante: str = "3-en-raya") -> Sala:
+        """Sala para dos jugadores emparejados: empieza ya en juego y no pasa por el lobby"""
+        with self.almacen.bloqueo():
+            sala_id = nuevo_id_sala()
+            while self.almacen.existe(sala_id):
+                sala_id = nuevo_id_sala()
+            # Clave que no se comunica a nadie: solo juegan los dos emparejados
+            sala = Sala(sala_id, secrets.token_urlsafe(12), jugador_a, variante)
+            sala.agregar_jugador(jugador_b, "O", nuevo_token())
+            sala.turno = random.choice(["X", "O"])
+            sala.estado = "jugando"
+            self.almacen.insertar(sala, self._vencimiento(sala), self._es_publica(sala))
+        log.info("🤝 Partida emparejada: %s contra %s", jugador_a, jugador_b, extra={"sala_id": sala_id})
+        return sala
+    
     def unir_sala(self, sala_id: str, clave: str, jugador: str) -> Dict:
-        sala = self.salas.get(sala_id)
-        if not sala:
-            return {"exito": False, "mensaje": "Sala no encontrada"}
-        if sala["clave"] != clave:
-            return {"exito": False, "mensaje": "Clave incorrecta"}
-        if len(sala["jugadores"]) >= 2:
-            return {"exito": False, "mensaje": "Sala llena"}
-        if jugador in sala["jugadores"]:
-            return {"exito": False, "mensaje": "Ya estás en esta sala"}
+        with self.almacen.bloqueo():
+            sala = self.almacen.obtener(sala_id)
+            if not sala:
+                return {"exito": False, "mensaje": "Sala no encontrada"}
+            if sala.clave != clave:
+                return {"exito": False, "mensaje": "Clave incorrecta"}
+            if sala.num_jugadores >= 2:
+                return {"exito": False, "mensaje": "Sala llena"}
+            if sala.tiene_jugador(jugador):
+                return {"exito": False, "mensaje": "Ya estás en esta sala"}
+                
+            sala.agregar_jugador(jugador, "O", nuevo_token())
             
-        sala["jugadores"].append(jugador)
-        sala["simbolos"][jugador] = "O"
-        sala["marcador"][jugador] = 0
-        
-        if len(sala["jugadores"]) == 2:
-            primer_turno = random.choice(["X", "O"])
-            sala["turno"] = primer_turno
-            sala["estado"] = "jugando"
-            print(f"✓ Segundo jugador {jugador} unido. Turno inicial: {primer_turno}")
-        
+            if sala.num_jugadores == 2:
+                primer_turno = random.choice(["X", "O"])
+                sala.turno = primer_turno
+                sala.estado = "jugando"
+                log.debug("✓ Segundo jugador unido. Turno inicial: %s", primer_turno,
+                          extra={"sala_id": sala_id, "jugador": jugador})
+            
+            self._sala_modificada(sala)
+        self._avisar_lobby(sala)
         return {"exito": True, "sala": sala}
     
     def obtener_simbolo_jugador(self, sala_id: str, jugador: str) -> str:
-        sala = self.salas.get(sala_id)
+        sala = self.almacen.obtener(sala_id)
         if not sala:
             return None
-        return sala["simbolos"].get(jugador)
+        return sala.simbolo_de(jugador)
     
-    def hacer_movimiento(self, sala_id: str, posicion: int, jugador: str) -> bool:
-        sala = self.salas.get(sala_id)
-        if not sala or sala["estado"] != "jugando":
-            return False
-        
-        simbolo_jugador = self.obtener_simbolo_jugador(sala_id, jugador)
-        if not simbolo_jugador or sala["turno"] != simbolo_jugador:
-            return False
-        
-        if posicion < 0 or posicion > 8 or sala["tablero"][posicion] != "":
-            return False
-        
-        sala["tablero"][posicion] = simbolo_jugador
-        
-        # Verificar ganador
-        if self.verificar_ganador(sala["tablero"], simbolo_jugador):
-            sala["estado"] = "terminado"
-            sala["ganador"] = jugador
-            sala["marcador"][jugador] = sala["marcador"].get(jugador, 0) + 1
-            sala["partidas_jugadas"] += 1
-            print(f"🎉 {jugador} gana la partida!")
-        elif all(celda != "" for celda in sala["tablero"]):
-            sala["estado"] = "empate"
-            sala["partidas_jugadas"] += 1
-            print("🤝 ¡Empate!")
-        else:
-            sala["turno"] = "O" if sala["turno"] == "X" else "X"
-        
+    def hacer_movimiento(self, sala_id: str, posicion: int, jugador: str, token: Optional[str] = None) -> bool:
+        """Jugar en nombre de `jugador` si la conexión tiene su sesión (`token`) y le toca"""
+        with self.almacen.bloqueo():
+            sala = self.almacen.obtener(sala_id)
+            if not sala or sala.estado != "jugando":
+                return False
+            if not sala.sesion_valida(jugador, token):
+                return False
+            
+            simbolo_jugador = sala.simbolo_de(jugador)
+            if not simbolo_jugador or sala.turno != simbolo_jugador:
+                return False
+            
+            tablero = sala.tablero
+            posicion = tablero.resolver(posicion)
+            if posicion is None:
+                return False
+            
+            tablero.colocar(posicion, simbolo_jugador)
+            sala.ultima_jugada = (posicion, simbolo_jugador)
+            
+            # Verificar ganador: solo las líneas que pasan por la casilla jugada
+            if tablero.gana_con(posicion, simbolo_jugador):
+                sala.estado = "terminado"
+                sala.ganador = jugador
+                sala.sumar_punto(jugador)
+                sala.partidas_jugadas += 1
+                log.debug("🎉 Partida ganada", extra={"sala_id": sala_id, "jugador": jugador})
+            elif tablero.lleno():
+                sala.estado = "empate"
+                sala.partidas_jugadas += 1
+                log.debug("🤝 ¡Empate!", extra={"sala_id": sala_id})
+            else:
+                sala.turno = "O" if sala.turno == "X" else "X"
+            
+            self._sala_modificada(sala)
+        if sala.estado != "jugando" and self.al_terminar_partida:
+            self.al_terminar_partida(sala)
         return True
     
-    def verificar_ganador(self, tablero: List[str], jugador: str) -> bool:
-        lineas_ganadoras = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],
-            [0, 4, 8], [2, 4, 6]
-        ]
-        for linea in lineas_ganadoras:
-            if all(tablero[pos] == jugador for pos in linea):
-                return True
-        return False
+    def verificar_ganador(self, tablero, simbolo: str) -> bool:
+        return tablero.es_ganador(simbolo)
     
     def solicitar_reinicio(self, sala_id: str, jugador: str) -> Dict:
         """Solicitar reinicio de partida"""
-        sala = self.salas.get(sala_id)
-        if not sala:
-            return {"exito": False, "mensaje": "Sala no encontrada"}
-        
-        if sala["estado"] not in ["terminado", "empate"]:
-            return {"exito": False, "mensaje": "La partida no ha terminado"}
-        
-        if jugador not in sala["reinicio_pendiente"]:
-            sala["reinicio_pendiente"].append(jugador)
-            print(f"Jugador {jugador} solicita reinicio. Pendientes: {sala['reinicio_pendiente']}")
-        
-        # Verificar si ambos jugadores han aceptado el reinicio
-        if len(sala["reinicio_pendiente"]) == 2:
-            # Reiniciar partida
-            self.reiniciar_partida(sala_id)
-            return {"exito": True, "reiniciado": True, "sala": sala}
-        else:
+        with self.almacen.bloqueo():
+            sala = self.almacen.obtener(sala_id)
+            if not sala:
+                return {"exito": False, "mensaje": "Sala no encontrada"}
+            
+            if sala.estado not in ["terminado", "empate"]:
+                return {"exito": False, "mensaje": "La partida no ha terminado"}
+            
+            if sala.pedir_reinicio(jugador):
+                log.debug("Reinicio solicitado. Pendientes: %s", tuple(sala.reinicio_pendiente),
+                          extra={"sala_id": sala_id, "jugador": jugador})
+            if sala.bot is not None:
+                # La máquina siempre acepta la revancha
+                sala.pedir_reinicio(bot.NOMBRE_BOT)
+            
+            # Verificar si ambos jugadores han aceptado el reinicio
+            if sala.reinicio_a and sala.reinicio_b:
+                # Reiniciar partida
+                self._reiniciar(sala)
+                self._sala_modificada(sala)
+                return {"exito": True, "reiniciado": True, "sala": sala}
+            
+            self._sala_modificada(sala)
             # Encontrar quién falta por aceptar
-            jugadores_faltantes = [j for j in sala["jugadores"] if j not in sala["reinicio_pendiente"]]
-            return {"exito": True, "reiniciado": False, "faltante": jugadores_faltantes[0] if jugadores_faltantes else None}
+            return {"exito": True, "reiniciado": False, "faltante": sala.falta_reinicio()}
     
     def reiniciar_partida(self, sala_id: str):
         """Reiniciar completamente la partida"""
-        sala = self.salas.get(sala_id)
-        if not sala:
-            return
-        
+        with self.almacen.bloqueo():
+            sala = self.almacen.obtener(sala_id)
+            if not sala:
+                return
+            self._reiniciar(sala)
+            self._sala_modificada(sala)
+    
+    def _reiniciar(self, sala: Sala):
         # Limpiar tablero
-        sala["tablero"] = [""] * 9
+        sala.tablero = crear_tablero(sala.variante)
+        sala.ultima_jugada = None
         
         # Reiniciar estado de reinicio
-        sala["reinicio_pendiente"] = []
+        sala.limpiar_reinicio()
         
         # Intercambiar símbolos para dar ventaja al que perdió
-        if sala["ganador"] and len(sala["jugadores"]) == 2:
+        if sala.ganador and sala.num_jugadores == 2:
             # El ganador anterior ahora será O, el perdedor será X
-            ganador_anterior = sala["ganador"]
-            perdedor = [j for j in sala["jugadores"] if j != ganador_anterior][0]
+            ganador_anterior = sala.ganador
+            perdedor = sala.jugador_b if ganador_anterior == sala.jugador_a else sala.jugador_a
             
-            sala["simbolos"][ganador_anterior] = "O"
-            sala["simbolos"][perdedor] = "X"
+            sala.asignar_simbolo(ganador_anterior, "O")
+            sala.asignar_simbolo(perdedor, "X")
             # El que perdió empieza (el que ahora tiene X)
-            sala["turno"] = "X"
+            sala.turno = "X"
         else:
             # En caso de empate o primera partida, alternar aleatoriamente
             simbolos = ["X", "O"]
             random.shuffle(simbolos)
-            for i, jugador in enumerate(sala["jugadores"]):
-                sala["simbolos"][jugador] = simbolos[i]
+            for i, jugador in enumerate(sala.jugadores):
+                sala.asignar_simbolo(jugador, simbolos[i])
             # El que tiene X empieza
-            sala["turno"] = "X"
+            sala.turno = "X"
         
-        sala["estado"] = "jugando"
-        sala["ganador"] = None
+        sala.estado = "jugando"
+        sala.ganador = None
         
-        print(f"Partida reiniciada en sala {sala_id}. Nuevos símbolos: {sala['simbolos']}, Turno: {sala['turno']}")
+        log.debug("Partida reiniciada. Nuevos símbolos: %s, Turno: %s", str(sala.simbolos), sala.turno,
+                  extra={"sala_id": sala.id})
     
-    def obtener_info_sala(self, sala_id: str) -> Dict:
-        return self.salas.get(sala_id)
+    def obtener_info_sala(self, sala_id: str) -> Optional[Sala]:
+        return self.almacen.obtener(sala_id)
     
-    def obtener_salas_publicas(self) -> List[Dict]:
-        ahora = time.time()
-        salas_publicas = []
-        
-        for sala_id, sala in self.salas.items():
-            es_valida = (
-                ahora - sala["timestamp"] < 600 and
-                len(sala["jugadores"]) < 2 and 
-                sala["estado"] == "esperando"
-            )
+    def salir_sala(self, sala_id: str, jugador: str) -> Optional[Sala]:
+        """Quitar a un jugador de la sala. Devuelve la sala o None si se eliminó por quedar vacía"""
+        with self.almacen.bloqueo():
+            sala = self.almacen.obtener(sala_id)
+            if not sala or not sala.tiene_jugador(jugador):
+                return sala
+            
+            sala.quitar_jugador(jugador)
+            
+            # Una sala contra la máquina no sigue abierta sin su jugador humano
+            if not sala.num_jugadores or sala.bot is not None:
+                self.eliminar_sala(sala_id)
+                return None
             
-            if es_valida:
-                salas_publicas.append({
-                    "id": sala["id"],
-                    "jugadores": sala["jugadores"],
-                    "creador": sala["creador"],
-                    "cantidad_jugadores": len(sala["jugadores"])
-                })
+            self._sala_modificada(sala)
+        return sala
+    
+    def cambiar_espectadores(self, sala_id: str, cambio: int) -> Optional[Sala]:
+        """Sumar (o restar) espectadores a la sala; no cambia su versión ni su vencimiento"""
+        sala = self.almacen.cambiar_espectadores(sala_id, cambio)
+        if sala is None:
+            return None
+        if self._es_publica(sala):
+            self._avisar_lobby(sala)
+        return sala
+    
+    def sesion_valida(self, sala_id: str, jugador: str, token: Optional[str]) -> bool:
+        """Si la conexión con `token` tiene la sesión del jugador (sin sala, el comando da su propio error)"""
+        sala = self.almacen.obtener(sala_id)
+        return sala is None or sala.sesion_valida(jugador, token)
+    
+    def suspender_jugador(self, sala_id: str, jugador: str, segundos: float, token: Optional[str]) -> Optional[Sala]:
+        """Guardar el puesto de un jugador desconectado durante `segundos` (si la conexión tenía su sesión)"""
+        with self.almacen.bloqueo():
+            sala = self.almacen.obtener(sala_id)
+            if not sala or not sala.tiene_jugador(jugador) or not sala.sesion_valida(jugador, token):
+                return None
+            sala.suspender(jugador, time.time() + segundos)
+            self._sala_modificada(sala)
+        return sala
+    
+    def reanudar_jugador(self, sala_id: str, jugador: str, token: str) -> Dict:
+        """Devolver su puesto a un jugador que vuelve con su token de sesión"""
+        with self.almacen.bloqueo():
+            sala = self.almacen.obtener(sala_id)
+            if not sala:
+                return {"exito": False, "mensaje": "La sala ya no existe"}
+            esperado = sala.token_de(jugador)
+            if not esperado or not secrets.compare_digest(esperado, token):
+                return {"exito": False, "mensaje": "Sesión no válida"}
+            if sala.suspendido_hasta(jugador) is None:
+                # No llegó a suspenderse (reconexión antes de procesar la desconexión)
+                return {"exito": True, "sala": sala, "cambiada": False}
+            sala.reanudar(jugador)
+            self._sala_modificada(sala)
+        return {"exito": True, "sala": sala, "cambiada": True}
+    
+    def suspension_vencida(self, sala_id: str, jugador: str) -> bool:
+        """Si el jugador sigue suspendido y ya ha pasado su tiempo de gracia"""
+        sala = self.almacen.obtener(sala_id)
+        if not sala:
+            return False
+        hasta = sala.suspendido_hasta(jugador)
+        return hasta is not None and hasta <= time.time()
+    
+    def jugar_bot(self, sala_id: str) -> bool:
+        """Hacer la jugada de la máquina si le toca; devuelve si ha jugado"""
+        with self.almacen.bloqueo():
+            sala = self.almacen.obtener(sala_id)
+            if not sala or sala.bot is None or sala.estado != "jugando":
+                return False
+            if sala.simbolo_de(bot.NOMBRE_BOT) != sala.turno:
+                return False
+            posicion = bot.elegir_jugada(sala.tablero, sala.turno, sala.bot)
+            if posicion is None:
+                return False
+            return self.hacer_movimiento(sala_id, posicion, bot.NOMBRE_BOT)
+    
+    def _sala_modificada(self, sala: Sala):
+        """Subir la versión y persistir la sala junto con su expiración y visibilidad en el lobby"""
+        sala.version += 1
+        self.almacen.guardar(sala, self._vencimiento(sala), self._es_publica(sala))
+    
+    def _vencimiento(self, sala: Sala) -> float:
+        """Instante en que expira la sala si no hay más actividad, según su estado"""
+        estado = "terminado" if sala.estado == "empate" else sala.estado
+        return time.time() + self.ttl_por_estado[estado]
+    
+    def _es_publica(self, sala: Sala) -> bool:
+        return sala.num_jugadores < 2 and sala.estado == "esperando"
+    
+    def _avisar_lobby(self, sala: Sala, eliminada: bool = False):
+        if self.al_cambiar_lobby:
+            publica = not eliminada and self._es_publica(sala)
+            self.al_cambiar_lobby(sala.id, resumen_lobby(sala) if publica else None)
+    
+    def expirar_salas(self, ahora: Optional[float] = None) -> List[Sala]:
+        """Liberar las salas inactivas cuyo TTL ha vencido y devolverlas"""
+        expiradas = self.almacen.expirar(time.time() if ahora is None else ahora)
+        for sala in expiradas:
+            self._codificadas.pop(sala.id, None)
+            self._historial.pop(sala.id, None)
+            if self._es_publica(sala):
+                self._avisar_lobby(sala, eliminada=True)
+        self.total_expiradas += len(expiradas)
+        return expiradas
+    
+    def sala_codificada(self, sala_id: str) -> Optional[str]:
+        """Sala proyectada para la web y ya codificada; solo se recodifica si cambió su versión"""
+        sala = self.almacen.obtener(sala_id)
+        if not sala:
+            self._codificadas.pop(sala_id, None)
+            self._historial.pop(sala_id, None)
+            return None
+        cache = self._codificadas.get(sala_id)
+        if cache and cache[0] == sala.version:
+            return cache[1]
+        texto = codec.dumps(sala_a_json(sala))
+        self._codificadas[sala_id] = (sala.version, texto)
+        return texto
+    
+    def anotar_difusion(self, sala_id: str, version: int, texto: str):
+        historial = self._historial.get(sala_id)
+        if historial is None:
+            historial = self._historial[sala_id] = deque(maxlen=HISTORIAL_DIFUSIONES)
+        historial.append((version, texto))
+    
+    def difusiones_desde(self, sala_id: str, desde: int, hasta: int) -> Optional[List[str]]:
+        """Mensajes que llevan la sala de la versión `desde` a `hasta`, o None si faltan.
+
+        Faltan si ya salieron del historial o si los produjo otro worker.
+        """
+        if desde > hasta:
+            return None
+        textos = [texto for version, texto in self._historial.get(sala_id, ()) if desde < version <= hasta]
+        return textos if len(textos) == hasta - desde else None
+    
+    def obtener_salas_publicas(self, limite: int = LOBBY_LIMITE_POR_DEFECTO,
+                               cursor: Optional[int] = None) -> Tuple[List[Dict], Optional[int]]:
+        """Página de salas disponibles y cursor para pedir la siguiente (None si no hay más)"""
+        limite = max(1, min(limite, LOBBY_LIMITE_MAXIMO))
+        pagina, siguiente_cursor = self.almacen.listar_publicas(limite, cursor, time.time() - LOBBY_TTL)
         
-        return salas_publicas
+        return [resumen_lobby(sala) for sala in pagina], siguiente_cursor
     
     def eliminar_sala(self, sala_id: str):
         """Eliminar una sala específica"""
-        if sala_id in self.salas:
-            del self.salas[sala_id]
-            print(f"Sala {sala_id} eliminada")
+        sala = self.almacen.eliminar(sala_id)
+        if sala is not None:
+            self._codificadas.pop(sala_id, None)
+            self._historial.pop(sala_id, None)
+            self._avisar_lobby(sala, eliminada=True)
+            log.debug("Sala eliminada", extra={"sala_id": sala_id})
 
 sala_manager = SalaManager()
 
-async def enviar_a_todos_en_sala(sala_id: str, mensaje: dict):
-    """Envía un mensaje a todos los jugadores en una sala"""
+# Conexiones y salas por estado se calculan al exportar /metrics
+metricas.track_connections(lambda: len(conexiones))
+metricas.track_rooms(lambda: sala_manager.almacen.contar_por_estado())
+
+def resumen_lobby(sala: Sala) -> Dict:
+    """Lo que el lobby muestra de una sala disponible"""
+    return {
+        "id": sala.id,
+        "jugadores": sala.jugadores,
+        "creador": sala.creador,
+        "cantidad_jugadores": sala.num_jugadores,
+        "espectadores": sala.espectadores
+    }
+
+def sala_a_json(sala: Sala) -> Dict:
+    """Proyección de la sala que necesita la web: sin clave ni campos internos"""
+    tablero = sala.tablero
+    return {
+        "id": sala.id,
+        "variante": sala.variante,
+        "jugadores": sala.jugadores,
+        "simbolos": sala.simbolos,
+        "turno": sala.turno,
+        "estado": sala.estado,
+        "ganador": sala.ganador,
+        "marcador": sala.marcador,
+        "partidas_jugadas": sala.partidas_jugadas,
+        "version": sala.version,
+        "bot": sala.bot,
+        "suspendidos": sala.suspendidos,
+        "tablero": tablero.a_lista(),
+        "filas": tablero.filas,
+        "columnas": tablero.columnas,
+        "gravedad": tablero.gravedad
+    }
+
+def delta_jugada(sala: Sala) -> Dict:
+    """Cambio mínimo tras una jugada, con la versión de la sala que produce.
+
+    El marcador solo viaja cuando la partida termina, que es cuando cambia.
+    """
+    posicion, simbolo = sala.ultima_jugada
+    delta = {
+        "tipo": "delta",
+        "version": sala.version,
+        "posicion": posicion,
+        "simbolo": simbolo,
+        "turno": sala.turno,
+        "estado": sala.estado
+    }
+    if sala.estado != "jugando":
+        delta["ganador"] = sala.ganador
+        delta["marcador"] = sala.marcador
+        delta["partidas_jugadas"] = sala.partidas_jugadas
+    return delta
+
+# Con varios workers, las difusiones llegan a los jugadores de otros procesos por el bus
+bus = crear_bus(multiproceso=not isinstance(sala_manager.almacen, AlmacenMemoria))
+
+def asignar_sala(jugador: str, sala_id: str):
+    """Registrar la sala actual del jugador y suscribir este worker a ella"""
+    anterior = jugador_sala.get(jugador)
+    if anterior == sala_id:
+        return
+    if anterior:
+        bus.desuscribir(anterior)
+    jugador_sala[jugador] = sala_id
+    bus.suscribir(sala_id)
+
+def liberar_jugador(jugador: str, sala_id: Optional[str] = None) -> Optional[str]:
+    """Olvidar la sala del jugador (solo si es `sala_id`, cuando se indica) y devolverla"""
+    actual = jugador_sala.get(jugador)
+    if actual is None or (sala_id is not None and actual != sala_id):
+        return None
+    del jugador_sala[jugador]
+    bus.desuscribir(actual)
+    return actual
+
+def vincular_sesion(jugador: str, conexion: Conexion, token: Optional[str]):
+    """Dar a la conexión la sesión del puesto del jugador y hacerla su conexión registrada"""
+    conexion.token = token
+    if conexion.jugador == jugador and jugador not in NOMBRES_RESERVADOS:
+        conexiones[jugador] = conexion
+
+def entregar_local(sala_id: str, texto: str, fusion: Optional[str] = None):
+    """Encolar un mensaje ya codificado para los jugadores de la sala conectados a este worker.
+
+    Los espectadores no reciben el mensaje: solo se anota que la sala ha
+    cambiado y les llega su propia trama (ver espectadores.py).
+    """
     sala = sala_manager.obtener_info_sala(sala_id)
     if sala:
-        for jugador in sala["jugadores"]:
-            if jugador in conexiones:
-                try:
-                    await conexiones[jugador].send_text(json.dumps(mensaje))
-                except Exception as e:
-                    print(f"Error enviando a {jugador}: {e}")
+        for jugador in (sala.jugador_a, sala.jugador_b):
+            conexion = conexiones.get(jugador)
+            if conexion:
+                conexion.encolar(texto, fusion)
+    espectadores.marcar(sala_id)
+
+def trama_espectadores(sala_id: str) -> Optional[str]:
+    """Estado completo de la sala para sus espectadores (None si ya no existe)"""
+    sala_codificada = sala_manager.sala_codificada(sala_id)
+    if sala_codificada is None:
+        return None
+    return codec.componer({
+        "tipo": "estado_espectador",
+        "espectadores": sala_manager.obtener_info_sala(sala_id).espectadores
+    }, sala=sala_codificada)
+
+# Espectadores conectados a este worker; comparten una trama codificada por cambio de sala
+espectadores = DifusorEspectadores(trama_espectadores)
+
+# Jugadores de este worker que buscan partida (ver emparejamiento.py)
+emparejamiento = ColaEmparejamiento()
+
+# Suscriptores al lobby de este worker; los cambios de otros workers llegan por el bus
+lobby = DifusorLobby()
+
+def cambio_lobby(sala_id: str, resumen: Optional[Dict]):
+    lobby.registrar(sala_id, resumen)
+    bus.publicar(TEMA_LOBBY, codec.dumps({"id": sala_id, "resumen": resumen}))
+
+def recibir_del_bus(tema: str, texto: str):
+    if tema == TEMA_LOBBY:
+        cambio = codec.loads(texto)
+        lobby.registrar(cambio["id"], cambio["resumen"])
+    elif tema == TEMA_EXPIRADAS:
+        expirada = codec.loads(texto)
+        olvidar_sala_expirada(expirada["id"], expirada["jugadores"])
+    else:
+        entregar_local(tema, texto)
+
+# Clasificación global del juego en el hub (ver leaderboard.py). Solo puntúa
+# el 3 en raya clásico: las demás variantes son otros juegos y mezclarlas
+# falsearía el Elo. Los nombres no están autenticados: quien use el nombre
+# de otro jugador juega con su puntuación.
+clasificacion = leaderboard.for_game("3-in-row")
+VARIANTE_CLASIFICADA = "3-en-raya"
+
+def registrar_resultado(sala: Sala):
+    """Sumar a la clasificación una partida clásica terminada entre dos personas"""
+    if sala.bot is not None or sala.num_jugadores < 2 or sala.variante != VARIANTE_CLASIFICADA:
+        return
+    if sala.estado == "empate":
+        puntos_a = 0.5
+    else:
+        puntos_a = 1.0 if sala.ganador == sala.jugador_a else 0.0
+    clasificacion.record_result(sala.jugador_a, sala.jugador_b, puntos_a)
+
+def puntuacion_de(jugador: str) -> int:
+    """Puntuación Elo del jugador en la clasificación (la inicial si aún no ha jugado)"""
+    rating = clasificacion.players.get(jugador)
+    return round(rating.rating if rating else leaderboard.INITIAL_RATING)
+
+sala_manager.al_cambiar_lobby = cambio_lobby
+sala_manager.al_terminar_partida = registrar_resultado
+bus.al_recibir = recibir_del_bus
+
+# Instantáneas codificadas de GET /salas: (limite, cursor) -> (versión del lobby, caduca, cuerpo, etag)
+_instantaneas_lobby: Dict[Tuple[int, Optional[int]], Tuple[int, float, bytes, str]] = {}
+
+def instantanea_lobby(limite: int, cursor: Optional[int]) -> Tuple[bytes, str]:
+    """Página del lobby codificada y su ETag; se reutiliza mientras el lobby no cambie"""
+    ahora = time.time()
+    clave = (limite, cursor)
+    cache = _instantaneas_lobby.get(clave)
+    if cache and cache[0] == lobby.version and cache[1] > ahora:
+        return cache[2], cache[3]
+    
+    salas_publicas, siguiente_cursor = sala_manager.obtener_salas_publicas(limite, cursor)
+    cuerpo = codec.dumps({
+        "salas": salas_publicas,
+        "siguiente_cursor": siguiente_cursor
+    }).encode()
+    # ETag por contenido: coincide entre workers aunque cada uno lleve su propia versión
+    etag = f'"{hashlib.sha1(cuerpo).hexdigest()[:16]}"'
+    if len(_instantaneas_lobby) >= 64:
+        _instantaneas_lobby.clear()
+    _instantaneas_lobby[clave] = (lobby.version, ahora + LOBBY_CACHE_TTL, cuerpo, etag)
+    return cuerpo, etag
+
+async def enviar_a_todos_en_sala(sala_id: str, mensaje: Union[dict, str], fusion: Optional[str] = None,
+                                 version: Optional[int] = None):
+    """Envía un mensaje a todos los jugadores en una sala.
+
+    El mensaje (un dict o texto ya codificado) se serializa una sola vez y se
+    encola en cada conexión local; las tareas escritoras lo entregan en
+    paralelo, así que nunca se espera al socket más lento. Los jugadores de
+    otros workers lo reciben a través del bus. Con `version` (la de la sala
+    que produce el mensaje) se guarda para reenviarlo a quien reanude.
+    """
+    texto = mensaje if isinstance(mensaje, str) else codec.dumps(mensaje)
+    if version is not None:
+        sala_manager.anotar_difusion(sala_id, version, texto)
+    entregar_local(sala_id, texto, fusion)
+    bus.publicar(sala_id, texto)
+
+# --- COMANDOS POR SALA ---
+# Todo lo que lee y modifica una sala se ejecuta en el actor de esa sala
+# (ver actores.py): los comandos de una misma sala no se intercalan aunque
+# esperen, y las corrutinas de los sockets solo reciben y encolan.
+actores = Actores()
+
+# Respuesta a los comandos de una conexión que no tiene la sesión del puesto
+MENSAJE_SIN_SESION = "Tu puesto está suspendido o en otra conexión: reanuda la sesión para jugar"
+
+async def comando_unir(conexion: Conexion, sala_id: str, clave: str, jugador: str):
+    resultado = sala_manager.unir_sala(sala_id, clave, jugador)
+
+    if resultado["exito"]:
+        sala = resultado["sala"]
+        simbolo_jugador = sala.simbolo_de(jugador)
+        # Sentado en una sala: deja de buscar partida
+        emparejamiento.cancelar(conexion.jugador, conexion)
+        asignar_sala(jugador, sala_id)
+        vincular_sesion(jugador, conexion, sala.token_de(jugador))
+
+        sala_codificada = sala_manager.sala_codificada(sala_id)
+        conexion.encolar(codec.componer({
+            "tipo": "unido_exitoso",
+            "tu_simbolo": simbolo_jugador,
+            "token": sala.token_de(jugador)
+        }, sala=sala_codificada))
+
+        # Notificar a TODOS en la sala (incluyendo al creador)
+        await enviar_a_todos_en_sala(sala_id, codec.componer({
+            "tipo": "estado_actualizado"
+        }, sala=sala_codificada), fusion="estado", version=sala.version)
+        log.info("✅ Jugador unido como %s", simbolo_jugador, extra={"sala_id": sala_id, "jugador": jugador})
+    else:
+        conexion.enviar({
+            "tipo": "error",
+            "mensaje": resultado["mensaje"]
+        })
+        log.debug("❌ Error uniendo a sala: %s", resultado["mensaje"], extra={"sala_id": sala_id, "jugador": jugador})
+
+async def turno_bot(sala_id: str):
+    """Si la sala es contra la máquina y le toca, jugar y difundir la jugada"""
+    if sala_manager.jugar_bot(sala_id):
+        sala = sala_manager.obtener_info_sala(sala_id)
+        await enviar_a_todos_en_sala(sala_id, delta_jugada(sala), version=sala.version)
+
+async def comando_empezar_bot(sala_id: str):
+    """Primer estado de una sala contra la máquina (que puede tener el primer turno)"""
+    sala = sala_manager.obtener_info_sala(sala_id)
+    await enviar_a_todos_en_sala(sala_id, codec.componer({
+        "tipo": "estado_actualizado"
+    }, sala=sala_manager.sala_codificada(sala_id)), fusion="estado", version=sala.version)
+    await turno_bot(sala_id)
+
+async def comando_movimiento(conexion: Conexion, sala_id: str, jugador: str, posicion: int):
+    if sala_manager.hacer_movimiento(sala_id, posicion, jugador, conexion.token):
+        sala = sala_manager.obtener_info_sala(sala_id)
+        # Notificar a todos en la sala solo lo que ha cambiado
+        await enviar_a_todos_en_sala(sala_id, delta_jugada(sala), version=sala.version)
+        await turno_bot(sala_id)
+    elif not sala_manager.sesion_valida(sala_id, jugador, conexion.token):
+        log.debug("🔒 Movimiento sin la sesión del puesto", extra={"sala_id": sala_id, "jugador": jugador})
+        conexion.enviar({
+            "tipo": "error",
+            "mensaje": MENSAJE_SIN_SESION
+        })
+    else:
+        # Obtener información de debug para el error
+        sala = sala_manager.obtener_info_sala(sala_id)
+        simbolo_jugador = sala_manager.obtener_simbolo_jugador(sala_id, jugador)
+
+        error_msg = f"Movimiento inválido. Turno actual: {sala.turno if sala else 'N/A'}, Tu símbolo: {simbolo_jugador}"
+        log.debug("❌ Error movimiento: %s", error_msg, extra={"sala_id": sala_id, "jugador": jugador})
+
+        conexion.enviar({
+            "tipo": "error",
+            "mensaje": error_msg
+        })
+
+async def comando_reinicio(conexion: Conexion, sala_id: str, jugador: str):
+    if not sala_manager.sesion_valida(sala_id, jugador, conexion.token):
+        conexion.enviar({
+            "tipo": "error",
+            "mensaje": MENSAJE_SIN_SESION
+        })
+        return
+    resultado = sala_manager.solicitar_reinicio(sala_id, jugador)
+
+    if not resultado["exito"]:
+        conexion.enviar({
+            "tipo": "error",
+            "mensaje": resultado["mensaje"]
+        })
+    elif resultado.get("reiniciado"):
+        # Partida reiniciada, enviar nuevo estado a todos
+        sala = sala_manager.obtener_info_sala(sala_id)
+        await enviar_a_todos_en_sala(sala_id, codec.componer({
+            "tipo": "partida_reiniciada",
+            "marcador": sala.marcador
+        }, sala=sala_manager.sala_codificada(sala_id)), version=sala.version)
+        log.debug("🔄 Partida reiniciada", extra={"sala_id": sala_id})
+        await turno_bot(sala_id)
+    else:
+        # Solo un jugador ha aceptado, notificar a todos
+        sala = sala_manager.obtener_info_sala(sala_id)
+        await enviar_a_todos_en_sala(sala_id, {
+            "tipo": "reinicio_pendiente",
+            "solicitado_por": jugador,
+            "esperando_a": resultado["faltante"],
+            "reinicio_pendiente": sala.reinicio_pendiente,
+            "version": sala.version
+        }, version=sala.version)
+        log.debug("⏳ Reinicio pendiente, esperando a %s", resultado["faltante"], extra={"sala_id": sala_id})
+
+def comando_estado(conexion: Conexion, sala_id: str, jugador: str):
+    sala = sala_manager.obtener_info_sala(sala_id)
+    if sala:
+        simbolo_jugador = sala_manager.obtener_simbolo_jugador(sala_id, jugador)
+        conexion.encolar(codec.componer({
+            "tipo": "estado_actual",
+            "tu_simbolo": simbolo_jugador,
+            "marcador": sala.marcador,
+            "partidas_jugadas": sala.partidas_jugadas
+        }, sala=sala_manager.sala_codificada(sala_id)), fusion="estado")
+
+async def comando_salir(sala_id: str, jugador: str):
+    """Quitar de la sala a un jugador (que se va o no ha vuelto a tiempo) y avisar al otro"""
+    sala = sala_manager.obtener_info_sala(sala_id)
+    if not sala or not sala.tiene_jugador(jugador):
+        return
+    sala = sala_manager.salir_sala(sala_id, jugador)
+    if sala is None:
+        # Solo quedan espectadores (de cualquier worker): se les avisa del cierre
+        await enviar_a_todos_en_sala(sala_id, {"tipo": "sala_cerrada"})
+        log.debug("🗑️  Sala eliminada por estar vacía", extra={"sala_id": sala_id})
+    else:
+        # Notificar al otro jugador que se desconectó
+        await enviar_a_todos_en_sala(sala_id, {
+            "tipo": "jugador_desconectado",
+            "mensaje": f"El jugador {jugador} se ha desconectado",
+            "version": sala.version
+        }, version=sala.version)
+        log.debug("⚠️  Jugador desconectado de la sala", extra={"sala_id": sala_id, "jugador": jugador})
+
+async def comando_desconexion(sala_id: str, jugador: str, token: Optional[str]):
+    """Suspender el puesto de un jugador cuyo socket (con `token`) se ha cerrado (o sacarlo si no hay gracia)"""
+    if GRACIA_RECONEXION <= 0:
+        if sala_manager.sesion_valida(sala_id, jugador, token):
+            await comando_salir(sala_id, jugador)
+        return
+    if jugador in conexiones:
+        # Ya ha vuelto a conectarse a este worker
+        return
+    sala = sala_manager.suspender_jugador(sala_id, jugador, GRACIA_RECONEXION, token)
+    if sala is None:
+        return
+    await enviar_a_todos_en_sala(sala_id, {
+        "tipo": "jugador_suspendido",
+        "jugador": jugador,
+        "segundos": GRACIA_RECONEXION,
+        "version": sala.version
+    }, version=sala.version)
+    tarea = asyncio.get_running_loop().create_task(esperar_fin_gracia(sala_id, jugador))
+    _tareas_gracia.add(tarea)
+    tarea.add_done_callback(_tareas_gracia.discard)
+    log.debug("⏸️  Puesto suspendido %.0f s", GRACIA_RECONEXION, extra={"sala_id": sala_id, "jugador": jugador})
+
+# Esperas de la gracia en curso (se cancelan al apagar)
+_tareas_gracia: Set[asyncio.Task] = set()
+
+async def esperar_fin_gracia(sala_id: str, jugador: str):
+    """Al acabar la gracia, sacar al jugador por el actor de la sala si no ha vuelto"""
+    await asyncio.sleep(GRACIA_RECONEXION)
+    try:
+        await actores.ejecutar(sala_id, comando_fin_gracia, sala_id, jugador)
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        log.exception("❌ Error al terminar la gracia", extra={"sala_id": sala_id, "jugador": jugador})
+
+async def comando_abandonar(conexion: Conexion, sala_id: str, jugador: str):
+    """Salida voluntaria, sin gracia (solo desde la conexión con la sesión del puesto)"""
+    if not sala_manager.sesion_valida(sala_id, jugador, conexion.token):
+        conexion.enviar({
+            "tipo": "error",
+            "mensaje": MENSAJE_SIN_SESION
+        })
+        return
+    liberar_jugador(jugador, sala_id)
+    await comando_salir(sala_id, jugador)
+
+async def comando_fin_gracia(sala_id: str, jugador: str):
+    if sala_manager.suspension_vencida(sala_id, jugador):
+        await comando_salir(sala_id, jugador)
+
+async def comando_reanudar(conexion: Conexion, sala_id: str, jugador: str, token: str, version: int):
+    """Devolver el puesto a un jugador que vuelve con su token y enviarle solo lo que se perdió"""
+    resultado = sala_manager.reanudar_jugador(sala_id, jugador, token)
+    if not resultado["exito"]:
+        conexion.enviar({
+            "tipo": "reanudacion_fallida",
+            "mensaje": resultado["mensaje"]
+        })
+        return
+
+    sala = resultado["sala"]
+    asignar_sala(jugador, sala_id)
+    vincular_sesion(jugador, conexion, token)
+    # Hasta la versión anterior al aviso de reanudación, que le llega con la difusión
+    hasta = sala.version - 1 if resultado["cambiada"] else sala.version
+    perdidos = sala_manager.difusiones_desde(sala_id, version, hasta)
+    respuesta = {
+        "tipo": "reanudado",
+        "tu_simbolo": sala.simbolo_de(jugador),
+        "completo": perdidos is None
+    }
+    if perdidos is None:
+        # No están todos en el historial: estado completo
+        conexion.encolar(codec.componer({
+            **respuesta,
+            "marcador": sala.marcador,
+            "partidas_jugadas": sala.partidas_jugadas
+        }, sala=sala_manager.sala_codificada(sala_id)))
+    else:
+        conexion.enviar(respuesta)
+        for texto in perdidos:
+            conexion.encolar(texto)
+
+    if resultado["cambiada"]:
+        await enviar_a_todos_en_sala(sala_id, {
+            "tipo": "jugador_reanudado",
+            "jugador": jugador,
+            "version": sala.version
+        }, version=sala.version)
+    log.debug("▶️  Sesión reanudada (%d mensajes perdidos)", -1 if perdidos is None else len(perdidos),
+              extra={"sala_id": sala_id, "jugador": jugador})
+
+def comando_espectar(conexion: Conexion, sala_id: str, clave: str) -> bool:
+    """Suscribir una conexión de solo lectura a la sala y enviarle su estado"""
+    sala = sala_manager.obtener_info_sala(sala_id)
+    if not sala or sala.clave != clave:
+        conexion.enviar({
+            "tipo": "error",
+            "mensaje": "Sala no encontrada" if not sala else "Clave incorrecta"
+        })
+        return False
+
+    espectadores.suscribir(sala_id, conexion)
+    bus.suscribir(sala_id)
+    sala = sala_manager.cambiar_espectadores(sala_id, 1)
+    conexion.encolar(codec.componer({
+        "tipo": "espectando",
+        "espectadores": sala.espectadores
+    }, sala=sala_manager.sala_codificada(sala_id)), FUSION_ESPECTADOR)
+    # El resto de espectadores ven el nuevo número con la siguiente trama
+    espectadores.marcar(sala_id)
+    log.debug("👁️  Espectador conectado (%d en la sala)", sala.espectadores, extra={"sala_id": sala_id})
+    return True
+
+def comando_dejar_de_espectar(conexion: Conexion, sala_id: str):
+    if not espectadores.desuscribir(sala_id, conexion):
+        # No estaba espectando esta sala
+        return
+    bus.desuscribir(sala_id)
+    if sala_manager.cambiar_espectadores(sala_id, -1) is not None:
+        espectadores.marcar(sala_id)
+
+def empezar_partida_emparejada(rival: Espera, jugador: str, conexion: Conexion):
+    """Crear la sala de dos jugadores recién emparejados y enviar a cada uno su puesto.
+
+    Nadie más conoce la sala hasta que se envían estos mensajes, así que no
+    hace falta pasar por su actor.
+    """
+    sala = sala_manager.crear_partida(rival.jugador, jugador, rival.variante)
+    sala_codificada = sala_manager.sala_codificada(sala.id)
+    for nombre, conexion_jugador, contrario in ((rival.jugador, rival.conexion, jugador),
+                                                (jugador, conexion, rival.jugador)):
+        asignar_sala(nombre, sala.id)
+        vincular_sesion(nombre, conexion_jugador, sala.token_de(nombre))
+        conexion_jugador.encolar(codec.componer({
+            "tipo": "partida_encontrada",
+            "tu_simbolo": sala.simbolo_de(nombre),
+            "token": sala.token_de(nombre),
+            "rival": contrario
+        }, sala=sala_codificada))
+
+def olvidar_sala_expirada(sala_id: str, jugadores: List[str]):
+    """Liberar a los jugadores de este worker que seguían en una sala expirada y cerrar sus conexiones"""
+    for jugador in jugadores:
+        if liberar_jugador(jugador, sala_id):
+            conexion = conexiones.pop(jugador, None)
+            if conexion:
+                conexion.cerrar(1001)
+
+async def limpiar_salas(ahora: Optional[float] = None):
+    """Expirar las salas vencidas y avisar a los demás workers para que liberen a sus jugadores"""
+    expiradas = sala_manager.expirar_salas(ahora)
+    for sala in expiradas:
+        olvidar_sala_expirada(sala.id, sala.jugadores)
+        bus.publicar(TEMA_EXPIRADAS, codec.dumps({"id": sala.id, "jugadores": sala.jugadores}))
+        await enviar_a_todos_en_sala(sala.id, {"tipo": "sala_cerrada"})
+    if expiradas:
+        log.info("🧹 %d salas expiradas (total: %d)", len(expiradas), sala_manager.total_expiradas)
+
+async def limpiar_salas_periodicamente():
+    """Liberar salas inactivas y las conexiones y mapeos de sus jugadores"""
+    while True:
+        await asyncio.sleep(INTERVALO_LIMPIEZA)
+        await limpiar_salas()
+
+_tarea_limpieza: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def iniciar_limpieza():
+    global _tarea_limpieza
+    _tarea_limpieza = asyncio.create_task(limpiar_salas_periodicamente())
+    # Resolver el 3 en raya ahora para que las jugadas del bot sean solo búsquedas en la tabla
+    bot.tabla()
+    await bus.iniciar()
+    bus.suscribir(TEMA_LOBBY)
+    bus.suscribir(TEMA_EXPIRADAS)
+
+@app.on_event("shutdown")
+async def detener_limpieza():
+    if _tarea_limpieza:
+        _tarea_limpieza.cancel()
+    for tarea in list(_tareas_gracia):
+        tarea.cancel()
+    lobby.detener()
+    espectadores.detener()
+    await actores.detener()
+    await bus.detener()
+    # Con diario: escribir lo pendiente y dejar una instantánea para arrancar rápido
+    sala_manager.almacen.cerrar()
 
 # --- RUTAS DEL JUEGO ---
 
 @app.get("/")
 async def servir_juego(request: Request):
     """Servir la página principal del juego"""
-    index_path = STATIC_DIR / "index.html"
-    
-    if index_path.exists():
-        with open(index_path, "r", encoding="utf-8") as f:
-            html_content = f.read()
-        return HTMLResponse(content=html_content)
+    respuesta = assets.response(request, "index.html")
+    if respuesta is not None:
+        return respuesta
     else:
         return templates.TemplateResponse("game_fallback.html", {
             "request": request,
@@ -261,204 +1003,277 @@ async def servir_juego(request: Request):
 @app.websocket("/ws/{sala_id}/{jugador}")
 async def websocket_endpoint(websocket: WebSocket, sala_id: str, jugador: str):
     await websocket.accept()
+    conexion = Conexion(websocket, jugador)
+    # Sala que esta conexión sigue como espectador
+    sala_espectada: Optional[str] = None
     
-    if jugador != "temp" and jugador != "salas":
-        conexiones[jugador] = websocket
-        jugador_sala[jugador] = sala_id
-        print(f"👤 Jugador {jugador} conectado a WebSocket")
+    if jugador not in NOMBRES_RESERVADOS:
+        actual = conexiones.get(jugador)
+        if actual is None or actual.cerrada or actual.token is None:
+            conexiones[jugador] = conexion
+            asignar_sala(jugador, sala_id)
+            log.debug("👤 Jugador conectado a WebSocket", extra={"jugador": jugador})
+        else:
+            # Ese nombre ocupa un puesto desde otra conexión: esta no la sustituye
+            # hasta que demuestre la sesión con `reanudar`
+            log.debug("🔒 Conexión sin sesión para un jugador ya conectado", extra={"jugador": jugador})
     
     try:
         while True:
             data = await websocket.receive_text()
-            mensaje = json.loads(data)
-            print(f"📩 Mensaje recibido de {jugador}: {mensaje['tipo']}")
+            mensaje = codec.loads(data)
+            metricas.message(mensaje["tipo"]).inc()
+            log.debug("📩 Mensaje recibido", extra={"jugador": jugador, "tipo": mensaje["tipo"], "sampled": True})
             
-            if mensaje["tipo"] == "crear_sala":
-                clave = mensaje["clave"]
-                jugador_nombre = mensaje.get("jugador", jugador)
-                sala_id_nueva = sala_manager.crear_sala(clave, jugador_nombre)
-                jugador_sala[jugador_nombre] = sala_id_nueva
+            # Cronometrar el manejador (solo si el perfilador está activo, ver monitor.py)
+            with profiler.measure("3-in-row", metricas.tipo(mensaje["tipo"]), jugador=jugador):
+                if mensaje["tipo"] == "crear_sala":
+                    clave = mensaje["clave"]
+                    jugador_nombre = mensaje.get("jugador", jugador)
+                    variante = mensaje.get("variante", "3-en-raya")
+                    if variante not in VARIANTES:
+                        conexion.enviar({
+                            "tipo": "error",
+                            "mensaje": f"Variante desconocida: {variante}"
+                        })
+                        continue
+                    dificultad_bot = None
+                    if mensaje.get("contra_bot"):
+                        dificultad_bot = mensaje.get("dificultad", bot.DIFICULTAD_POR_DEFECTO)
+                        if variante != "3-en-raya" or dificultad_bot not in bot.DIFICULTADES:
+                            conexion.enviar({
+                                "tipo": "error",
+                                "mensaje": "Contra la máquina solo se puede jugar al 3 en raya clásico (facil, media o dificil)"
+                            })
+                            continue
+                    # Quien crea una sala deja de buscar partida (si no, un emparejamiento lo sacaría de ella)
+                    emparejamiento.cancelar(jugador, conexion)
+                    sala_id_nueva = sala_manager.crear_sala(clave, jugador_nombre, variante, dificultad_bot)
+                    asignar_sala(jugador_nombre, sala_id_nueva)
+                    vincular_sesion(jugador_nombre, conexion,
+                                    sala_manager.obtener_info_sala(sala_id_nueva).token_de(jugador_nombre))
                 
-                await websocket.send_text(json.dumps({
-                    "tipo": "sala_creada",
-                    "sala_id": sala_id_nueva
-                }))
-                print(f"✅ Sala creada: {sala_id_nueva} para {jugador_nombre}")
+                    conexion.enviar({
+                        "tipo": "sala_creada",
+                        "sala_id": sala_id_nueva,
+                        "token": conexion.token
+                    })
+                    if dificultad_bot is not None:
+                        await actores.ejecutar(sala_id_nueva, comando_empezar_bot, sala_id_nueva)
             
-            elif mensaje["tipo"] == "unir_sala":
-                clave = mensaje["clave"]
-                jugador_nombre = mensaje.get("jugador", jugador)
-                resultado = sala_manager.unir_sala(sala_id, clave, jugador_nombre)
+                elif mensaje["tipo"] == "unir_sala":
+                    jugador_nombre = mensaje.get("jugador", jugador)
+                    await actores.ejecutar(sala_id, comando_unir, conexion, sala_id, mensaje["clave"], jugador_nombre)
+            
+                elif mensaje["tipo"] == "movimiento":
+                    sala_id_real = jugador_sala.get(jugador)
+                    if not sala_id_real:
+                        conexion.enviar({
+                            "tipo": "error",
+                            "mensaje": "No estás en ninguna sala"
+                        })
+                        continue
                 
-                if resultado["exito"]:
-                    sala = resultado["sala"]
-                    simbolo_jugador = sala_manager.obtener_simbolo_jugador(sala_id, jugador_nombre)
-                    jugador_sala[jugador_nombre] = sala_id
-                    
-                    await websocket.send_text(json.dumps({
-                        "tipo": "unido_exitoso",
-                        "sala": sala,
-                        "tu_simbolo": simbolo_jugador
-                    }))
-                    
-                    # Notificar a TODOS en la sala (incluyendo al creador)
-                    await enviar_a_todos_en_sala(sala_id, {
-                        "tipo": "estado_actualizado",
-                        "sala": sala
-                    })
-                    print(f"✅ {jugador_nombre} se unió a sala {sala_id} como {simbolo_jugador}")
-                else:
-                    await websocket.send_text(json.dumps({
-                        "tipo": "error",
-                        "mensaje": resultado["mensaje"]
-                    }))
-                    print(f"❌ Error uniendo a sala: {resultado['mensaje']}")
+                    posicion = mensaje["posicion"]
+                    log.debug("♟️  Movimiento en posición %s", posicion,
+                              extra={"sala_id": sala_id_real, "jugador": jugador, "sampled": True})
+                    await actores.ejecutar(sala_id_real, comando_movimiento, conexion, sala_id_real, jugador, posicion)
+            
+                elif mensaje["tipo"] == "solicitar_reinicio":
+                    # Obtener la sala REAL del jugador
+                    sala_id_real = jugador_sala.get(jugador)
+                    if not sala_id_real:
+                        conexion.enviar({
+                            "tipo": "error",
+                            "mensaje": "No estás en ninguna sala"
+                        })
+                        continue
+                
+                    await actores.ejecutar(sala_id_real, comando_reinicio, conexion, sala_id_real, jugador)
+            
+                elif mensaje["tipo"] == "obtener_estado":
+                    sala_id_real = jugador_sala.get(jugador)
+                    if sala_id_real:
+                        await actores.ejecutar(sala_id_real, comando_estado, conexion, sala_id_real, jugador)
             
-            elif mensaje["tipo"] == "movimiento":
-                sala_id_real = jugador_sala.get(jugador)
-                if not sala_id_real:
-                    await websocket.send_text(json.dumps({
-                        "tipo": "error",
-                        "mensaje": "No estás en ninguna sala"
-                    }))
-                    continue
+                elif mensaje["tipo"] == "obtener_salas":
+                    try:
+                        limite = int(mensaje.get("limite", LOBBY_LIMITE_POR_DEFECTO))
+                        cursor = mensaje.get("cursor")
+                        cursor = int(cursor) if cursor is not None else None
+                    except (TypeError, ValueError):
+                        conexion.enviar({
+                            "tipo": "error",
+                            "mensaje": "Paginación inválida"
+                        })
+                        continue
                 
-                posicion = mensaje["posicion"]
-                print(f"♟️  Movimiento de {jugador} en posición {posicion}, sala: {sala_id_real}")
+                    salas_publicas, siguiente_cursor = sala_manager.obtener_salas_publicas(limite, cursor)
+                    conexion.enviar({
+                        "tipo": "lista_salas",
+                        "salas": salas_publicas,
+                        "siguiente_cursor": siguiente_cursor
+                    }, fusion="lista_salas")
+                    log.debug("📋 Listado de salas enviado: %d salas", len(salas_publicas), extra={"sampled": True})
+            
+                elif mensaje["tipo"] == "suscribir_lobby":
+                    try:
+                        limite = int(mensaje.get("limite", LOBBY_LIMITE_POR_DEFECTO))
+                    except (TypeError, ValueError):
+                        conexion.enviar({
+                            "tipo": "error",
+                            "mensaje": "Paginación inválida"
+                        })
+                        continue
                 
-                if sala_manager.hacer_movimiento(sala_id_real, posicion, jugador):
-                    sala = sala_manager.obtener_info_sala(sala_id_real)
-                    # Notificar a todos en la sala
-                    await enviar_a_todos_en_sala(sala_id_real, {
-                        "tipo": "actualizar_tablero",
-                        "tablero": sala["tablero"],
-                        "turno": sala["turno"],
-                        "estado": sala["estado"],
-                        "ganador": sala["ganador"],
-                        "marcador": sala["marcador"],
-                        "partidas_jugadas": sala["partidas_jugadas"]
+                    # Suscribir antes de listar para no perder cambios intermedios
+                    lobby.suscribir(conexion)
+                    salas_publicas, siguiente_cursor = sala_manager.obtener_salas_publicas(limite)
+                    conexion.enviar({
+                        "tipo": "lista_salas",
+                        "salas": salas_publicas,
+                        "siguiente_cursor": siguiente_cursor
                     })
-                    print(f"✅ Movimiento procesado. Estado: {sala['estado']}, Turno: {sala['turno']}")
-                else:
-                    # Obtener información de debug para el error
-                    sala = sala_manager.obtener_info_sala(sala_id_real)
-                    simbolo_jugador = sala_manager.obtener_simbolo_jugador(sala_id_real, jugador)
-                    
-                    error_msg = f"Movimiento inválido. Turno actual: {sala['turno'] if sala else 'N/A'}, Tu símbolo: {simbolo_jugador}"
-                    print(f"❌ Error movimiento: {error_msg}")
-                    
-                    await websocket.send_text(json.dumps({
-                        "tipo": "error",
-                        "mensaje": error_msg
-                    }))
+                    log.debug("📡 Suscripción al lobby: %d salas iniciales", len(salas_publicas))
             
-            elif mensaje["tipo"] == "solicitar_reinicio":
-                # Obtener la sala REAL del jugador
-                sala_id_real = jugador_sala.get(jugador)
-                if not sala_id_real:
-                    await websocket.send_text(json.dumps({
-                        "tipo": "error",
-                        "mensaje": "No estás en ninguna sala"
-                    }))
-                    continue
-                
-                resultado = sala_manager.solicitar_reinicio(sala_id_real, jugador)
+                elif mensaje["tipo"] == "desuscribir_lobby":
+                    lobby.desuscribir(conexion)
+            
+                elif mensaje["tipo"] == "reanudar":
+                    try:
+                        version = int(mensaje.get("version", 0))
+                    except (TypeError, ValueError):
+                        version = 0
+                    token = str(mensaje.get("token", ""))
+                    await actores.ejecutar(sala_id, comando_reanudar, conexion, sala_id, jugador, token, version)
+            
+                elif mensaje["tipo"] == "espectar":
+                    if sala_espectada:
+                        await actores.ejecutar(sala_espectada, comando_dejar_de_espectar, conexion, sala_espectada)
+                        sala_espectada = None
+                    if await actores.ejecutar(sala_id, comando_espectar, conexion, sala_id, mensaje.get("clave")):
+                        sala_espectada = sala_id
+            
+                elif mensaje["tipo"] == "dejar_de_espectar":
+                    if sala_espectada:
+                        await actores.ejecutar(sala_espectada, comando_dejar_de_espectar, conexion, sala_espectada)
+                        sala_espectada = None
+            
+                elif mensaje["tipo"] == "buscar_partida":
+                    variante = mensaje.get("variante", "3-en-raya")
+                    # Con "clasificado" se empareja por la puntuación de la clasificación global
+                    # (solo la hay del 3 en raya clásico; en las demás variantes, cola general)
+                    if mensaje.get("clasificado"):
+                        puntuacion = puntuacion_de(jugador) if variante == VARIANTE_CLASIFICADA else None
+                    else:
+                        puntuacion = mensaje.get("puntuacion")
+                    sala_actual = jugador_sala.get(jugador)
+                    sala = sala_manager.obtener_info_sala(sala_actual) if sala_actual else None
+                    error = None
+                    if jugador in NOMBRES_RESERVADOS:
+                        error = "Conéctate con tu nombre para buscar partida"
+                    elif sala and sala.tiene_jugador(jugador):
+                        error = "Ya estás en una sala"
+                    elif variante not in VARIANTES:
+                        error = f"Variante desconocida: {variante}"
+                    elif puntuacion is not None:
+                        try:
+                            puntuacion = int(puntuacion)
+                        except (TypeError, ValueError):
+                            error = "Puntuación inválida"
+                    if error:
+                        conexion.enviar({
+                            "tipo": "error",
+                            "mensaje": error
+                        })
+                        continue
                 
-                if resultado["exito"]:
-                    if resultado.get("reiniciado"):
-                        # Partida reiniciada, enviar nuevo estado a todos
-                        sala = sala_manager.obtener_info_sala(sala_id_real)
-                        await enviar_a_todos_en_sala(sala_id_real, {
-                            "tipo": "partida_reiniciada",
-                            "sala": sala,
-                            "marcador": sala["marcador"]
+                    rival = emparejamiento.buscar(jugador, conexion, variante, puntuacion)
+                    if rival is None:
+                        conexion.enviar({
+                            "tipo": "buscando",
+                            "variante": variante
                         })
-                        print(f"🔄 Partida reiniciada en sala {sala_id_real}")
+                        log.debug("🔎 Buscando partida", extra={"jugador": jugador})
                     else:
-                        # Solo un jugador ha aceptado, notificar a todos
-                        sala = sala_manager.obtener_info_sala(sala_id_real)
-                        await enviar_a_todos_en_sala(sala_id_real, {
-                            "tipo": "reinicio_pendiente",
-                            "solicitado_por": jugador,
-                            "esperando_a": resultado["faltante"],
-                            "reinicio_pendiente": sala["reinicio_pendiente"]
-                        })
-                        print(f"⏳ Reinicio pendiente en sala {sala_id_real}, esperando a {resultado['faltante']}")
-                else:
-                    await websocket.send_text(json.dumps({
-                        "tipo": "error",
-                        "mensaje": resultado["mensaje"]
-                    }))
+                        empezar_partida_emparejada(rival, jugador, conexion)
             
-            elif mensaje["tipo"] == "obtener_estado":
-                sala_id_real = jugador_sala.get(jugador)
-                if sala_id_real:
-                    sala = sala_manager.obtener_info_sala(sala_id_real)
-                    if sala:
-                        simbolo_jugador = sala_manager.obtener_simbolo_jugador(sala_id_real, jugador)
-                        await websocket.send_text(json.dumps({
-                            "tipo": "estado_actual",
-                            "sala": sala,
-                            "tu_simbolo": simbolo_jugador,
-                            "marcador": sala["marcador"],
-                            "partidas_jugadas": sala["partidas_jugadas"]
-                        }))
+                elif mensaje["tipo"] == "cancelar_busqueda":
+                    conexion.enviar({
+                        "tipo": "busqueda_cancelada",
+                        "cancelada": emparejamiento.cancelar(jugador, conexion)
+                    })
             
-            elif mensaje["tipo"] == "obtener_salas":
-                salas_publicas = sala_manager.obtener_salas_publicas()
-                await websocket.send_text(json.dumps({
-                    "tipo": "lista_salas",
-                    "salas": salas_publicas
-                }))
-                print(f"📋 Listado de salas enviado: {len(salas_publicas)} salas")
+                elif mensaje["tipo"] == "salir":
+                    # Salida voluntaria: sin periodo de gracia
+                    sala_id_real = jugador_sala.get(jugador)
+                    if sala_id_real:
+                        await actores.ejecutar(sala_id_real, comando_abandonar, conexion, sala_id_real, jugador)
     
     except WebSocketDisconnect:
-        print(f"👋 Jugador {jugador} desconectado")
-        if jugador in conexiones:
+        log.debug("👋 Jugador desconectado", extra={"jugador": jugador})
+        # Si el jugador ya tiene otra conexión (ha reanudado), esta no cambia nada
+        if conexiones.get(jugador) is conexion:
             del conexiones[jugador]
-        
-        # Limpiar sala si está vacía
-        sala_id_real = jugador_sala.get(jugador)
-        if sala_id_real and jugador in jugador_sala:
-            del jugador_sala[jugador]
             
-            sala = sala_manager.obtener_info_sala(sala_id_real)
-            if sala and jugador in sala["jugadores"]:
-                sala["jugadores"].remove(jugador)
-                if jugador in sala["simbolos"]:
-                    del sala["simbolos"][jugador]
-                if jugador in sala["marcador"]:
-                    del sala["marcador"][jugador]
-                if jugador in sala["reinicio_pendiente"]:
-                    sala["reinicio_pendiente"].remove(jugador)
-                
-                # Si la sala queda vacía, eliminarla
-                if not sala["jugadores"]:
-                    sala_manager.eliminar_sala(sala_id_real)
-                    print(f"🗑️  Sala {sala_id_real} eliminada por estar vacía")
-                else:
-                    # Notificar al otro jugador que se desconectó
-                    await enviar_a_todos_en_sala(sala_id_real, {
-                        "tipo": "jugador_desconectado",
-                        "mensaje": f"El jugador {jugador} se ha desconectado"
-                    })
-                    print(f"⚠️  Jugador {jugador} desconectado de sala {sala_id_real}")
+            # Guardar su puesto durante la gracia (la sala se libera si no vuelve)
+            sala_id_real = liberar_jugador(jugador)
+            if sala_id_real:
+                await actores.ejecutar(sala_id_real, comando_desconexion, sala_id_real, jugador, conexion.token)
+    finally:
+        lobby.desuscribir(conexion)
+        emparejamiento.cancelar(jugador, conexion)
+        if sala_espectada:
+            await actores.ejecutar(sala_espectada, comando_dejar_de_espectar, conexion, sala_espectada)
+        conexion.cerrar()
+
+@app.get("/salas")
+async def listar_salas(request: Request, limite: int = LOBBY_LIMITE_POR_DEFECTO, cursor: Optional[int] = None):
+    """Instantánea del lobby para clientes que no necesitan suscribirse (admite If-None-Match)"""
+    cuerpo, etag = instantanea_lobby(limite, cursor)
+    cabeceras = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=cabeceras)
+    return Response(content=cuerpo, media_type="application/json", headers=cabeceras)
+
+@app.get("/bus")
+async def metricas_bus():
+    """Métricas del bus entre workers (latencia de entrega por sala, lotes, pendientes)"""
+    return bus.metricas()
+
+@app.get("/espectadores")
+async def metricas_espectadores():
+    """Métricas de la difusión a espectadores de este worker (tramas y entregas)"""
+    return espectadores.metricas()
+
+@app.get("/emparejamiento")
+async def metricas_emparejamiento():
+    """Jugadores en cola por variante y tramo, emparejamientos y espera media en este worker"""
+    return emparejamiento.metricas()
+
+@app.get("/diario")
+async def metricas_diario():
+    """Métricas del diario de salas (solo con TRES_EN_RAYA_DIARIO)"""
+    diario = getattr(sala_manager.almacen, "diario", None)
+    if diario is None:
+        return {"activo": False}
+    return {"activo": True, **diario.metricas()}
 
 # Ruta para favicon
 @app.get("/favicon.ico")
-async def favicon():
-    favicon_path = STATIC_DIR / "favicon.ico"
-    if favicon_path.exists():
-        return FileResponse(favicon_path)
+async def favicon(request: Request):
+    respuesta = assets.response(request, "favicon.ico")
+    if respuesta is not None:
+        return respuesta
     return RedirectResponse(url="/static/favicon.ico")
 
 # Ruta para archivos estáticos específicos
 @app.get("/{filename:path}")
-async def servir_archivo(filename: str):
+async def servir_archivo(request: Request, filename: str):
     """Servir archivos estáticos directamente"""
-    file_path = STATIC_DIR / filename
-    if file_path.exists() and file_path.is_file():
-        return FileResponse(file_path)
+    respuesta = assets.response(request, filename)
+    if respuesta is not None:
+        return respuesta
     return {"error": "Archivo no encontrado"}
 
 # --- INICIALIZACIÓN ---
@@ -530,8 +1345,8 @@ if not fallback_template.exists():
 </body>
 </html>""")
 
-print(f"✅ Juego '3-in-row' adaptado para el hub")
-print(f"📁 Directorio: {BASE_DIR}")
-print(f"🌐 Accesible en: /games/3-in-row")
-print(f"🔌 WebSocket: /games/3-in-row/ws/")
-print(f"📊 Estado: Listo para jugar")
+log.info("✅ Juego '3-in-row' adaptado para el hub")
+log.info("📁 Directorio: %s", BASE_DIR)
+log.info("🌐 Accesible en: /games/3-in-row")
+log.info("🔌 WebSocket: /games/3-in-row/ws/")
+log.info("📊 Estado: Listo para jugar (almacén %s, codec %s)", type(sala_manager.almacen).__name__, codec.NOMBRE)
@@ -0,0 +1,106 @@
+"""
+Ejecución serializada de comandos por sala
+
+Cada sala tiene un buzón de comandos que se ejecutan de uno en uno y en
+orden de llegada, aunque un comando haga `await`: un comando no empieza
+hasta que el anterior de la misma sala ha terminado. Las salas distintas
+avanzan en paralelo.
+
+Una sala solo tiene tarea mientras hay comandos pendientes; cuando el buzón
+se vacía, la tarea termina y el actor desaparece, así que las salas
+inactivas no cuestan nada. Como el estado de la sala solo se toca desde su
+actor, la lógica de un comando podría moverse más adelante a un hilo o a
+otro proceso sin cambiar a quien lo envía.
+"""
+import asyncio
+import inspect
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from hub_logging import get_logger
+
+log = get_logger("3-in-row.actores")
+
+Comando = Callable[..., Any]
+
+
+class ActorSala:
+    """Buzón de una sala y la tarea que lo está vaciando"""
+
+    __slots__ = ("sala_id", "buzon", "tarea")
+
+    def __init__(self, sala_id: str):
+        self.sala_id = sala_id
+        self.buzon: Deque[Tuple[Comando, tuple, asyncio.Future]] = deque()
+        self.tarea: Optional[asyncio.Task] = None
+
+
+class Actores:
+    """Actores de las salas con comandos pendientes"""
+
+    def __init__(self):
+        self._actores: Dict[str, ActorSala] = {}
+        self.total_comandos = 0
+
+    def ejecutar(self, sala_id: str, comando: Comando, *args) -> Awaitable:
+        """Encolar `comando(*args)` en la sala y devolver un futuro con su resultado.
+
+        El comando puede ser una función normal o una corrutina; sus
+        excepciones se propagan a quien espera el futuro.
+        """
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        actor = self._actores.get(sala_id)
+        if actor is None:
+            actor = self._actores[sala_id] = ActorSala(sala_id)
+        actor.buzon.append((comando, args, futuro))
+        if actor.tarea is None:
+            actor.tarea = loop.create_task(self._vaciar(actor))
+        return futuro
+
+    async def _vaciar(self, actor: ActorSala):
+        try:
+            while actor.buzon:
+                comando, args, futuro = actor.buzon.popleft()
+                if futuro.done():
+                    # Quien lo envió ya no espera el resultado (p. ej. se canceló)
+                    continue
+                self.total_comandos += 1
+                try:
+                    resultado = comando(*args)
+                    if inspect.isawaitable(resultado):
+                        resultado = await resultado
+                except asyncio.CancelledError:
+                    futuro.cancel()
+                    raise
+                except Exception as error:
+                    if not futuro.done():
+                        futuro.set_exception(error)
+                    else:
+                        log.exception("❌ Error en comando de sala", extra={"sala_id": actor.sala_id})
+                else:
+                    if not futuro.done():
+                        futuro.set_result(resultado)
+        finally:
+            actor.tarea = None
+            if actor.buzon:
+                # Cancelada con comandos pendientes: no dejar a nadie esperando
+                for _, _, futuro in actor.buzon:
+                    futuro.cancel()
+                actor.buzon.clear()
+            if self._actores.get(actor.sala_id) is actor:
+                del self._actores[actor.sala_id]
+
+    def pendientes(self) -> int:
+        """Comandos encolados en todas las salas"""
+        return sum(len(actor.buzon) for actor in self._actores.values())
+
+    def __len__(self) -> int:
+        return len(self._actores)
+
+    async def detener(self):
+        """Cancelar los actores activos (al apagar el servidor)"""
+        tareas = [actor.tarea for actor in self._actores.values() if actor.tarea is not None]
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
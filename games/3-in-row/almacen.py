@@ -0,0 +1,333 @@
+"""
+Almacenes de estado de las salas
+
+`AlmacenMemoria` guarda las salas en el proceso (un único worker).
+`AlmacenDiario` es el mismo almacén en memoria con un diario en disco (ver
+diario.py) para recuperar las salas al reiniciar; se activa indicando el
+directorio en TRES_EN_RAYA_DIARIO.
+`AlmacenSQLite` las guarda en una base SQLite en modo WAL compartida por
+todos los workers del mismo host, de modo que `uvicorn --workers N` ve las
+mismas salas desde cualquier proceso. Se elige con TRES_EN_RAYA_ALMACEN
+(memoria | sqlite) y la ruta de la base con TRES_EN_RAYA_SQLITE.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+from bisect import bisect_left, insort
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .diario import Diario
+from .sala import Sala
+from .temporizador import RuedaTemporizadores
+
+
+class AlmacenSalas:
+    """Interfaz de los almacenes de salas.
+
+    Las modificaciones se hacen dentro de `bloqueo()`: leer con `obtener`,
+    mutar la `Sala` y persistir con `guardar`. `vence` es el instante en que
+    la sala expira y `publica` si debe aparecer en el lobby.
+    """
+
+    def bloqueo(self):
+        raise NotImplementedError
+
+    def obtener(self, sala_id: str) -> Optional[Sala]:
+        raise NotImplementedError
+
+    def existe(self, sala_id: str) -> bool:
+        raise NotImplementedError
+
+    def insertar(self, sala: Sala, vence: float, publica: bool):
+        raise NotImplementedError
+
+    def guardar(self, sala: Sala, vence: float, publica: bool):
+        raise NotImplementedError
+
+    def eliminar(self, sala_id: str) -> Optional[Sala]:
+        raise NotImplementedError
+
+    def cambiar_espectadores(self, sala_id: str, cambio: int) -> Optional[Sala]:
+        """Sumar `cambio` a los espectadores de la sala sin tocar su vencimiento.
+
+        No es un cambio de la partida: no alarga la vida de una sala
+        abandonada ni se anota en el diario (tras reiniciar vuelven a contarse).
+        """
+        raise NotImplementedError
+
+    def listar_publicas(self, limite: int, cursor: Optional[int],
+                        creadas_desde: float) -> Tuple[List[Sala], Optional[int]]:
+        """Página de salas públicas creadas después de `creadas_desde`, en orden de creación"""
+        raise NotImplementedError
+
+    def expirar(self, ahora: float) -> List[Sala]:
+        """Eliminar y devolver las salas cuyo vencimiento ha pasado"""
+        raise NotImplementedError
+
+    def contar_por_estado(self) -> Dict[str, int]:
+        """Número de salas en cada estado (para métricas; puede recorrer todas las salas)"""
+        raise NotImplementedError
+
+    def cerrar(self):
+        """Liberar recursos al apagar el servidor"""
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class AlmacenMemoria(AlmacenSalas):
+    """Salas en un dict del proceso, con índice del lobby y rueda de expiración"""
+
+    def __init__(self, resolucion: float = 1.0):
+        self.salas: Dict[str, Sala] = {}
+        self.expiraciones = RuedaTemporizadores(resolucion=resolucion)
+        # Índice secundario de salas disponibles, ordenado por creación.
+        # Cada entrada es (secuencia, sala_id) para poder paginar con bisect.
+        self._lobby: List[Tuple[int, str]] = []
+        self._secuencias: Dict[str, int] = {}
+        self._siguiente_secuencia = 0
+
+    def bloqueo(self):
+        # Un solo proceso y un solo hilo: las operaciones ya son atómicas
+        return nullcontext()
+
+    def obtener(self, sala_id: str) -> Optional[Sala]:
+        return self.salas.get(sala_id)
+
+    def existe(self, sala_id: str) -> bool:
+        return sala_id in self.salas
+
+    def insertar(self, sala: Sala, vence: float, publica: bool):
+        self.salas[sala.id] = sala
+        self._secuencias[sala.id] = self._siguiente_secuencia
+        self._siguiente_secuencia += 1
+        self.guardar(sala, vence, publica)
+
+    def guardar(self, sala: Sala, vence: float, publica: bool):
+        # La sala ya está modificada en sitio: solo hay que actualizar los índices
+        self._actualizar_lobby(sala.id, publica)
+        self.expiraciones.programar(sala.id, vence)
+
+    def eliminar(self, sala_id: str) -> Optional[Sala]:
+        sala = self.salas.pop(sala_id, None)
+        if sala is not None:
+            self._actualizar_lobby(sala_id, False)
+            del self._secuencias[sala_id]
+            self.expiraciones.cancelar(sala_id)
+        return sala
+
+    def cambiar_espectadores(self, sala_id: str, cambio: int) -> Optional[Sala]:
+        sala = self.salas.get(sala_id)
+        if sala is not None:
+            sala.espectadores = max(0, sala.espectadores + cambio)
+        return sala
+
+    def _actualizar_lobby(self, sala_id: str, publica: bool):
+        entrada = (self._secuencias[sala_id], sala_id)
+        i = bisect_left(self._lobby, entrada)
+        presente = i < len(self._lobby) and self._lobby[i] == entrada
+
+        if publica and not presente:
+            insort(self._lobby, entrada)
+        elif presente and not publica:
+            del self._lobby[i]
+
+    def listar_publicas(self, limite: int, cursor: Optional[int],
+                        creadas_desde: float) -> Tuple[List[Sala], Optional[int]]:
+        # Retirar del frente del índice las salas demasiado antiguas
+        antiguas = 0
+        for _, sala_id in self._lobby:
+            if self.salas[sala_id].timestamp >= creadas_desde:
+                break
+            antiguas += 1
+        if antiguas:
+            del self._lobby[:antiguas]
+
+        inicio = 0 if cursor is None else bisect_left(self._lobby, (cursor + 1,))
+        pagina = self._lobby[inicio:inicio + limite]
+        siguiente_cursor = pagina[-1][0] if inicio + limite < len(self._lobby) else None
+        return [self.salas[sala_id] for _, sala_id in pagina], siguiente_cursor
+
+    def expirar(self, ahora: float) -> List[Sala]:
+        expiradas = []
+        for sala_id in self.expiraciones.avanzar(ahora):
+            sala = self.eliminar(sala_id)
+            if sala is not None:
+                expiradas.append(sala)
+        return expiradas
+
+    def contar_por_estado(self) -> Dict[str, int]:
+        return dict(Counter(sala.estado for sala in self.salas.values()))
+
+    def __len__(self) -> int:
+        return len(self.salas)
+
+
+class AlmacenDiario(AlmacenMemoria):
+    """Almacén en memoria que anota cada cambio en un diario y se reconstruye desde él al crearse"""
+
+    def __init__(self, directorio: str, resolucion: float = 1.0, sincronizar: bool = True,
+                 compactar_cada: Optional[int] = None):
+        super().__init__(resolucion=resolucion)
+        opciones = {} if compactar_cada is None else {"compactar_cada": compactar_cada}
+        diario = Diario(directorio, sincronizar=sincronizar, **opciones)
+        # Sin diario asignado todavía: lo recuperado no se vuelve a anotar.
+        # Las salas conservan su orden de creación (el del lobby).
+        self.diario: Optional[Diario] = None
+        for entrada in diario.recuperar():
+            sala = Sala.desde_registro(entrada["sala"])
+            # Los espectadores no sobreviven al reinicio: vuelven a contarse al reconectar
+            sala.espectadores = 0
+            self.insertar(sala, entrada["vence"], entrada["publica"])
+        diario.iniciar()
+        self.diario = diario
+
+    def guardar(self, sala: Sala, vence: float, publica: bool):
+        super().guardar(sala, vence, publica)
+        if self.diario is not None:
+            self.diario.anotar(sala.id, {"sala": sala.a_registro(), "vence": vence, "publica": publica})
+
+    def eliminar(self, sala_id: str) -> Optional[Sala]:
+        sala = super().eliminar(sala_id)
+        if sala is not None and self.diario is not None:
+            self.diario.anotar_baja(sala_id)
+        return sala
+
+    def cerrar(self):
+        self.diario.cerrar()
+
+
+def sala_a_registro(sala: Sala) -> str:
+    """Serializar la sala completa (incluido el tablero) para guardarla fuera del proceso"""
+    return json.dumps(sala.a_registro(), separators=(",", ":"))
+
+
+def sala_desde_registro(registro: str) -> Sala:
+    return Sala.desde_registro(json.loads(registro))
+
+
+class AlmacenSQLite(AlmacenSalas):
+    """Salas en SQLite (WAL) compartido por varios procesos del mismo host.
+
+    Cada modificación es una transacción BEGIN IMMEDIATE, que serializa las
+    escrituras entre workers; las lecturas no bloquean gracias a WAL. El
+    lobby y la expiración se resuelven con índices sobre (publica, seq) y
+    (vence), así que no hay recorridos completos.
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._db = sqlite3.connect(ruta, timeout=5.0, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS salas (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                datos TEXT NOT NULL,
+                publica INTEGER NOT NULL,
+                creada REAL NOT NULL,
+                vence REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS salas_lobby ON salas (publica, seq);
+            CREATE INDEX IF NOT EXISTS salas_vence ON salas (vence);
+        """)
+        self._profundidad = 0
+
+    @contextmanager
+    def bloqueo(self) -> Iterator[None]:
+        # Reentrante: solo la transacción más externa hace BEGIN/COMMIT
+        if self._profundidad == 0:
+            self._db.execute("BEGIN IMMEDIATE")
+        self._profundidad += 1
+        try:
+            yield
+        except BaseException:
+            self._profundidad -= 1
+            if self._profundidad == 0:
+                self._db.execute("ROLLBACK")
+            raise
+        self._profundidad -= 1
+        if self._profundidad == 0:
+            self._db.execute("COMMIT")
+
+    def obtener(self, sala_id: str) -> Optional[Sala]:
+        fila = self._db.execute("SELECT datos FROM salas WHERE id = ?", (sala_id,)).fetchone()
+        return sala_desde_registro(fila[0]) if fila else None
+
+    def existe(self, sala_id: str) -> bool:
+        return self._db.execute("SELECT 1 FROM salas WHERE id = ?", (sala_id,)).fetchone() is not None
+
+    def insertar(self, sala: Sala, vence: float, publica: bool):
+        self._db.execute(
+            "INSERT INTO salas (id, datos, publica, creada, vence) VALUES (?, ?, ?, ?, ?)",
+            (sala.id, sala_a_registro(sala), int(publica), sala.timestamp, vence),
+        )
+
+    def guardar(self, sala: Sala, vence: float, publica: bool):
+        self._db.execute(
+            "UPDATE salas SET datos = ?, publica = ?, vence = ? WHERE id = ?",
+            (sala_a_registro(sala), int(publica), vence, sala.id),
+        )
+
+    def eliminar(self, sala_id: str) -> Optional[Sala]:
+        with self.bloqueo():
+            sala = self.obtener(sala_id)
+            self._db.execute("DELETE FROM salas WHERE id = ?", (sala_id,))
+        return sala
+
+    def cambiar_espectadores(self, sala_id: str, cambio: int) -> Optional[Sala]:
+        with self.bloqueo():
+            self._db.execute(
+                "UPDATE salas SET datos = json_set(datos, '$.espectadores',"
+                " max(0, coalesce(json_extract(datos, '$.espectadores'), 0) + ?)) WHERE id = ?",
+                (cambio, sala_id),
+            )
+            return self.obtener(sala_id)
+
+    def listar_publicas(self, limite: int, cursor: Optional[int],
+                        creadas_desde: float) -> Tuple[List[Sala], Optional[int]]:
+        filas = self._db.execute(
+            "SELECT seq, datos FROM salas WHERE publica = 1 AND seq > ? AND creada >= ? "
+            "ORDER BY seq LIMIT ?",
+            (-1 if cursor is None else cursor, creadas_desde, limite + 1),
+        ).fetchall()
+        siguiente_cursor = filas[limite - 1][0] if len(filas) > limite else None
+        return [sala_desde_registro(datos) for _, datos in filas[:limite]], siguiente_cursor
+
+    def expirar(self, ahora: float) -> List[Sala]:
+        with self.bloqueo():
+            filas = self._db.execute("SELECT datos FROM salas WHERE vence <= ?", (ahora,)).fetchall()
+            if filas:
+                self._db.execute("DELETE FROM salas WHERE vence <= ?", (ahora,))
+        return [sala_desde_registro(datos) for (datos,) in filas]
+
+    def contar_por_estado(self) -> Dict[str, int]:
+        filas = self._db.execute(
+            "SELECT json_extract(datos, '$.estado'), COUNT(*) FROM salas GROUP BY 1"
+        ).fetchall()
+        return {estado: n for estado, n in filas}
+
+    def cerrar(self):
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM salas").fetchone()[0]
+
+
+def crear_almacen(resolucion: float = 1.0) -> AlmacenSalas:
+    """Almacén configurado por entorno (TRES_EN_RAYA_ALMACEN, TRES_EN_RAYA_SQLITE, TRES_EN_RAYA_DIARIO)"""
+    tipo = os.environ.get("TRES_EN_RAYA_ALMACEN", "memoria")
+    if tipo == "memoria":
+        directorio = os.environ.get("TRES_EN_RAYA_DIARIO")
+        if directorio:
+            sincronizar = os.environ.get("TRES_EN_RAYA_DIARIO_FSYNC", "1") == "1"
+            return AlmacenDiario(directorio, resolucion=resolucion, sincronizar=sincronizar)
+        return AlmacenMemoria(resolucion=resolucion)
+    if tipo == "sqlite":
+        ruta = os.environ.get("TRES_EN_RAYA_SQLITE") or os.path.join(tempfile.gettempdir(), "tres-en-raya.sqlite3")
+        return AlmacenSQLite(ruta)
+    raise RuntimeError(f"Almacén desconocido: {tipo} (usa 'memoria' o 'sqlite')")
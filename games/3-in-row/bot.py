@@ -0,0 +1,153 @@
+"""
+Rival automático para el 3 en raya clásico (3×3)
+
+El árbol completo del 3 en raya es pequeño: se resuelve una sola vez con
+minimax (negamax) memoizado y cada posición queda en una tabla de
+transposición junto con la puntuación de todas sus jugadas. Después, elegir
+una jugada es una búsqueda en un dict.
+
+Las posiciones se guardan en forma canónica: de las 8 simetrías del tablero
+(4 giros y sus reflejos) se usa la de menor codificación, así que las
+posiciones equivalentes comparten entrada. La clave es (casillas del que
+mueve, casillas del rival), lo que no depende de si empezó X u O.
+
+La dificultad se controla con aleatoriedad: con cierta probabilidad el bot
+juega una casilla libre cualquiera en lugar de una de las mejores.
+"""
+import random
+from typing import Dict, List, Optional, Tuple
+
+from .tablero import TABLERO_LLENO, Tablero, es_ganadora
+
+# Nombre con el que el bot ocupa su puesto en la sala
+NOMBRE_BOT = "🤖 Máquina"
+
+# Probabilidad de jugar una casilla al azar en lugar de una de las mejores
+DIFICULTADES: Dict[str, float] = {
+    "facil": 0.6,
+    "media": 0.25,
+    "dificil": 0.0,
+}
+DIFICULTAD_POR_DEFECTO = "media"
+
+
+def _simetrias() -> List[Tuple[int, ...]]:
+    """Las 8 simetrías del tablero como permutaciones: casilla -> casilla"""
+    def casilla(fila: int, columna: int) -> int:
+        return fila * 3 + columna
+
+    transformaciones = (
+        lambda f, c: (f, c),
+        lambda f, c: (c, 2 - f),
+        lambda f, c: (2 - f, 2 - c),
+        lambda f, c: (2 - c, f),
+        lambda f, c: (f, 2 - c),
+        lambda f, c: (2 - f, c),
+        lambda f, c: (c, f),
+        lambda f, c: (2 - c, 2 - f),
+    )
+    return [
+        tuple(casilla(*t(posicion // 3, posicion % 3)) for posicion in range(9))
+        for t in transformaciones
+    ]
+
+
+SIMETRIAS = _simetrias()
+# Casilla original para cada casilla de la posición transformada
+INVERSAS = [tuple(simetria.index(posicion) for posicion in range(9)) for simetria in SIMETRIAS]
+# Conjunto de casillas (9 bits) transformado por cada simetría, precalculado para los 512 valores
+_PERMUTAR = [
+    tuple(
+        sum(1 << simetria[posicion] for posicion in range(9) if bits >> posicion & 1)
+        for bits in range(1 << 9)
+    )
+    for simetria in SIMETRIAS
+]
+
+
+def canonica(mios: int, suyos: int) -> Tuple[int, int]:
+    """Clave canónica de la posición y la simetría que lleva a ella"""
+    mejor, mejor_simetria = None, 0
+    for indice, permutar in enumerate(_PERMUTAR):
+        clave = permutar[mios] << 9 | permutar[suyos]
+        if mejor is None or clave < mejor:
+            mejor, mejor_simetria = clave, indice
+    return mejor, mejor_simetria
+
+
+def _libres(mios: int, suyos: int) -> List[int]:
+    ocupadas = mios | suyos
+    return [posicion for posicion in range(9) if not ocupadas >> posicion & 1]
+
+
+class TablaTransposicion:
+    """Puntuación de cada jugada en cada posición canónica alcanzable.
+
+    Las puntuaciones son del punto de vista del que mueve: positivas si
+    gana, 0 si empata y negativas si pierde; ganar antes (o perder más
+    tarde) puntúa más.
+    """
+
+    def __init__(self):
+        # clave canónica -> ((casilla canónica, puntuación), ...)
+        self.jugadas: Dict[int, Tuple[Tuple[int, int], ...]] = {}
+        self._valores: Dict[int, int] = {}
+        self._valor(0, 0)
+
+    def _valor(self, mios: int, suyos: int) -> int:
+        # El rival acaba de mover: si ha hecho línea, quien mueve ha perdido
+        if es_ganadora(suyos):
+            return -(1 + len(_libres(mios, suyos)))
+        if (mios | suyos) == TABLERO_LLENO:
+            return 0
+
+        clave, simetria = canonica(mios, suyos)
+        valor = self._valores.get(clave)
+        if valor is not None:
+            return valor
+
+        # Resolver sobre la posición canónica para que las casillas guardadas sean canónicas
+        permutar = _PERMUTAR[simetria]
+        mios_c, suyos_c = permutar[mios], permutar[suyos]
+        puntuadas = tuple(
+            (posicion, -self._valor(suyos_c, mios_c | 1 << posicion))
+            for posicion in _libres(mios_c, suyos_c)
+        )
+        valor = max(puntuacion for _, puntuacion in puntuadas)
+        self.jugadas[clave] = puntuadas
+        self._valores[clave] = valor
+        return valor
+
+    def puntuar(self, mios: int, suyos: int) -> List[Tuple[int, int]]:
+        """Jugadas de la posición con su puntuación, en casillas del tablero real"""
+        clave, simetria = canonica(mios, suyos)
+        inversa = INVERSAS[simetria]
+        return [(inversa[posicion], puntuacion) for posicion, puntuacion in self.jugadas.get(clave, ())]
+
+    def __len__(self) -> int:
+        return len(self.jugadas)
+
+
+_tabla: Optional[TablaTransposicion] = None
+
+
+def tabla() -> TablaTransposicion:
+    """Tabla de transposición del proceso (se construye la primera vez que se pide)"""
+    global _tabla
+    if _tabla is None:
+        _tabla = TablaTransposicion()
+    return _tabla
+
+
+def elegir_jugada(tablero: Tablero, simbolo: str, dificultad: str = DIFICULTAD_POR_DEFECTO,
+                  azar: random.Random = random) -> Optional[int]:
+    """Casilla que juega el bot con `simbolo`, o None si no quedan casillas libres"""
+    mios = tablero.bits(simbolo)
+    suyos = tablero.bits("O" if simbolo == "X" else "X")
+    puntuadas = tabla().puntuar(mios, suyos)
+    if not puntuadas:
+        return None
+    if azar.random() < DIFICULTADES.get(dificultad, DIFICULTADES[DIFICULTAD_POR_DEFECTO]):
+        return azar.choice(puntuadas)[0]
+    mejor = max(puntuacion for _, puntuacion in puntuadas)
+    return azar.choice([posicion for posicion, puntuacion in puntuadas if puntuacion == mejor])
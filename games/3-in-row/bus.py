@@ -0,0 +1,326 @@
+"""
+Bus pub/sub entre workers para las difusiones de cada sala
+
+Con varios workers (almacén SQLite) los dos jugadores de una sala pueden
+estar conectados a procesos distintos. Cada worker se suscribe a las salas
+de sus jugadores locales y publica en el bus lo que difunde; un broker local
+sobre un socket Unix lo reenvía a los workers suscritos. No necesita ningún
+servicio externo: el primer worker que consigue el cerrojo hace de broker y,
+si muere, otro ocupa su lugar.
+
+Los mensajes se acumulan y se envían en lotes cada `intervalo_lote` segundos.
+Si se pierde la conexión con el broker, el worker reintenta con espera
+creciente (hasta `ESPERA_RECONEXION_MAXIMA`); mientras tanto guarda como
+mucho `SALIDA_MAXIMA` tramas y descarta las más antiguas. Las suscripciones
+no se encolan sin conexión: se vuelven a declarar todas al reconectar.
+"""
+import asyncio
+import fcntl
+import os
+import struct
+import tempfile
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Set
+
+from hub_logging import get_logger
+
+log = get_logger("3-in-row.bus")
+
+# Operaciones del protocolo
+SUSCRIBIR = b"S"
+DESUSCRIBIR = b"U"
+PUBLICAR = b"P"
+
+# op, longitud del tema, instante de publicación, longitud del mensaje
+CABECERA = struct.Struct("!cHdI")
+
+# Bytes pendientes de envío a un worker a partir de los cuales se le desconecta
+BUFFER_MAXIMO = 8 * 1024 * 1024
+# Tramas que un worker guarda para el broker mientras no puede enviarlas
+SALIDA_MAXIMA = 50_000
+# Segundos de espera entre intentos de reconexión al bus (se duplica en cada fallo)
+ESPERA_RECONEXION = 0.05
+ESPERA_RECONEXION_MAXIMA = 2.0
+
+
+def _trama(op: bytes, tema: str, texto: str = "", instante: float = 0.0) -> bytes:
+    tema_b = tema.encode()
+    texto_b = texto.encode()
+    return CABECERA.pack(op, len(tema_b), instante, len(texto_b)) + tema_b + texto_b
+
+
+async def _leer_trama(reader: asyncio.StreamReader):
+    op, largo_tema, instante, largo_texto = CABECERA.unpack(await reader.readexactly(CABECERA.size))
+    cuerpo = await reader.readexactly(largo_tema + largo_texto)
+    return op, cuerpo[:largo_tema].decode(), instante, cuerpo[largo_tema:].decode()
+
+
+class BusLocal:
+    """Un solo proceso: no hay otros workers a los que entregar"""
+
+    def __init__(self):
+        self.al_recibir: Optional[Callable[[str, str], None]] = None
+
+    async def iniciar(self):
+        pass
+
+    async def detener(self):
+        pass
+
+    def suscribir(self, tema: str):
+        pass
+
+    def desuscribir(self, tema: str):
+        pass
+
+    def publicar(self, tema: str, texto: str):
+        pass
+
+    def metricas(self) -> Dict:
+        return {"tipo": "local"}
+
+
+class BrokerUnix:
+    """Reenvía cada publicación a los demás workers suscritos a su tema"""
+
+    def __init__(self, ruta: str, intervalo_lote: float):
+        self.ruta = ruta
+        self.intervalo_lote = intervalo_lote
+        self._suscriptores: Dict[str, Set[asyncio.StreamWriter]] = {}
+        self._temas: Dict[asyncio.StreamWriter, Set[str]] = {}
+        self._pendiente: Dict[asyncio.StreamWriter, bytearray] = {}
+        self._servidor = None
+        self._tarea_lote = None
+
+    async def iniciar(self):
+        if os.path.exists(self.ruta):
+            os.unlink(self.ruta)  # socket huérfano de un broker anterior
+        self._servidor = await asyncio.start_unix_server(self._atender, path=self.ruta)
+        self._tarea_lote = asyncio.create_task(self._vaciar_periodicamente())
+
+    async def detener(self):
+        if self._tarea_lote:
+            self._tarea_lote.cancel()
+        if self._servidor:
+            self._servidor.close()
+        for writer in list(self._temas):
+            writer.close()
+
+    async def _atender(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._temas[writer] = set()
+        self._pendiente[writer] = bytearray()
+        try:
+            while True:
+                op, tema, instante, texto = await _leer_trama(reader)
+                if op == SUSCRIBIR:
+                    self._suscriptores.setdefault(tema, set()).add(writer)
+                    self._temas[writer].add(tema)
+                elif op == DESUSCRIBIR:
+                    self._quitar(writer, tema)
+                elif op == PUBLICAR:
+                    trama = _trama(PUBLICAR, tema, texto, instante)
+                    for destino in self._suscriptores.get(tema, ()):
+                        if destino is not writer:
+                            self._pendiente[destino] += trama
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for tema in list(self._temas.pop(writer, ())):
+                self._quitar(writer, tema)
+            self._pendiente.pop(writer, None)
+            writer.close()
+
+    def _quitar(self, writer: asyncio.StreamWriter, tema: str):
+        self._temas.get(writer, set()).discard(tema)
+        suscriptores = self._suscriptores.get(tema)
+        if suscriptores is not None:
+            suscriptores.discard(writer)
+            if not suscriptores:
+                del self._suscriptores[tema]
+
+    async def _vaciar_periodicamente(self):
+        while True:
+            await asyncio.sleep(self.intervalo_lote)
+            for writer, pendiente in list(self._pendiente.items()):
+                if not pendiente:
+                    continue
+                if writer.transport.get_write_buffer_size() > BUFFER_MAXIMO:
+                    log.warning("🐢 Worker saturado en el bus, desconectando")
+                    writer.close()
+                    continue
+                writer.write(bytes(pendiente))
+                pendiente.clear()
+
+
+class BusUnix:
+    """Cliente del bus en cada worker; uno de ellos aloja además el broker"""
+
+    def __init__(self, ruta: str, intervalo_lote: float = 0.002, salida_maxima: int = SALIDA_MAXIMA):
+        self.ruta = ruta
+        self.intervalo_lote = intervalo_lote
+        self.al_recibir: Optional[Callable[[str, str], None]] = None
+        self._referencias: Dict[str, int] = {}
+        self._salida: Deque[bytes] = deque(maxlen=salida_maxima)
+        self._conectado = False
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._broker: Optional[BrokerUnix] = None
+        self._cerrojo = None
+        self._tareas: List[asyncio.Task] = []
+        # Métricas: tema -> [mensajes, suma de latencias, latencia máxima]
+        self._latencias: Dict[str, List[float]] = {}
+        self.lotes_enviados = 0
+        self.mensajes_enviados = 0
+        self.mensajes_recibidos = 0
+        self.reconexiones = 0
+        self.reconexiones_fallidas = 0
+        self.tramas_descartadas = 0
+
+    async def iniciar(self):
+        await self._conectar()
+        self._tareas = [
+            asyncio.create_task(self._vaciar_periodicamente()),
+            asyncio.create_task(self._leer()),
+        ]
+
+    async def detener(self):
+        for tarea in self._tareas:
+            tarea.cancel()
+        if self._writer:
+            self._writer.close()
+        if self._broker:
+            await self._broker.detener()
+
+    async def _conectar(self):
+        # Elección de broker: quien consigue el cerrojo del fichero lo aloja
+        if self._broker is None:
+            cerrojo = open(self.ruta + ".lock", "w")
+            try:
+                fcntl.flock(cerrojo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                cerrojo.close()
+            else:
+                self._cerrojo = cerrojo
+                self._broker = BrokerUnix(self.ruta, self.intervalo_lote)
+                await self._broker.iniciar()
+                log.info("📡 Broker del bus iniciado en %s (pid %d)", self.ruta, os.getpid())
+
+        for _ in range(100):
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.ruta)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                await asyncio.sleep(0.05)
+        else:
+            raise RuntimeError(f"No se pudo conectar al bus en {self.ruta}")
+
+        # Tras (re)conectar hay que volver a declarar las suscripciones
+        for tema in self._referencias:
+            self._writer.write(_trama(SUSCRIBIR, tema))
+        self._conectado = True
+
+    def _encolar(self, trama: bytes):
+        if len(self._salida) == self._salida.maxlen:
+            self.tramas_descartadas += 1
+        self._salida.append(trama)
+
+    def suscribir(self, tema: str):
+        self._referencias[tema] = self._referencias.get(tema, 0) + 1
+        if self._referencias[tema] == 1 and self._conectado:
+            self._encolar(_trama(SUSCRIBIR, tema))
+
+    def desuscribir(self, tema: str):
+        referencias = self._referencias.get(tema, 0) - 1
+        if referencias > 0:
+            self._referencias[tema] = referencias
+            return
+        self._referencias.pop(tema, None)
+        self._latencias.pop(tema, None)
+        if self._conectado:
+            self._encolar(_trama(DESUSCRIBIR, tema))
+
+    def publicar(self, tema: str, texto: str):
+        self._encolar(_trama(PUBLICAR, tema, texto, time.time()))
+        self.mensajes_enviados += 1
+
+    async def _vaciar_periodicamente(self):
+        while True:
+            await asyncio.sleep(self.intervalo_lote)
+            if self._salida and self._conectado and not self._writer.is_closing():
+                self._writer.write(b"".join(self._salida))
+                self._salida.clear()
+                self.lotes_enviados += 1
+
+    async def _reconectar(self):
+        """Nueva elección y conexión al broker, reintentando hasta conseguirlo"""
+        self._conectado = False
+        if self._writer:
+            self._writer.close()
+        self.reconexiones += 1
+        espera = ESPERA_RECONEXION
+        while True:
+            await asyncio.sleep(espera)
+            try:
+                await self._conectar()
+                return
+            except Exception:
+                self.reconexiones_fallidas += 1
+                espera = min(espera * 2, ESPERA_RECONEXION_MAXIMA)
+                log.exception("❌ Error reconectando al bus (reintento en %.2f s)", espera)
+
+    async def _leer(self):
+        while True:
+            try:
+                op, tema, instante, texto = await _leer_trama(self._reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                # El broker ha caído o nos ha desconectado: nueva elección
+                await self._reconectar()
+                continue
+
+            if op != PUBLICAR:
+                continue
+            self.mensajes_recibidos += 1
+            latencia = time.time() - instante
+            estadistica = self._latencias.setdefault(tema, [0, 0.0, 0.0])
+            estadistica[0] += 1
+            estadistica[1] += latencia
+            estadistica[2] = max(estadistica[2], latencia)
+            if self.al_recibir:
+                self.al_recibir(tema, texto)
+
+    def metricas(self, temas: int = 20) -> Dict:
+        """Resumen para detectar saturación: volumen, lotes y latencia de entrega por tema"""
+        peores = sorted(self._latencias.items(), key=lambda item: item[1][2], reverse=True)[:temas]
+        return {
+            "tipo": "unix",
+            "broker": self._broker is not None,
+            "suscripciones": len(self._referencias),
+            "mensajes_enviados": self.mensajes_enviados,
+            "mensajes_recibidos": self.mensajes_recibidos,
+            "lotes_enviados": self.lotes_enviados,
+            "conectado": self._conectado,
+            "tramas_pendientes": len(self._salida),
+            "tramas_descartadas": self.tramas_descartadas,
+            "reconexiones": self.reconexiones,
+            "reconexiones_fallidas": self.reconexiones_fallidas,
+            "latencia_por_tema": {
+                tema: {
+                    "mensajes": n,
+                    "media_ms": round(suma / n * 1000, 3),
+                    "max_ms": round(maximo * 1000, 3),
+                }
+                for tema, (n, suma, maximo) in peores
+            },
+        }
+
+
+def crear_bus(multiproceso: bool):
+    """Bus configurado por entorno (TRES_EN_RAYA_BUS=local|unix, TRES_EN_RAYA_BUS_RUTA)"""
+    tipo = os.environ.get("TRES_EN_RAYA_BUS", "unix" if multiproceso else "local")
+    if tipo == "local":
+        return BusLocal()
+    if tipo == "unix":
+        ruta = os.environ.get("TRES_EN_RAYA_BUS_RUTA") or os.path.join(tempfile.gettempdir(), "tres-en-raya-bus.sock")
+        return BusUnix(ruta)
+    raise RuntimeError(f"Bus desconocido: {tipo} (usa 'local' o 'unix')")
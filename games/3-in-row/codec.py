@@ -0,0 +1,65 @@
+"""
+Codificación JSON del protocolo WebSocket
+
+Usa orjson o msgspec si están instalados y la biblioteca estándar si no. Se
+puede forzar uno concreto con TRES_EN_RAYA_CODEC=json|orjson|msgspec.
+"""
+import json
+import os
+from typing import Any, Callable, Dict, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+
+def _dumps_json(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+CODECS: Dict[str, Tuple[Callable[[Any], str], Callable[[str], Any]]] = {
+    "json": (_dumps_json, json.loads),
+}
+
+if orjson is not None:
+    CODECS["orjson"] = (lambda obj: orjson.dumps(obj).decode(), orjson.loads)
+
+if msgspec is not None:
+    _encoder = msgspec.json.Encoder()
+    _decoder = msgspec.json.Decoder()
+    CODECS["msgspec"] = (lambda obj: _encoder.encode(obj).decode(), _decoder.decode)
+
+
+def _elegir_codec() -> str:
+    preferido = os.environ.get("TRES_EN_RAYA_CODEC")
+    if preferido:
+        if preferido not in CODECS:
+            raise RuntimeError(f"Codec '{preferido}' no disponible. Disponibles: {', '.join(CODECS)}")
+        return preferido
+    for nombre in ("orjson", "msgspec", "json"):
+        if nombre in CODECS:
+            return nombre
+
+
+NOMBRE = _elegir_codec()
+dumps, loads = CODECS[NOMBRE]
+
+
+def componer(mensaje: Dict[str, Any], **fragmentos: str) -> str:
+    """Codificar `mensaje` insertando campos que ya vienen codificados.
+
+    Permite reutilizar, p. ej., la sala serializada en varios mensajes sin
+    volver a codificarla.
+    """
+    texto = dumps(mensaje)
+    if not fragmentos:
+        return texto
+    extra = ",".join(f"{dumps(clave)}:{valor}" for clave, valor in fragmentos.items())
+    separador = "," if len(texto) > 2 else ""
+    return f"{texto[:-1]}{separador}{extra}}}"
@@ -0,0 +1,215 @@
+"""
+Diario de salas en disco para recuperar las partidas tras un reinicio
+
+Cada cambio de una sala (creación, unión, jugada, reinicio, salida) se anota
+con la imagen de la sala después del cambio, su vencimiento y si es pública;
+cada baja, con su id. Se guardan imágenes y no los comandos porque varios
+comandos tienen azar (turno inicial, sorteo de símbolos, jugadas del bot) y
+repetirlos no reproduciría el mismo estado.
+
+Las anotaciones se encolan desde el bucle de eventos y un hilo escritor las
+codifica y escribe por lotes: todo lo que se haya acumulado mientras se
+escribía el lote anterior va en una sola escritura y un solo fsync (group
+commit), así que una jugada nunca espera al disco.
+
+El hilo mantiene además la última línea de cada sala viva. Cada
+`compactar_cada` anotaciones vuelca esas líneas a una instantánea (escrita
+aparte y renombrada de forma atómica) y vacía el diario, de modo que el
+tamaño en disco y el tiempo de recuperación quedan acotados. Al arrancar se
+carga la instantánea y se aplican las anotaciones posteriores.
+
+Ficheros en el directorio del diario:
+    instantanea.jsonl   {"seq": N} y después una línea por sala viva
+    diario.log          {"seq": n, "id": ..., "entrada": {...}} o {"seq": n, "id": ..., "baja": 1}
+"""
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import codec
+from hub_logging import get_logger
+
+log = get_logger("3-in-row.diario")
+
+# Anotaciones entre dos instantáneas
+COMPACTAR_CADA = 50_000
+# Anotaciones máximas por escritura
+LOTE_MAXIMO = 2_000
+
+_FIN = object()
+
+
+class Diario:
+    """Registro de solo anexado de las salas, con instantáneas y compactación"""
+
+    def __init__(self, directorio: str, compactar_cada: int = COMPACTAR_CADA,
+                 sincronizar: bool = True, lote_maximo: int = LOTE_MAXIMO):
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.ruta_diario = self.directorio / "diario.log"
+        self.ruta_instantanea = self.directorio / "instantanea.jsonl"
+        self.compactar_cada = compactar_cada
+        self.sincronizar = sincronizar
+        self.lote_maximo = lote_maximo
+
+        self._cola: queue.SimpleQueue = queue.SimpleQueue()
+        self._hilo: Optional[threading.Thread] = None
+        self._fichero = None
+        # Solo los toca el hilo escritor (y `recuperar`, antes de arrancarlo)
+        self._vivas: Dict[str, str] = {}
+        self.seq = 0
+        self._desde_instantanea = 0
+
+        # Estadísticas
+        self.total_anotaciones = 0
+        self.total_lotes = 0
+        self.total_instantaneas = 0
+        self.segundos_recuperacion = 0.0
+
+    # --- Recuperación ---
+
+    def recuperar(self) -> List[Dict]:
+        """Cargar la instantánea y aplicar el diario; devuelve las entradas de las salas vivas"""
+        inicio = time.perf_counter()
+        seq_instantanea = 0
+        if self.ruta_instantanea.exists():
+            with open(self.ruta_instantanea, encoding="utf-8") as fichero:
+                cabecera = fichero.readline()
+                if cabecera:
+                    seq_instantanea = codec.loads(cabecera)["seq"]
+                for linea in fichero:
+                    entrada = codec.loads(linea)
+                    self._vivas[entrada["sala"]["id"]] = linea.rstrip("\n")
+        self.seq = seq_instantanea
+
+        aplicadas = 0
+        if self.ruta_diario.exists():
+            with open(self.ruta_diario, "rb+") as fichero:
+                valido = 0
+                for linea in fichero:
+                    try:
+                        if not linea.endswith(b"\n"):
+                            raise ValueError("línea sin terminar")
+                        anotacion = codec.loads(linea)
+                    except ValueError:
+                        # Última línea a medio escribir cuando se cayó el proceso: se corta
+                        # para que las anotaciones nuevas no queden detrás de ella
+                        log.warning("⚠️  Línea incompleta al final del diario, se descarta")
+                        fichero.truncate(valido)
+                        break
+                    valido += len(linea)
+                    if anotacion["seq"] <= seq_instantanea:
+                        # Ya incluida en la instantánea (caída entre instantánea y vaciado)
+                        continue
+                    if anotacion.get("baja"):
+                        self._vivas.pop(anotacion["id"], None)
+                    else:
+                        self._vivas[anotacion["id"]] = codec.dumps(anotacion["entrada"])
+                    self.seq = anotacion["seq"]
+                    aplicadas += 1
+        self._desde_instantanea = aplicadas
+
+        entradas = [codec.loads(texto) for texto in self._vivas.values()]
+        self.segundos_recuperacion = time.perf_counter() - inicio
+        log.info("💾 Diario recuperado: %d salas (instantánea hasta %d + %d anotaciones) en %.1f ms",
+                 len(entradas), seq_instantanea, aplicadas, self.segundos_recuperacion * 1000)
+        return entradas
+
+    # --- Escritura ---
+
+    def iniciar(self):
+        self._fichero = open(self.ruta_diario, "a", encoding="utf-8")
+        self._hilo = threading.Thread(target=self._escribir, name="diario-salas", daemon=True)
+        self._hilo.start()
+
+    def anotar(self, sala_id: str, entrada: Dict):
+        """Imagen de la sala tras un cambio: {"sala": registro, "vence": ..., "publica": ...}.
+
+        La entrada no debe modificarse después (se codifica en el hilo escritor).
+        """
+        self._cola.put((sala_id, entrada))
+
+    def anotar_baja(self, sala_id: str):
+        self._cola.put((sala_id, None))
+
+    def _escribir(self):
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < self.lote_maximo:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            fin = any(anotacion is _FIN for anotacion in lote)
+            try:
+                self._escribir_lote([anotacion for anotacion in lote if anotacion is not _FIN])
+                if fin or self._desde_instantanea >= self.compactar_cada:
+                    self._compactar()
+            except Exception:
+                log.exception("❌ Error escribiendo el diario de salas")
+            if fin:
+                self._fichero.close()
+                return
+
+    def _escribir_lote(self, lote: List[Tuple[str, Optional[Dict]]]):
+        if not lote:
+            return
+        lineas = []
+        for sala_id, entrada in lote:
+            self.seq += 1
+            id_codificado = codec.dumps(sala_id)
+            if entrada is None:
+                self._vivas.pop(sala_id, None)
+                lineas.append(f'{{"seq":{self.seq},"id":{id_codificado},"baja":1}}\n')
+            else:
+                texto = codec.dumps(entrada)
+                self._vivas[sala_id] = texto
+                lineas.append(f'{{"seq":{self.seq},"id":{id_codificado},"entrada":{texto}}}\n')
+        self._fichero.write("".join(lineas))
+        self._fichero.flush()
+        if self.sincronizar:
+            os.fsync(self._fichero.fileno())
+        self._desde_instantanea += len(lote)
+        self.total_anotaciones += len(lote)
+        self.total_lotes += 1
+
+    def _compactar(self):
+        """Escribir la instantánea de las salas vivas y vaciar el diario"""
+        temporal = self.ruta_instantanea.with_suffix(".tmp")
+        with open(temporal, "w", encoding="utf-8") as fichero:
+            fichero.write(codec.dumps({"seq": self.seq}) + "\n")
+            for texto in self._vivas.values():
+                fichero.write(texto + "\n")
+            fichero.flush()
+            os.fsync(fichero.fileno())
+        os.replace(temporal, self.ruta_instantanea)
+
+        self._fichero.close()
+        self._fichero = open(self.ruta_diario, "w", encoding="utf-8")
+        self._desde_instantanea = 0
+        self.total_instantaneas += 1
+        log.info("💾 Instantánea del diario: %d salas (seq %d)", len(self._vivas), self.seq)
+
+    def cerrar(self):
+        """Escribir lo pendiente, dejar una instantánea y parar el hilo"""
+        if self._hilo is not None:
+            self._cola.put(_FIN)
+            self._hilo.join()
+            self._hilo = None
+
+    def metricas(self) -> Dict:
+        return {
+            "seq": self.seq,
+            "salas": len(self._vivas),
+            "anotaciones": self.total_anotaciones,
+            "lotes": self.total_lotes,
+            "anotaciones_por_lote": round(self.total_anotaciones / self.total_lotes, 2) if self.total_lotes else 0,
+            "instantaneas": self.total_instantaneas,
+            "desde_instantanea": self._desde_instantanea,
+            "bytes_diario": self.ruta_diario.stat().st_size if self.ruta_diario.exists() else 0,
+            "recuperacion_ms": round(self.segundos_recuperacion * 1000, 1),
+        }
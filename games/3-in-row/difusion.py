@@ -0,0 +1,121 @@
+"""
+Envío de mensajes por WebSocket sin bloqueo de cabeza de línea
+
+Cada conexión tiene una cola de salida acotada y una tarea escritora propia,
+de modo que un socket lento nunca retrasa al resto de la sala ni al bucle de
+recepción de quien difunde.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Deque, Optional, Tuple
+
+from fastapi import WebSocket
+
+from hub_logging import get_logger
+
+from . import codec
+from .metricas import metricas
+
+log = get_logger("3-in-row.difusion")
+
+# Mensajes pendientes máximos por conexión antes de considerarla lenta
+COLA_MAXIMA = 64
+# Segundos máximos para entregar un mensaje a un socket
+TIMEOUT_ENVIO = 5.0
+# Código de cierre para clientes que no consumen a tiempo (Try Again Later)
+CIERRE_CLIENTE_LENTO = 1013
+
+
+class Conexion:
+    """WebSocket con cola de salida acotada y tarea escritora.
+
+    Los mensajes con `fusion` (p. ej. un estado completo) sustituyen a uno
+    pendiente con la misma clave en lugar de acumularse. Si la cola se llena
+    igualmente, el cliente se desconecta.
+    """
+
+    def __init__(self, websocket: WebSocket, jugador: str,
+                 cola_maxima: int = COLA_MAXIMA, timeout_envio: float = TIMEOUT_ENVIO):
+        self.websocket = websocket
+        self.jugador = jugador
+        self.cola_maxima = cola_maxima
+        self.timeout_envio = timeout_envio
+        self.cerrada = False
+        self.lenta = False
+        # Token de sesión del puesto que ocupa esta conexión (al crear, unirse o reanudar)
+        self.token: Optional[str] = None
+        # (clave de fusión, texto, instante en que se encoló)
+        self._pendientes: Deque[Tuple[Optional[str], str, float]] = deque()
+        self._hay_datos = asyncio.Event()
+        self._codigo_cierre: Optional[int] = None
+        self._tarea = asyncio.create_task(self._escribir())
+
+    @property
+    def pendientes(self) -> int:
+        return len(self._pendientes)
+
+    def encolar(self, texto: str, fusion: Optional[str] = None) -> bool:
+        """Encolar un mensaje ya serializado sin esperar. Devuelve False si se descartó"""
+        if self.cerrada:
+            return False
+
+        if fusion is not None:
+            for i, (clave, _, _) in enumerate(self._pendientes):
+                if clave == fusion:
+                    self._pendientes[i] = (fusion, texto, time.perf_counter())
+                    return True
+
+        if len(self._pendientes) >= self.cola_maxima:
+            log.warning("🐢 Cliente lento: %d mensajes pendientes, desconectando", len(self._pendientes),
+                        extra={"jugador": self.jugador})
+            self.lenta = True
+            metricas.send_failure("cola_llena")
+            self.cerrar(CIERRE_CLIENTE_LENTO)
+            return False
+
+        self._pendientes.append((fusion, texto, time.perf_counter()))
+        self._hay_datos.set()
+        return True
+
+    def enviar(self, mensaje: dict, fusion: Optional[str] = None) -> bool:
+        return self.encolar(codec.dumps(mensaje), fusion)
+
+    def cerrar(self, codigo: Optional[int] = None):
+        """Dejar de enviar. Con `codigo` se cierra también el socket desde la tarea escritora"""
+        if self.cerrada:
+            return
+        self.cerrada = True
+        self._codigo_cierre = codigo
+        self._pendientes.clear()
+        self._hay_datos.set()
+
+    async def _escribir(self):
+        try:
+            while True:
+                await self._hay_datos.wait()
+                while self._pendientes and not self.cerrada:
+                    _, texto, encolado = self._pendientes.popleft()
+                    await asyncio.wait_for(self.websocket.send_text(texto), self.timeout_envio)
+                    metricas.broadcast_latency.observe(time.perf_counter() - encolado)
+                if self.cerrada:
+                    break
+                self._hay_datos.clear()
+        except asyncio.TimeoutError:
+            if not self.cerrada:
+                log.warning("⏱️  Envío superó %ss, desconectando", self.timeout_envio, extra={"jugador": self.jugador})
+                self.lenta = True
+                metricas.send_failure("timeout")
+                self.cerrar(CIERRE_CLIENTE_LENTO)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.debug("Error enviando: %s", e, extra={"jugador": self.jugador})
+            metricas.send_failure("error")
+            self.cerrar()
+
+        if self._codigo_cierre is not None:
+            try:
+                await asyncio.wait_for(self.websocket.close(code=self._codigo_cierre), self.timeout_envio)
+            except Exception:
+                pass
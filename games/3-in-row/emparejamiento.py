@@ -0,0 +1,131 @@
+"""
+Emparejamiento automático: colas de jugadores que buscan partida
+
+En lugar de crear una sala y esperar en el lobby, el jugador pide
+`buscar_partida` y entra en la cola de su variante. Si ya hay alguien
+esperando, se emparejan al momento (se saca el primero de la cola, O(1)) y
+el servidor les crea una sala que empieza ya en `jugando`; si no, espera a
+que llegue el siguiente. Nunca queda una sala en `esperando` ni pasa nada
+por el lobby.
+
+Con `puntuacion` la cola es la del tramo de esa puntuación
+(`ANCHO_TRAMO` puntos por tramo) y se busca rival en el mismo tramo y en
+los dos vecinos; sin ella, en la cola general de la variante.
+
+Cada cola es un OrderedDict jugador -> espera: sacar el primero, añadir al
+final y cancelar una búsqueda son O(1). Las esperas cuya conexión se ha
+cerrado se descartan al sacarlas. Las colas son de cada worker.
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .difusion import Conexion
+
+# Puntos de cada tramo de puntuación
+ANCHO_TRAMO = 200
+
+ClaveCola = Tuple[str, Optional[int]]
+
+
+class Espera:
+    """Un jugador en cola: su conexión, su tramo y desde cuándo espera"""
+
+    __slots__ = ("jugador", "conexion", "variante", "tramo", "desde")
+
+    def __init__(self, jugador: str, conexion: Conexion, variante: str, tramo: Optional[int]):
+        self.jugador = jugador
+        self.conexion = conexion
+        self.variante = variante
+        self.tramo = tramo
+        self.desde = time.monotonic()
+
+
+class ColaEmparejamiento:
+    """Colas de espera por (variante, tramo de puntuación)"""
+
+    def __init__(self, ancho_tramo: int = ANCHO_TRAMO):
+        self.ancho_tramo = ancho_tramo
+        self._colas: Dict[ClaveCola, "OrderedDict[str, Espera]"] = {}
+        # jugador -> clave de la cola en la que espera
+        self._esperando: Dict[str, ClaveCola] = {}
+
+        # Estadísticas
+        self.total_emparejados = 0
+        self.segundos_espera = 0.0
+
+    def buscar(self, jugador: str, conexion: Conexion, variante: str,
+               puntuacion: Optional[int] = None) -> Optional[Espera]:
+        """Emparejar al jugador con quien lleve más tiempo esperando en su cola (o las vecinas).
+
+        Devuelve la espera del rival, o None si el jugador se queda en cola.
+        Si ya estaba en cola, su búsqueda anterior se sustituye.
+        """
+        self.cancelar(jugador)
+        tramo = None if puntuacion is None else puntuacion // self.ancho_tramo
+        candidatas = [(variante, tramo)]
+        if tramo is not None:
+            candidatas += [(variante, tramo - 1), (variante, tramo + 1)]
+
+        for clave in candidatas:
+            rival = self._sacar(clave)
+            if rival is not None:
+                self.total_emparejados += 1
+                self.segundos_espera += time.monotonic() - rival.desde
+                return rival
+
+        clave = (variante, tramo)
+        cola = self._colas.get(clave)
+        if cola is None:
+            cola = self._colas[clave] = OrderedDict()
+        cola[jugador] = Espera(jugador, conexion, variante, tramo)
+        self._esperando[jugador] = clave
+        return None
+
+    def _sacar(self, clave: ClaveCola) -> Optional[Espera]:
+        """Primera espera de la cola con la conexión abierta"""
+        cola = self._colas.get(clave)
+        while cola:
+            _, espera = cola.popitem(last=False)
+            del self._esperando[espera.jugador]
+            if not espera.conexion.cerrada:
+                if not cola:
+                    del self._colas[clave]
+                return espera
+        self._colas.pop(clave, None)
+        return None
+
+    def cancelar(self, jugador: str, conexion: Optional[Conexion] = None) -> bool:
+        """Sacar al jugador de la cola (solo si espera con `conexion`, cuando se indica).
+
+        Devuelve si estaba esperando.
+        """
+        clave = self._esperando.get(jugador)
+        if clave is None:
+            return False
+        cola = self._colas[clave]
+        if conexion is not None and cola[jugador].conexion is not conexion:
+            return False
+        del self._esperando[jugador]
+        del cola[jugador]
+        if not cola:
+            del self._colas[clave]
+        return True
+
+    def esperando(self, jugador: str) -> bool:
+        return jugador in self._esperando
+
+    def __len__(self) -> int:
+        return len(self._esperando)
+
+    def metricas(self) -> Dict:
+        return {
+            "esperando": len(self._esperando),
+            "colas": {
+                f"{variante}:{'-' if tramo is None else tramo}": len(cola)
+                for (variante, tramo), cola in self._colas.items()
+            },
+            "emparejados": self.total_emparejados,
+            "espera_media_ms": round(self.segundos_espera / self.total_emparejados * 1000, 1)
+            if self.total_emparejados else 0,
+        }
@@ -0,0 +1,119 @@
+"""
+Espectadores de las salas: difusión de solo lectura separada de los jugadores
+
+Los jugadores reciben cada mensaje en cuanto se produce (ver
+`enviar_a_todos_en_sala`); a los espectadores solo se les avisa de que la
+sala ha cambiado. Los avisos se acumulan durante `VENTANA_ESPECTADORES`
+segundos y después, por cada sala cambiada, se codifica una sola trama con
+el estado completo que comparten todos sus espectadores.
+
+Cada trama sustituye a la que un espectador tuviera aún sin enviar (fusión
+en su `Conexion`), así que un espectador lento se salta estados intermedios
+en lugar de acumularlos y nunca pasa de una trama pendiente. Como son
+estados completos y no deltas, saltarse tramas no rompe nada.
+
+El reparto se hace en una tarea propia y cede el bucle cada
+`LOTE_ESPECTADORES` conexiones: una sala con miles de espectadores no
+retrasa las jugadas de nadie. Las salas marcadas mientras tanto esperan a
+la ventana siguiente.
+
+El difusor solo quita espectadores cuando se lo pide `desuscribir`: las
+conexiones cerradas se saltan y las de salas cerradas reciben
+`sala_cerrada`, y es su endpoint el que al salir descuenta el espectador y
+suelta la suscripción al bus (ver `comando_dejar_de_espectar`).
+"""
+import asyncio
+from typing import Callable, Dict, Optional, Set
+
+from . import codec
+from .difusion import Conexion
+
+# Segundos durante los que se agrupan los cambios de una sala antes de enviar su trama
+VENTANA_ESPECTADORES = 0.1
+# Conexiones a las que se encola la trama antes de ceder el bucle de eventos
+LOTE_ESPECTADORES = 256
+# Clave de fusión de las tramas: la nueva sustituye a la pendiente
+FUSION_ESPECTADOR = "espectador"
+
+
+class DifusorEspectadores:
+    """Espectadores conectados a este worker, por sala, y salas con cambios pendientes.
+
+    `codificar(sala_id)` devuelve la trama de la sala ya codificada, o None
+    si la sala ya no existe (sus espectadores reciben `sala_cerrada`).
+    """
+
+    def __init__(self, codificar: Callable[[str], Optional[str]],
+                 ventana: float = VENTANA_ESPECTADORES, lote: int = LOTE_ESPECTADORES):
+        self.codificar = codificar
+        self.ventana = ventana
+        self.lote = lote
+        self.salas: Dict[str, Set[Conexion]] = {}
+        # Salas con cambios desde la última trama (dict para conservar el orden)
+        self._cambiadas: Dict[str, None] = {}
+        self._tarea: Optional[asyncio.Task] = None
+
+        # Estadísticas
+        self.total_tramas = 0
+        self.total_entregas = 0
+
+    def suscribir(self, sala_id: str, conexion: Conexion):
+        self.salas.setdefault(sala_id, set()).add(conexion)
+
+    def desuscribir(self, sala_id: str, conexion: Conexion) -> bool:
+        """Quitar al espectador de la sala; devuelve si lo estaba"""
+        conexiones = self.salas.get(sala_id)
+        if not conexiones or conexion not in conexiones:
+            return False
+        conexiones.discard(conexion)
+        if not conexiones:
+            del self.salas[sala_id]
+        return True
+
+    def marcar(self, sala_id: str):
+        """Anotar que la sala ha cambiado (no hace nada si no tiene espectadores aquí)"""
+        if sala_id not in self.salas:
+            return
+        self._cambiadas[sala_id] = None
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.get_running_loop().create_task(self._vaciar_tras_ventana())
+
+    async def _vaciar_tras_ventana(self):
+        await asyncio.sleep(self.ventana)
+        cambiadas, self._cambiadas = self._cambiadas, {}
+        for sala_id in cambiadas:
+            if sala_id not in self.salas:
+                continue
+            texto = self.codificar(sala_id)
+            if texto is None:
+                texto = codec.dumps({"tipo": "sala_cerrada"})
+            conexiones = list(self.salas[sala_id])
+            self.total_tramas += 1
+
+            for i, conexion in enumerate(conexiones, 1):
+                if not conexion.cerrada and conexion.encolar(texto, FUSION_ESPECTADOR):
+                    self.total_entregas += 1
+                if i % self.lote == 0:
+                    await asyncio.sleep(0)
+
+        # Salas marcadas mientras se cedía el bucle: `marcar` no crea otra
+        # tarea porque esta aún no ha terminado
+        if self._cambiadas:
+            self._tarea = asyncio.get_running_loop().create_task(self._vaciar_tras_ventana())
+
+    def __len__(self) -> int:
+        """Espectadores conectados a este worker"""
+        return sum(len(conexiones) for conexiones in self.salas.values())
+
+    def metricas(self) -> Dict:
+        return {
+            "salas": len(self.salas),
+            "espectadores": len(self),
+            "tramas": self.total_tramas,
+            "entregas": self.total_entregas,
+            "entregas_por_trama": round(self.total_entregas / self.total_tramas, 2) if self.total_tramas else 0,
+        }
+
+    def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
@@ -0,0 +1,68 @@
+"""
+Suscripciones al lobby: listado inicial y cambios incrementales
+
+Quien se suscribe recibe una vez `lista_salas` y después mensajes
+`lobby_cambios` con las salas que aparecen (`altas`) y las que dejan de estar
+disponibles (`bajas`). Los cambios se acumulan durante `VENTANA_LOBBY`
+segundos y se envían en un único mensaje, en el que cada sala aparece como
+mucho una vez con su último estado. Aplicar un cambio es idempotente (alta =
+insertar o sustituir, baja = quitar si está), así que no importa que un
+cambio ya esté reflejado en el listado inicial.
+"""
+import asyncio
+from typing import Dict, Optional, Set
+
+from . import codec
+from .difusion import Conexion
+
+# Segundos durante los que se agrupan los cambios antes de enviarlos
+VENTANA_LOBBY = 0.25
+
+
+class DifusorLobby:
+    """Conexiones suscritas al lobby y cambios pendientes de enviarles"""
+
+    def __init__(self, ventana: float = VENTANA_LOBBY):
+        self.ventana = ventana
+        self.suscriptores: Set[Conexion] = set()
+        # Versión local del lobby: sube con cada cambio (sirve para invalidar cachés)
+        self.version = 0
+        # sala_id -> resumen de la sala, o None si ha dejado de estar disponible
+        self._cambios: Dict[str, Optional[Dict]] = {}
+        self._tarea: Optional[asyncio.Task] = None
+
+    def suscribir(self, conexion: Conexion):
+        self.suscriptores.add(conexion)
+
+    def desuscribir(self, conexion: Conexion):
+        self.suscriptores.discard(conexion)
+
+    def registrar(self, sala_id: str, resumen: Optional[Dict]):
+        """Anotar que una sala aparece (`resumen`) o desaparece (None) del lobby"""
+        self.version += 1
+        if not self.suscriptores:
+            return
+        self._cambios[sala_id] = resumen
+        if self._tarea is None or self._tarea.done():
+            self._tarea = asyncio.get_running_loop().create_task(self._vaciar_tras_ventana())
+
+    async def _vaciar_tras_ventana(self):
+        await asyncio.sleep(self.ventana)
+        cambios, self._cambios = self._cambios, {}
+        if not cambios:
+            return
+
+        texto = codec.dumps({
+            "tipo": "lobby_cambios",
+            "altas": [resumen for resumen in cambios.values() if resumen is not None],
+            "bajas": [sala_id for sala_id, resumen in cambios.items() if resumen is None],
+        })
+        for conexion in list(self.suscriptores):
+            if conexion.cerrada:
+                self.suscriptores.discard(conexion)
+            else:
+                conexion.encolar(texto)
+
+    def detener(self):
+        if self._tarea:
+            self._tarea.cancel()
@@ -0,0 +1,24 @@
+"""
+Métricas del juego, exportadas por el hub en /metrics (ver metrics.py)
+"""
+from metrics import for_game
+
+# Tipos de mensaje del protocolo que tienen serie propia
+TIPOS_MENSAJE = (
+    "crear_sala",
+    "unir_sala",
+    "movimiento",
+    "solicitar_reinicio",
+    "obtener_estado",
+    "obtener_salas",
+    "suscribir_lobby",
+    "desuscribir_lobby",
+    "reanudar",
+    "salir",
+    "espectar",
+    "dejar_de_espectar",
+    "buscar_partida",
+    "cancelar_busqueda",
+)
+
+metricas = for_game("3-in-row", TIPOS_MENSAJE)
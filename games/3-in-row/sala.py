@@ -0,0 +1,250 @@
+"""
+Estado de una sala de dos jugadores con campos fijos (`__slots__`)
+
+Una sala ocupa un objeto sin dict propio: los dos puestos de jugador, sus
+símbolos, puntos y peticiones de reinicio son atributos fijos en lugar de
+listas y dicts anidados. Las vistas con la forma del protocolo
+(`jugadores`, `simbolos`, `marcador`, `reinicio_pendiente`) se construyen
+solo cuando se piden.
+
+El puesto "a" es siempre el del primer jugador que sigue en la sala: si se
+va, el del puesto "b" pasa a ocuparlo (el mismo orden que tenía la lista
+`jugadores`).
+
+Cada puesto humano tiene un token de sesión para reanudar tras una
+desconexión; mientras el jugador está desconectado, el puesto queda
+suspendido hasta un instante límite.
+"""
+import secrets
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .tablero import crear_tablero
+
+
+def nuevo_id_sala() -> str:
+    """Identificador corto de sala: 8 caracteres hexadecimales"""
+    return secrets.token_hex(4)
+
+
+def nuevo_token() -> str:
+    """Token de sesión de un jugador (solo lo conocen el servidor y ese jugador)"""
+    return secrets.token_urlsafe(16)
+
+
+# Campos añadidos después de que hubiera salas guardadas (diario, SQLite) y su
+# valor para los registros que no los traen: sin token ni suspensión
+CAMPOS_NUEVOS = {
+    "token_a": None,
+    "token_b": None,
+    "suspendido_a": None,
+    "suspendido_b": None,
+    "espectadores": 0,
+}
+
+
+class Sala:
+    __slots__ = (
+        "id", "clave", "variante", "tablero", "creador", "timestamp",
+        "jugador_a", "jugador_b", "simbolo_a", "simbolo_b", "puntos_a", "puntos_b",
+        "reinicio_a", "reinicio_b", "token_a", "token_b", "suspendido_a", "suspendido_b",
+        "turno", "estado", "ganador", "partidas_jugadas", "version", "ultima_jugada",
+        "bot", "espectadores",
+    )
+
+    def __init__(self, sala_id: str, clave: str, creador: str, variante: str = "3-en-raya"):
+        self.id = sala_id
+        self.clave = clave
+        self.variante = variante
+        self.tablero = crear_tablero(variante)
+        self.creador = creador
+        self.timestamp = time.time()
+        self.jugador_a: Optional[str] = creador
+        self.jugador_b: Optional[str] = None
+        self.simbolo_a: Optional[str] = "X"
+        self.simbolo_b: Optional[str] = None
+        self.puntos_a = 0
+        self.puntos_b = 0
+        self.reinicio_a = False
+        self.reinicio_b = False
+        self.token_a: Optional[str] = nuevo_token()
+        self.token_b: Optional[str] = None
+        # Instante hasta el que se guarda el puesto de un jugador desconectado
+        self.suspendido_a: Optional[float] = None
+        self.suspendido_b: Optional[float] = None
+        self.turno = "X"
+        self.estado = "esperando"
+        self.ganador: Optional[str] = None
+        self.partidas_jugadas = 0
+        self.version = 1
+        self.ultima_jugada: Optional[Tuple[int, str]] = None
+        # Dificultad del bot si la sala es contra la máquina (ver bot.py)
+        self.bot: Optional[str] = None
+        # Espectadores conectados en todos los workers (no cambia la versión de la sala)
+        self.espectadores = 0
+
+    # --- Jugadores ---
+
+    @property
+    def num_jugadores(self) -> int:
+        return (self.jugador_a is not None) + (self.jugador_b is not None)
+
+    def tiene_jugador(self, jugador: str) -> bool:
+        return jugador is not None and (jugador == self.jugador_a or jugador == self.jugador_b)
+
+    def agregar_jugador(self, jugador: str, simbolo: str, token: Optional[str] = None):
+        """Ocupar el primer puesto libre con marcador a cero (el bot no lleva token)"""
+        if self.jugador_a is None:
+            self.jugador_a, self.simbolo_a, self.puntos_a, self.reinicio_a = jugador, simbolo, 0, False
+            self.token_a, self.suspendido_a = token, None
+        else:
+            self.jugador_b, self.simbolo_b, self.puntos_b, self.reinicio_b = jugador, simbolo, 0, False
+            self.token_b, self.suspendido_b = token, None
+
+    def quitar_jugador(self, jugador: str):
+        """Liberar el puesto del jugador (con su símbolo, puntos, petición de reinicio y sesión)"""
+        if jugador == self.jugador_a:
+            # El segundo jugador pasa a ser el primero
+            self.jugador_a, self.simbolo_a, self.puntos_a, self.reinicio_a = (
+                self.jugador_b, self.simbolo_b, self.puntos_b, self.reinicio_b
+            )
+            self.token_a, self.suspendido_a = self.token_b, self.suspendido_b
+        elif jugador != self.jugador_b:
+            return
+        self.jugador_b, self.simbolo_b, self.puntos_b, self.reinicio_b = None, None, 0, False
+        self.token_b, self.suspendido_b = None, None
+
+    def simbolo_de(self, jugador: str) -> Optional[str]:
+        if jugador is None:
+            return None
+        if jugador == self.jugador_a:
+            return self.simbolo_a
+        if jugador == self.jugador_b:
+            return self.simbolo_b
+        return None
+
+    def asignar_simbolo(self, jugador: str, simbolo: str):
+        if jugador == self.jugador_a:
+            self.simbolo_a = simbolo
+        elif jugador == self.jugador_b:
+            self.simbolo_b = simbolo
+
+    def jugador_con(self, simbolo: str) -> Optional[str]:
+        if self.jugador_a is not None and self.simbolo_a == simbolo:
+            return self.jugador_a
+        if self.jugador_b is not None and self.simbolo_b == simbolo:
+            return self.jugador_b
+        return None
+
+    def sumar_punto(self, jugador: str):
+        if jugador == self.jugador_a:
+            self.puntos_a += 1
+        elif jugador == self.jugador_b:
+            self.puntos_b += 1
+
+    # --- Sesiones ---
+
+    def token_de(self, jugador: str) -> Optional[str]:
+        if jugador is None:
+            return None
+        if jugador == self.jugador_a:
+            return self.token_a
+        if jugador == self.jugador_b:
+            return self.token_b
+        return None
+
+    def suspender(self, jugador: str, hasta: float):
+        if jugador == self.jugador_a:
+            self.suspendido_a = hasta
+        elif jugador == self.jugador_b:
+            self.suspendido_b = hasta
+
+    def reanudar(self, jugador: str):
+        self.suspender(jugador, None)
+
+    def suspendido_hasta(self, jugador: str) -> Optional[float]:
+        if jugador is None:
+            return None
+        if jugador == self.jugador_a:
+            return self.suspendido_a
+        if jugador == self.jugador_b:
+            return self.suspendido_b
+        return None
+
+    def sesion_valida(self, jugador: str, token: Optional[str]) -> bool:
+        """Si una conexión con `token` puede actuar por el jugador (puesto no suspendido y token suyo)"""
+        # Los puestos sin token (salas guardadas antes de las sesiones) no lo exigen
+        if self.suspendido_hasta(jugador) is not None:
+            return False
+        esperado = self.token_de(jugador)
+        return esperado is None or (token is not None and secrets.compare_digest(esperado, token))
+
+    @property
+    def suspendidos(self) -> List[str]:
+        return [j for j, s in ((self.jugador_a, self.suspendido_a), (self.jugador_b, self.suspendido_b))
+                if j is not None and s is not None]
+
+    # --- Reinicio ---
+
+    def pedir_reinicio(self, jugador: str) -> bool:
+        """Anotar la petición de reinicio del jugador; devuelve False si ya la había pedido"""
+        if jugador == self.jugador_a and not self.reinicio_a:
+            self.reinicio_a = True
+            return True
+        if jugador == self.jugador_b and not self.reinicio_b:
+            self.reinicio_b = True
+            return True
+        return False
+
+    def limpiar_reinicio(self):
+        self.reinicio_a = self.reinicio_b = False
+
+    def falta_reinicio(self) -> Optional[str]:
+        """Primer jugador que aún no ha pedido el reinicio"""
+        if self.jugador_a is not None and not self.reinicio_a:
+            return self.jugador_a
+        if self.jugador_b is not None and not self.reinicio_b:
+            return self.jugador_b
+        return None
+
+    # --- Vistas con la forma del protocolo (se construyen al pedirlas) ---
+
+    @property
+    def jugadores(self) -> List[str]:
+        return [j for j in (self.jugador_a, self.jugador_b) if j is not None]
+
+    @property
+    def simbolos(self) -> Dict[str, str]:
+        return {j: s for j, s in ((self.jugador_a, self.simbolo_a), (self.jugador_b, self.simbolo_b)) if j is not None}
+
+    @property
+    def marcador(self) -> Dict[str, int]:
+        return {j: p for j, p in ((self.jugador_a, self.puntos_a), (self.jugador_b, self.puntos_b)) if j is not None}
+
+    @property
+    def reinicio_pendiente(self) -> List[str]:
+        return [j for j, r in ((self.jugador_a, self.reinicio_a), (self.jugador_b, self.reinicio_b)) if j is not None and r]
+
+    # --- Persistencia fuera del proceso ---
+
+    def a_registro(self) -> Dict:
+        """Campos de la sala como tipos JSON (el tablero como lista de casillas)"""
+        registro = {campo: getattr(self, campo) for campo in self.__slots__}
+        registro["tablero"] = self.tablero.a_lista()
+        return registro
+
+    @classmethod
+    def desde_registro(cls, registro: Dict) -> "Sala":
+        sala = cls.__new__(cls)
+        # Los registros anteriores a las sesiones o a los espectadores no traen esos campos
+        registro = {**CAMPOS_NUEVOS, **registro}
+        for campo in cls.__slots__:
+            setattr(sala, campo, registro[campo])
+        tablero = crear_tablero(sala.variante)
+        for posicion, simbolo in enumerate(registro["tablero"]):
+            if simbolo:
+                tablero.colocar(posicion, simbolo)
+        sala.tablero = tablero
+        if sala.ultima_jugada:
+            sala.ultima_jugada = tuple(sala.ultima_jugada)
+        return sala
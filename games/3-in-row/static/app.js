@@ -9,12 +9,23 @@ class TresEnRaya {
         this.marcador = {};
         this.partidasJugadas = 0;
         this.reinicioPendiente = [];
+        this.version = 0;
+        this.tablero = [];
+        this.dimensiones = { filas: 3, columnas: 3 };
+        this.gravedad = false;
+        this.lobbyWs = null;
+        // Sesión para reanudar la partida si se corta la conexión
+        this.token = null;
+        this.intentosReconexion = 0;
+        // Viendo una sala como espectador (sin símbolo ni jugadas)
+        this.espectando = false;
         this.pantallas = {
             inicio: document.getElementById('pantalla-inicio'),
             crear: document.getElementById('pantalla-crear'),
             unir: document.getElementById('pantalla-unir'),
             juego: document.getElementById('pantalla-juego'),
-            listar: document.getElementById('pantalla-listar')
+            listar: document.getElementById('pantalla-listar'),
+            buscar: document.getElementById('pantalla-buscar')
         };
         
         this.inicializarEventos();
@@ -28,28 +39,30 @@ class TresEnRaya {
         document.getElementById('btn-volver-inicio').addEventListener('click', () => this.mostrarPantalla('inicio'));
         document.getElementById('btn-volver-inicio-2').addEventListener('click', () => this.mostrarPantalla('inicio'));
         document.getElementById('btn-volver-listar').addEventListener('click', () => this.mostrarPantalla('inicio'));
+        document.getElementById('btn-partida-rapida').addEventListener('click', () => this.mostrarPantalla('buscar'));
+        document.getElementById('btn-volver-buscar').addEventListener('click', () => this.cancelarBusqueda());
         document.getElementById('btn-volver-juego').addEventListener('click', () => this.volverAlInicio());
-        document.getElementById('btn-actualizar-lista').addEventListener('click', () => this.obtenerSalasDisponibles());
+        document.getElementById('btn-actualizar-lista').addEventListener('click', () => this.suscribirLobby(true));
         
         // Formularios
         document.getElementById('form-crear-sala').addEventListener('submit', (e) => this.crearSala(e));
         document.getElementById('form-unir-sala').addEventListener('submit', (e) => this.unirSala(e));
+        document.getElementById('form-buscar-partida').addEventListener('submit', (e) => this.buscarPartida(e));
         
         // Botón de reinicio
         document.getElementById('btn-reiniciar').addEventListener('click', () => this.solicitarReinicio());
-        
-        document.getElementById('btn-unir-sala').addEventListener('click', () => {
-            setTimeout(() => this.obtenerSalasDisponibles(), 100);
-        });
     }
     
-    inicializarTablero() {
+    inicializarTablero(filas = 3, columnas = 3) {
         const tablero = document.getElementById('tablero');
         if (!tablero) return;
         
+        this.dimensiones = { filas, columnas };
         tablero.innerHTML = '';
+        tablero.style.gridTemplateColumns = `repeat(${columnas}, 1fr)`;
+        tablero.classList.toggle('tablero-grande', columnas > 3);
         
-        for (let i = 0; i < 9; i++) {
+        for (let i = 0; i < filas * columnas; i++) {
             const celda = document.createElement('div');
             celda.className = 'celda';
             celda.dataset.posicion = i;
@@ -121,10 +134,10 @@ class TresEnRaya {
             return;
         }
         
-        // Verificar si la celda está ocupada
+        // Verificar si la celda está ocupada (con gravedad la ficha cae en la columna)
         const celdas = document.querySelectorAll('.celda');
         const celda = celdas[posicion];
-        if (celda.textContent !== '') {
+        if (!this.gravedad && celda.textContent !== '') {
             console.log('Celda ocupada:', celda.textContent);
             alert('Esta celda ya está ocupada');
             return;
@@ -150,8 +163,11 @@ class TresEnRaya {
             this.pantallas[pantalla].classList.add('activa');
         }
         
+        // El lobby se mantiene suscrito solo mientras se ve el listado
         if (pantalla === 'listar') {
-            setTimeout(() => this.obtenerSalasDisponibles(), 100);
+            this.suscribirLobby();
+        } else {
+            this.cancelarLobby();
         }
     }
     
@@ -162,36 +178,71 @@ class TresEnRaya {
             const wsUrl = `${protocol}//${window.location.host}/games/3-in-row/ws/${salaId}/${jugador}`;
             
             console.log('Conectando a:', wsUrl);
-            this.ws = new WebSocket(wsUrl);
+            const ws = new WebSocket(wsUrl);
+            this.ws = ws;
             
-            this.ws.onopen = () => {
+            ws.onopen = () => {
                 console.log('Conectado al servidor');
                 resolve();
             };
             
-            this.ws.onmessage = (event) => {
+            ws.onmessage = (event) => {
                 console.log('Mensaje recibido:', event.data);
                 const mensaje = JSON.parse(event.data);
                 this.procesarMensaje(mensaje);
             };
             
-            this.ws.onclose = () => {
+            ws.onclose = () => {
                 console.log('Conexión cerrada');
+                // Solo si es la conexión actual: al salir de la sala ya no lo es
+                if (this.ws === ws) {
+                    this.programarReconexion();
+                }
             };
             
-            this.ws.onerror = (error) => {
+            ws.onerror = (error) => {
                 console.error('Error WebSocket:', error);
                 reject(error);
             };
         });
     }
     
+    programarReconexion() {
+        if (!this.salaId || !this.token) return;
+        if (this.intentosReconexion >= 10) {
+            alert('No se ha podido recuperar la conexión con la partida');
+            this.volverAlInicio();
+            return;
+        }
+        const espera = Math.min(500 * 2 ** this.intentosReconexion, 5000);
+        console.log(`Reconectando en ${espera} ms`);
+        setTimeout(() => this.reanudarSesion(), espera);
+    }
+    
+    async reanudarSesion() {
+        if (!this.salaId || !this.token) return;
+        this.intentosReconexion++;
+        try {
+            await this.conectarWebSocket(this.salaId, this.jugador);
+            // El servidor devuelve el puesto y reenvía solo lo posterior a nuestra versión
+            this.ws.send(JSON.stringify({
+                tipo: 'reanudar',
+                token: this.token,
+                version: this.version
+            }));
+        } catch (error) {
+            // El cierre de la conexión fallida programa el siguiente intento
+            console.log('Reconexión fallida:', error);
+        }
+    }
+    
     procesarMensaje(mensaje) {
         console.log('Procesando mensaje:', mensaje);
         
         switch(mensaje.tipo) {
             case 'sala_creada':
                 this.salaId = mensaje.sala_id;
+                this.token = mensaje.token;
                 this.miSimbolo = 'X';
                 console.log('Sala creada. Mi símbolo:', this.miSimbolo);
                 this.mostrarPantallaJuego();
@@ -202,6 +253,7 @@ class TresEnRaya {
             case 'unido_exitoso':
                 console.log('Unido exitosamente a la sala:', mensaje.sala);
                 this.miSimbolo = mensaje.tu_simbolo;
+                this.token = mensaje.token;
                 console.log('Unido a sala. Mi símbolo:', this.miSimbolo, 'Sala completa:', mensaje.sala);
                 this.mostrarPantallaJuego();
                 this.actualizarPantallaConEstado(mensaje.sala);
@@ -212,12 +264,8 @@ class TresEnRaya {
                 this.actualizarPantallaConEstado(mensaje.sala);
                 break;
                 
-            case 'actualizar_tablero':
-                console.log('Actualizando tablero. Turno:', mensaje.turno, 'Estado:', mensaje.estado, 'Tablero:', mensaje.tablero);
-                this.actualizarTablero(mensaje.tablero);
-                this.actualizarTurno(mensaje.turno);
-                this.actualizarEstado(mensaje.estado, mensaje.ganador);
-                this.actualizarMarcador(mensaje.marcador, mensaje.partidas_jugadas);
+            case 'delta':
+                this.aplicarDelta(mensaje);
                 break;
                 
             case 'estado_actual':
@@ -232,6 +280,7 @@ class TresEnRaya {
                 break;
                 
             case 'reinicio_pendiente':
+                this.avanzarVersion(mensaje.version);
                 this.actualizarEstadoReinicio(mensaje.solicitado_por, mensaje.esperando_a, mensaje.reinicio_pendiente);
                 break;
                 
@@ -250,6 +299,63 @@ class TresEnRaya {
                 this.volverAlInicio();
                 break;
                 
+            case 'jugador_suspendido':
+                if (this.avanzarVersion(mensaje.version)) {
+                    this.mostrarSuspension(mensaje.jugador, mensaje.segundos);
+                }
+                break;
+                
+            case 'jugador_reanudado':
+                if (this.avanzarVersion(mensaje.version)) {
+                    this.actualizarEstado(this.estadoActual, this.ganadorActual);
+                }
+                break;
+                
+            case 'reanudado':
+                console.log('Sesión reanudada. Estado completo:', mensaje.completo);
+                this.intentosReconexion = 0;
+                this.miSimbolo = mensaje.tu_simbolo;
+                if (mensaje.completo) {
+                    this.actualizarPantallaConEstado(mensaje.sala);
+                    this.actualizarMarcador(mensaje.marcador, mensaje.partidas_jugadas);
+                }
+                // Si no, los mensajes perdidos llegan a continuación y se aplican como siempre
+                break;
+                
+            case 'buscando':
+                this.mostrarBusqueda(true);
+                break;
+                
+            case 'partida_encontrada':
+                console.log('Partida encontrada contra', mensaje.rival);
+                this.mostrarBusqueda(false);
+                this.salaId = mensaje.sala.id;
+                this.token = mensaje.token;
+                this.miSimbolo = mensaje.tu_simbolo;
+                this.mostrarPantallaJuego();
+                this.actualizarPantallaConEstado(mensaje.sala);
+                break;
+                
+            case 'espectando':
+            case 'estado_espectador':
+                // Siempre un estado completo: puede saltarse estados intermedios
+                if (!this.pantallas.juego.classList.contains('activa')) {
+                    this.mostrarPantallaJuego();
+                }
+                this.actualizarPantallaConEstado(mensaje.sala);
+                this.mostrarEspectadores(mensaje.espectadores);
+                break;
+                
+            case 'sala_cerrada':
+                alert('La sala se ha cerrado');
+                this.volverAlInicio();
+                break;
+                
+            case 'reanudacion_fallida':
+                alert('No se ha podido volver a la partida: ' + mensaje.mensaje);
+                this.volverAlInicio();
+                break;
+                
             case 'error':
                 console.error('Error del servidor:', mensaje.mensaje);
                 alert('Error: ' + mensaje.mensaje);
@@ -257,11 +363,45 @@ class TresEnRaya {
         }
     }
     
+    aplicarDelta(delta) {
+        // Las deltas solo valen sobre la versión inmediatamente anterior
+        if (!this.avanzarVersion(delta.version)) return;
+        
+        console.log('Aplicando delta. Versión:', delta.version, 'Posición:', delta.posicion, 'Símbolo:', delta.simbolo);
+        this.tablero[delta.posicion] = delta.simbolo;
+        this.actualizarTablero(this.tablero);
+        this.actualizarTurno(delta.turno);
+        this.actualizarEstado(delta.estado, delta.ganador);
+        if (delta.marcador) {
+            this.actualizarMarcador(delta.marcador, delta.partidas_jugadas);
+        }
+    }
+    
+    avanzarVersion(version) {
+        // Devuelve true si el mensaje es el siguiente esperado; ante un hueco pide el estado completo
+        if (version === undefined || version <= this.version) return false;
+        if (version !== this.version + 1) {
+            console.log('Hueco de versiones:', this.version, '->', version, '. Pidiendo estado completo');
+            this.solicitarEstado();
+            return false;
+        }
+        this.version = version;
+        return true;
+    }
+    
+    solicitarEstado() {
+        if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+            this.ws.send(JSON.stringify({ tipo: 'obtener_estado' }));
+        }
+    }
+    
     async crearSala(e) {
         e.preventDefault();
         const formData = new FormData(e.target);
         this.jugador = formData.get('jugador').trim();
         const clave = formData.get('clave');
+        const variante = formData.get('variante') || '3-en-raya';
+        const rival = formData.get('rival') || 'humano';
         
         if (!this.jugador) {
             alert('Por favor ingresa tu nombre');
@@ -279,49 +419,116 @@ class TresEnRaya {
                 }
             });
             
-            this.ws.send(JSON.stringify({
+            const mensaje = {
                 tipo: 'crear_sala',
                 clave: clave,
-                jugador: this.jugador
-            }));
+                jugador: this.jugador,
+                variante: variante
+            };
+            if (rival !== 'humano') {
+                // Partida contra la máquina: empieza sin esperar a otro jugador
+                mensaje.contra_bot = true;
+                mensaje.dificultad = rival;
+            }
+            this.ws.send(JSON.stringify(mensaje));
         } catch (error) {
             console.error('Error:', error);
             alert('Error al conectar con el servidor');
         }
     }
     
-    async obtenerSalasDisponibles() {
+    async buscarPartida(e) {
+        e.preventDefault();
+        const formData = new FormData(e.target);
+        this.jugador = formData.get('jugador').trim();
+        const variante = formData.get('variante') || '3-en-raya';
+        
+        if (!this.jugador) {
+            alert('Por favor ingresa tu nombre');
+            return;
+        }
+        
         try {
-            console.log('Obteniendo salas disponibles...');
-            
-            const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-            // CORRECCIÓN 2: Añadir /games/3-in-row/ a la ruta para listar salas
-            const wsUrl = `${protocol}//${window.location.host}/games/3-in-row/ws/lista/salas`;
-            
-            const tempWs = new WebSocket(wsUrl);
-            
-            tempWs.onopen = () => {
-                console.log('Conexión temporal abierta para obtener salas');
-                tempWs.send(JSON.stringify({
-                    tipo: 'obtener_salas'
-                }));
-            };
-            
-            tempWs.onmessage = (event) => {
-                console.log('Respuesta de salas:', event.data);
-                const mensaje = JSON.parse(event.data);
-                if (mensaje.tipo === 'lista_salas') {
-                    this.mostrarSalasDisponibles(mensaje.salas);
-                }
-                tempWs.close();
-            };
-            
-            tempWs.onerror = (error) => {
-                console.error('Error en conexión temporal:', error);
-            };
-            
+            // Sin sala todavía: el servidor nos mete en una en cuanto haya rival
+            await this.conectarWebSocket('temp', this.jugador);
+            this.ws.send(JSON.stringify({
+                tipo: 'buscar_partida',
+                variante: variante
+            }));
         } catch (error) {
-            console.error('Error al obtener salas:', error);
+            console.error('Error:', error);
+            alert('Error al conectar con el servidor');
+        }
+    }
+    
+    cancelarBusqueda() {
+        const ws = this.ws;
+        this.ws = null;
+        if (ws) {
+            if (ws.readyState === WebSocket.OPEN) {
+                ws.send(JSON.stringify({ tipo: 'cancelar_busqueda' }));
+            }
+            ws.close();
+        }
+        this.mostrarBusqueda(false);
+        this.mostrarPantalla('inicio');
+    }
+    
+    mostrarBusqueda(buscando) {
+        const estado = document.getElementById('estado-busqueda');
+        const boton = document.getElementById('btn-buscar-partida');
+        if (estado) estado.style.display = buscando ? 'block' : 'none';
+        if (boton) boton.disabled = buscando;
+    }
+    
+    suscribirLobby(refrescar = false) {
+        // Un único WebSocket para el lobby: listado inicial y después solo cambios
+        if (this.lobbyWs && this.lobbyWs.readyState <= WebSocket.OPEN) {
+            if (refrescar && this.lobbyWs.readyState === WebSocket.OPEN) {
+                this.lobbyWs.send(JSON.stringify({ tipo: 'suscribir_lobby' }));
+            }
+            return;
+        }
+        
+        const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        const wsUrl = `${protocol}//${window.location.host}/games/3-in-row/ws/lista/salas`;
+        const lobbyWs = new WebSocket(wsUrl);
+        this.lobbyWs = lobbyWs;
+        
+        lobbyWs.onopen = () => {
+            console.log('Suscrito al lobby');
+            lobbyWs.send(JSON.stringify({ tipo: 'suscribir_lobby' }));
+        };
+        
+        lobbyWs.onmessage = (event) => {
+            const mensaje = JSON.parse(event.data);
+            if (mensaje.tipo === 'lista_salas') {
+                this.mostrarSalasDisponibles(mensaje.salas);
+            } else if (mensaje.tipo === 'lobby_cambios') {
+                mensaje.bajas.forEach(salaId => this.quitarSalaLobby(salaId));
+                mensaje.altas.forEach(sala => this.agregarSalaLobby(sala));
+            }
+        };
+        
+        lobbyWs.onclose = () => {
+            if (this.lobbyWs !== lobbyWs) return;
+            this.lobbyWs = null;
+            // Reconectar si se sigue viendo el listado
+            if (this.pantallas.listar && this.pantallas.listar.classList.contains('activa')) {
+                setTimeout(() => this.suscribirLobby(), 1000);
+            }
+        };
+        
+        lobbyWs.onerror = (error) => {
+            console.error('Error en la conexión del lobby:', error);
+        };
+    }
+    
+    cancelarLobby() {
+        if (this.lobbyWs) {
+            const lobbyWs = this.lobbyWs;
+            this.lobbyWs = null;
+            lobbyWs.close();
         }
     }
     
@@ -337,23 +544,52 @@ class TresEnRaya {
             return;
         }
         
-        salas.forEach(sala => {
-            const div = document.createElement('div');
-            div.className = 'sala-item';
-            div.innerHTML = `
-                <div class="sala-info">
-                    <strong>Sala: ${sala.id}</strong>
-                    <span>Jugadores: ${sala.jugadores.length}/2</span>
-                    <span>Creada por: ${sala.creador}</span>
-                </div>
-                <div class="sala-acciones">
-                    <input type="password" class="clave-input" placeholder="Clave" id="clave-${sala.id}">
-                    <input type="text" class="nombre-input" placeholder="Tu nombre" id="nombre-${sala.id}">
-                    <button onclick="app.unirseASalaDesdeLista('${sala.id}')">Unirse</button>
-                </div>
-            `;
-            lista.appendChild(div);
-        });
+        salas.forEach(sala => this.agregarSalaLobby(sala));
+    }
+    
+    agregarSalaLobby(sala) {
+        const lista = document.getElementById('lista-salas');
+        if (!lista) return;
+        
+        const vacia = lista.querySelector('.no-salas');
+        if (vacia) vacia.remove();
+        
+        // Una sala que ya está en la lista solo actualiza sus datos (conservando lo escrito)
+        const existente = document.getElementById(`sala-${sala.id}`);
+        if (existente) {
+            existente.querySelector('.sala-jugadores').textContent = `Jugadores: ${sala.jugadores.length}/2`;
+            existente.querySelector('.sala-espectadores').textContent = `👁 ${sala.espectadores || 0}`;
+            return;
+        }
+        
+        const div = document.createElement('div');
+        div.className = 'sala-item';
+        div.id = `sala-${sala.id}`;
+        div.innerHTML = `
+            <div class="sala-info">
+                <strong>Sala: ${sala.id}</strong>
+                <span class="sala-jugadores">Jugadores: ${sala.jugadores.length}/2</span>
+                <span class="sala-espectadores">👁 ${sala.espectadores || 0}</span>
+                <span>Creada por: ${sala.creador}</span>
+            </div>
+            <div class="sala-acciones">
+                <input type="password" class="clave-input" placeholder="Clave" id="clave-${sala.id}">
+                <input type="text" class="nombre-input" placeholder="Tu nombre" id="nombre-${sala.id}">
+                <button onclick="app.unirseASalaDesdeLista('${sala.id}')">Unirse</button>
+                <button onclick="app.espectarDesdeLista('${sala.id}')">Ver</button>
+            </div>
+        `;
+        lista.appendChild(div);
+    }
+    
+    quitarSalaLobby(salaId) {
+        const div = document.getElementById(`sala-${salaId}`);
+        if (div) div.remove();
+        
+        const lista = document.getElementById('lista-salas');
+        if (lista && !lista.querySelector('.sala-item')) {
+            lista.innerHTML = '<div class="no-salas">No hay salas disponibles. Crea una nueva sala!</div>';
+        }
     }
     
     async unirseASalaDesdeLista(salaId) {
@@ -405,6 +641,38 @@ class TresEnRaya {
         }
     }
     
+    async espectarDesdeLista(salaId) {
+        const claveInput = document.getElementById(`clave-${salaId}`);
+        const clave = claveInput ? claveInput.value : '';
+        
+        if (!clave) {
+            alert('Por favor ingresa la clave de la sala');
+            return;
+        }
+        
+        this.salaId = salaId;
+        this.espectando = true;
+        this.miSimbolo = null;
+        
+        try {
+            await this.conectarWebSocket(salaId, 'espectador');
+            this.ws.send(JSON.stringify({
+                tipo: 'espectar',
+                clave: clave
+            }));
+        } catch (error) {
+            console.error('Error al ver la sala:', error);
+            alert('Error al conectar con la sala');
+        }
+    }
+    
+    mostrarEspectadores(cantidad) {
+        const elemento = document.getElementById('sala-id');
+        if (elemento) {
+            elemento.textContent = `${this.salaId} · 👁 ${cantidad}`;
+        }
+    }
+    
     async unirSala(e) {
         e.preventDefault();
         const formData = new FormData(e.target);
@@ -464,6 +732,19 @@ class TresEnRaya {
             console.log('Símbolo actualizado desde sala:', this.miSimbolo);
         }
         
+        // Redimensionar el tablero si la variante no es 3x3
+        const filas = sala.filas || 3;
+        const columnas = sala.columnas || 3;
+        this.gravedad = !!sala.gravedad;
+        if (filas !== this.dimensiones.filas || columnas !== this.dimensiones.columnas) {
+            this.inicializarTablero(filas, columnas);
+        }
+        
+        if (sala.version !== undefined) {
+            this.version = sala.version;
+        }
+        this.tablero = sala.tablero.slice();
+        
         this.actualizarInfoSala();
         this.actualizarJugadores(sala.jugadores, sala.simbolos);
         this.actualizarTablero(sala.tablero);
@@ -517,7 +798,11 @@ class TresEnRaya {
         if (estado) {
             const esMiTurno = this.miSimbolo === turno;
             
-            if (esMiTurno) {
+            if (this.espectando) {
+                estado.textContent = `Turno de ${turno}`;
+                estado.style.color = '#666';
+                estado.style.fontWeight = 'normal';
+            } else if (esMiTurno) {
                 estado.textContent = `🎯 ¡Es tu turno! (${turno})`;
                 estado.style.color = '#28a745';
                 estado.style.fontWeight = 'bold';
@@ -548,7 +833,7 @@ class TresEnRaya {
         const juegoEnProgreso = this.estadoActual === 'jugando';
         
         celdas.forEach((celda) => {
-            const celdaOcupada = celda.textContent !== '';
+            const celdaOcupada = !this.gravedad && celda.textContent !== '';
             const puedeJugar = esMiTurno && juegoEnProgreso && !celdaOcupada;
             
             if (puedeJugar) {
@@ -563,8 +848,17 @@ class TresEnRaya {
         });
     }
     
+    mostrarSuspension(jugador, segundos) {
+        const estadoElemento = document.getElementById('estado-juego');
+        if (estadoElemento) {
+            estadoElemento.textContent = `⏸️ ${jugador} se ha desconectado. Esperando ${Math.round(segundos)} s a que vuelva...`;
+            estadoElemento.className = 'estado-juego esperando';
+        }
+    }
+    
     actualizarEstado(estado, ganador = null) {
         this.estadoActual = estado;
+        this.ganadorActual = ganador;
         
         const estadoElemento = document.getElementById('estado-juego');
         if (!estadoElemento) return;
@@ -624,6 +918,9 @@ class TresEnRaya {
     }
     
     mostrarBotonReinicio() {
+        // Los espectadores no juegan la revancha
+        if (this.espectando) return;
+        
         const contenedor = document.getElementById('contenedor-reinicio');
         const boton = document.getElementById('btn-reiniciar');
         const estado = document.getElementById('estado-reinicio');
@@ -685,10 +982,19 @@ class TresEnRaya {
     }
     
     volverAlInicio() {
-        if (this.ws) {
-            this.ws.close();
-        }
+        const ws = this.ws;
+        // Primero this.ws = null: el cierre de una conexión que ya no es la actual no reconecta
         this.ws = null;
+        if (ws) {
+            if (ws.readyState === WebSocket.OPEN && this.salaId) {
+                // Salida voluntaria: el servidor libera el puesto sin esperar la gracia
+                ws.send(JSON.stringify({ tipo: this.espectando ? 'dejar_de_espectar' : 'salir' }));
+            }
+            ws.close();
+        }
+        this.token = null;
+        this.intentosReconexion = 0;
+        this.espectando = false;
         this.salaId = null;
         this.jugador = null;
         this.miSimbolo = null;
@@ -697,6 +1003,9 @@ class TresEnRaya {
         this.marcador = {};
         this.partidasJugadas = 0;
         this.reinicioPendiente = [];
+        this.version = 0;
+        this.tablero = [];
+        this.gravedad = false;
         this.mostrarPantalla('inicio');
         this.inicializarTablero();
         this.ocultarBotonReinicio();
@@ -0,0 +1,103 @@
+"""
+Tablero de 3 en raya representado con bitboards de 9 bits (uno por símbolo)
+"""
+from typing import Iterator, List, Optional, Tuple, Union
+
+from board_engine import VARIANTES, TableroK
+
+# Casilla i <-> bit i; las posiciones siguen el orden del tablero de la web (0..8)
+TABLERO_LLENO = 0b111_111_111
+
+LINEAS_GANADORAS: Tuple[int, ...] = tuple(
+    (1 << a) | (1 << b) | (1 << c)
+    for a, b, c in (
+        (0, 1, 2), (3, 4, 5), (6, 7, 8),
+        (0, 3, 6), (1, 4, 7), (2, 5, 8),
+        (0, 4, 8), (2, 4, 6),
+    )
+)
+
+# Solo hace falta comprobar las líneas que pasan por la última casilla jugada
+LINEAS_POR_CASILLA: Tuple[Tuple[int, ...], ...] = tuple(
+    tuple(linea for linea in LINEAS_GANADORAS if linea >> posicion & 1)
+    for posicion in range(9)
+)
+
+
+def es_ganadora(bits: int) -> bool:
+    """Comprobar si un conjunto de casillas contiene alguna línea ganadora"""
+    for linea in LINEAS_GANADORAS:
+        if bits & linea == linea:
+            return True
+    return False
+
+
+class Tablero:
+    """Estado del tablero: las casillas de X y de O como enteros de 9 bits"""
+
+    __slots__ = ("x", "o")
+
+    filas = 3
+    columnas = 3
+    gravedad = False
+
+    def __init__(self, x: int = 0, o: int = 0):
+        self.x = x
+        self.o = o
+
+    def bits(self, simbolo: str) -> int:
+        return self.x if simbolo == "X" else self.o
+
+    def ocupada(self, posicion: int) -> bool:
+        return bool((self.x | self.o) >> posicion & 1)
+
+    def resolver(self, posicion: int) -> Optional[int]:
+        """Casilla donde acaba una jugada en `posicion`, o None si no es válida"""
+        if not isinstance(posicion, int) or not 0 <= posicion < 9 or self.ocupada(posicion):
+            return None
+        return posicion
+
+    def colocar(self, posicion: int, simbolo: str):
+        if simbolo == "X":
+            self.x |= 1 << posicion
+        else:
+            self.o |= 1 << posicion
+
+    def gana_con(self, posicion: int, simbolo: str) -> bool:
+        """Comprobar si la jugada en `posicion` completa una línea de `simbolo`"""
+        bits = self.bits(simbolo)
+        for linea in LINEAS_POR_CASILLA[posicion]:
+            if bits & linea == linea:
+                return True
+        return False
+
+    def es_ganador(self, simbolo: str) -> bool:
+        return es_ganadora(self.bits(simbolo))
+
+    def lleno(self) -> bool:
+        return (self.x | self.o) == TABLERO_LLENO
+
+    def libres(self) -> Iterator[int]:
+        """Posiciones libres en orden ascendente"""
+        libres = ~(self.x | self.o) & TABLERO_LLENO
+        while libres:
+            bajo = libres & -libres
+            yield bajo.bit_length() - 1
+            libres ^= bajo
+
+    def copia(self) -> "Tablero":
+        return Tablero(self.x, self.o)
+
+    def a_lista(self) -> List[str]:
+        """Formato de la web: lista de 9 casillas con "X", "O" o ""."""
+        return [
+            "X" if self.x >> i & 1 else "O" if self.o >> i & 1 else ""
+            for i in range(9)
+        ]
+
+
+def crear_tablero(variante: str = "3-en-raya") -> Union[Tablero, TableroK]:
+    """Tablero vacío de la variante: bitboards para 3×3 y el motor genérico para el resto"""
+    if variante == "3-en-raya":
+        return Tablero()
+    return TableroK(VARIANTES[variante])
@@ -0,0 +1,62 @@
+"""
+Rueda de temporizadores (hashed timer wheel) para expirar salas inactivas
+"""
+import time
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+
+
+class RuedaTemporizadores:
+    """Programar, reprogramar, cancelar y vencer claves en O(1) por operación.
+
+    Cada ranura cubre `resolucion` segundos. Los vencimientos más lejanos que
+    una vuelta completa se quedan en su ranura hasta que llegue su vuelta.
+    """
+
+    def __init__(self, resolucion: float = 1.0, ranuras: int = 512, ahora: Optional[float] = None):
+        self.resolucion = resolucion
+        self._ranuras: List[Set[Hashable]] = [set() for _ in range(ranuras)]
+        # clave -> (vencimiento, índice de ranura)
+        self._entradas: Dict[Hashable, Tuple[float, int]] = {}
+        # Siguiente tick pendiente de procesar
+        self._siguiente = self._tick(time.time() if ahora is None else ahora)
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def __contains__(self, clave: Hashable) -> bool:
+        return clave in self._entradas
+
+    def _tick(self, instante: float) -> int:
+        return int(instante // self.resolucion)
+
+    def programar(self, clave: Hashable, vencimiento: float):
+        """Programar (o reprogramar) el vencimiento de una clave"""
+        self.cancelar(clave)
+        # Los vencimientos ya pasados caen en el próximo tick a procesar
+        tick = max(self._tick(vencimiento), self._siguiente)
+        indice = tick % len(self._ranuras)
+        self._ranuras[indice].add(clave)
+        self._entradas[clave] = (vencimiento, indice)
+
+    def cancelar(self, clave: Hashable):
+        entrada = self._entradas.pop(clave, None)
+        if entrada is not None:
+            self._ranuras[entrada[1]].discard(clave)
+
+    def avanzar(self, ahora: Optional[float] = None) -> List[Hashable]:
+        """Procesar los ticks ya transcurridos y devolver las claves vencidas"""
+        ahora = time.time() if ahora is None else ahora
+        ultimo = self._tick(ahora) - 1
+        # Si nos hemos retrasado más de una vuelta basta con recorrer cada ranura una vez
+        pasos = min(ultimo - self._siguiente + 1, len(self._ranuras))
+        vencidas = []
+
+        for tick in range(self._siguiente, self._siguiente + max(pasos, 0)):
+            ranura = self._ranuras[tick % len(self._ranuras)]
+            for clave in [c for c in ranura if self._entradas[c][0] <= ahora]:
+                ranura.discard(clave)
+                del self._entradas[clave]
+                vencidas.append(clave)
+
+        self._siguiente = max(self._siguiente, ultimo + 1)
+        return vencidas
@@ -0,0 +1,124 @@
+"""
+Logging del hub y de los juegos: niveles, campos estructurados y escritura
+fuera del bucle de eventos
+
+Los registros se encolan sin formatear y un hilo aparte los formatea y los
+escribe, así que registrar desde un manejador async no hace E/S en el bucle.
+Los campos `sala_id`, `jugador` y `tipo` se pasan con `extra={...}` y se
+añaden a cada línea. Los registros marcados con `sampled=True` (los de cada
+mensaje) solo se emiten en una fracción de los casos.
+
+Configuración por entorno:
+    HUB_LOG_LEVEL         DEBUG | INFO | WARNING | ERROR (por defecto INFO)
+    HUB_LOG_FORMAT        text | json (por defecto text)
+    HUB_LOG_DEBUG_SAMPLE  fracción de registros muestreados que se emiten (por defecto 0.01)
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+ROOT_LOGGER = "hub"
+FIELDS = ("sala_id", "jugador", "tipo")
+
+_listener: Optional[QueueListener] = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """Una línea por registro: texto legible con `campo=valor` o un objeto JSON"""
+
+    def __init__(self, as_json: bool = False):
+        super().__init__()
+        self.as_json = as_json
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {name: getattr(record, name) for name in FIELDS if getattr(record, name, None) is not None}
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+
+        if self.as_json:
+            return json.dumps({
+                "ts": round(record.created, 3),
+                "level": record.levelname,
+                "logger": record.name,
+                "msg": message,
+                **fields,
+            }, ensure_ascii=False, default=str)
+
+        hora = time.strftime("%H:%M:%S", time.localtime(record.created))
+        extra = "".join(f" {name}={value}" for name, value in fields.items())
+        return f"{hora} {record.levelname:<7} {record.name}: {message}{extra}"
+
+
+class DebugSampler(logging.Filter):
+    """Deja pasar solo una fracción de los registros marcados con `sampled=True`"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "sampled", False):
+            return random.random() < self.rate
+        return True
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler que no formatea al encolar: lo hace el hilo del listener.
+
+    Los argumentos del mensaje viajan tal cual, así que solo deben pasarse
+    valores que no se modifiquen después (cadenas, números, tuplas).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def setup_logging(level: Optional[str] = None, fmt: Optional[str] = None,
+                  sample: Optional[float] = None) -> logging.Logger:
+    """Configurar el logger del hub (solo la primera vez; las siguientes no hacen nada)"""
+    global _listener
+    root = logging.getLogger(ROOT_LOGGER)
+    if _listener is not None:
+        return root
+
+    level = (level or os.environ.get("HUB_LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.environ.get("HUB_LOG_FORMAT", "text")
+    sample = float(os.environ.get("HUB_LOG_DEBUG_SAMPLE", "0.01")) if sample is None else sample
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(StructuredFormatter(as_json=fmt == "json"))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(DebugSampler(sample))
+
+    root.setLevel(level)
+    root.addHandler(handler)
+    root.propagate = False
+
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return root
+
+
+def stop_logging():
+    """Vaciar la cola y parar el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger `hub.<name>`, configurando el logging del hub si aún no lo está"""
+    setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
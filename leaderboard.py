@@ -0,0 +1,540 @@
+"""
+Clasificación global de jugadores por juego (Elo)
+
+Cada juego obtiene con `for_game(nombre)` su `Leaderboard` y le comunica
+el resultado de cada partida con `record_result`. La puntuación se
+actualiza al momento en memoria y el cambio se anota como pendiente; una
+tarea lo vuelca a SQLite por lotes cada `FLUSH_INTERVAL` segundos desde un
+hilo, así que terminar una partida nunca espera al disco.
+
+Las posiciones se calculan con `_RankIndex`, una lista ordenada troceada en
+bloques (como `sortedcontainers.SortedList`): insertar, quitar y la
+posición de un jugador cuestan O(√n) con constantes pequeñas, y el top N
+es recorrer los primeros bloques.
+
+En disco se guardan incrementos, no valores: cada lote suma a cada fila su
+cambio de puntuación y de partidas y le pone el número del lote. Así varios
+workers pueden escribir en la misma base sin pisarse, y cada uno recoge
+después de volcar las filas que han cambiado los demás (las de número de
+lote mayor que el último que vio).
+
+Las respuestas JSON del top se guardan ya codificadas (y comprimidas, ver
+assets.py) durante `CACHE_TTL` segundos o hasta que cambia la clasificación.
+
+Los jugadores se identifican por su nombre tal cual lo envían los juegos,
+que no está autenticado: cualquiera que se conecte con el nombre de otro
+hereda su puntuación. Es una clasificación informal, no competitiva.
+
+`for_game` no toca la base: importar un juego no crea ni lee nada. La base
+se abre y se carga en un hilo con `start()` (al arrancar el hub) o con el
+primer volcado; si un volcado falla, sus cambios vuelven a quedar pendientes.
+
+Configuración: HUB_LEADERBOARD_DB (ruta de la base, por defecto
+leaderboard.sqlite3 en el directorio de trabajo).
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from assets import Asset
+from hub_logging import get_logger
+
+log = get_logger("leaderboard")
+
+DB_PATH = os.environ.get("HUB_LEADERBOARD_DB", "leaderboard.sqlite3")
+
+# Elo: puntuación inicial y factor K
+INITIAL_RATING = 1200.0
+K_FACTOR = 32.0
+# Segundos entre volcados de los cambios pendientes
+FLUSH_INTERVAL = 1.0
+# Segundos máximos que se reutiliza una respuesta del top aunque la clasificación cambie
+CACHE_TTL = 1.0
+# Tamaño por defecto y máximo de una página del top
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Clave de orden: mejor puntuación primero y, a igualdad, por nombre
+_Key = Tuple[float, str]
+
+
+def expected_score(rating: float, opponent: float) -> float:
+    """Puntos esperados (0..1) de un jugador contra otro según Elo"""
+    return 1.0 / (1.0 + 10.0 ** ((opponent - rating) / 400.0))
+
+
+class _RankIndex:
+    """Lista ordenada troceada en bloques de entre `load` y 2·`load` claves"""
+
+    def __init__(self, load: int = 512):
+        self.load = load
+        self._lists: List[List[_Key]] = []
+        self._maxes: List[_Key] = []
+        self._len = 0
+
+    def build(self, keys: List[_Key]):
+        """Sustituir el contenido por `keys` (de una vez: ordenar y trocear)"""
+        keys = sorted(keys)
+        self._lists = [keys[i:i + self.load] for i in range(0, len(keys), self.load)]
+        self._maxes = [bloque[-1] for bloque in self._lists]
+        self._len = len(keys)
+
+    def add(self, key: _Key):
+        self._len += 1
+        if not self._lists:
+            self._lists.append([key])
+            self._maxes.append(key)
+            return
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            i -= 1
+            self._lists[i].append(key)
+            self._maxes[i] = key
+        else:
+            insort(self._lists[i], key)
+        bloque = self._lists[i]
+        if len(bloque) > 2 * self.load:
+            mitad = bloque[self.load:]
+            del bloque[self.load:]
+            self._maxes[i] = bloque[-1]
+            self._lists.insert(i + 1, mitad)
+            self._maxes.insert(i + 1, mitad[-1])
+
+    def remove(self, key: _Key):
+        i = bisect_left(self._maxes, key)
+        bloque = self._lists[i]
+        del bloque[bisect_left(bloque, key)]
+        self._len -= 1
+        if bloque:
+            self._maxes[i] = bloque[-1]
+        else:
+            del self._lists[i]
+            del self._maxes[i]
+
+    def rank(self, key: _Key) -> int:
+        """Claves anteriores a `key` (su posición empezando en 0)"""
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return self._len
+        return sum(len(bloque) for bloque in self._lists[:i]) + bisect_left(self._lists[i], key)
+
+    def iterate(self, start: int = 0) -> Iterator[_Key]:
+        """Claves en orden a partir de la posición `start`"""
+        for bloque in self._lists:
+            if start >= len(bloque):
+                start -= len(bloque)
+                continue
+            yield from bloque[start:]
+            start = 0
+
+    def count_above(self, key: _Key) -> int:
+        """Claves que van estrictamente antes que cualquiera con la misma puntuación"""
+        return self.rank((key[0], ""))
+
+    def __len__(self) -> int:
+        return self._len
+
+
+class PlayerRating:
+    __slots__ = ("player", "rating", "games", "wins", "draws", "losses")
+
+    def __init__(self, player: str, rating: float = INITIAL_RATING,
+                 games: int = 0, wins: int = 0, draws: int = 0, losses: int = 0):
+        self.player = player
+        self.rating = rating
+        self.games = games
+        self.wins = wins
+        self.draws = draws
+        self.losses = losses
+
+    @property
+    def key(self) -> _Key:
+        return (-self.rating, self.player)
+
+    def to_json(self, rank: int) -> Dict:
+        return {
+            "rank": rank,
+            "player": self.player,
+            "rating": round(self.rating),
+            "games": self.games,
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+        }
+
+
+class Leaderboard:
+    """Puntuaciones de un juego, su índice de posiciones y los cambios por volcar"""
+
+    def __init__(self, game: str, service: "LeaderboardService"):
+        self.game = game
+        self.service = service
+        self.players: Dict[str, PlayerRating] = {}
+        self.index = _RankIndex()
+        # jugador -> [puntuación, partidas, victorias, empates, derrotas] sumados desde el último volcado
+        self.pending: Dict[str, List[float]] = {}
+        # Sube con cada cambio (invalida las respuestas cacheadas)
+        self.version = 0
+        # (limit, offset) -> (versión, caduca, respuesta)
+        self._cache: Dict[Tuple[int, int], Tuple[int, float, Asset]] = {}
+
+    def _get(self, player: str) -> PlayerRating:
+        rating = self.players.get(player)
+        if rating is None:
+            rating = self.players[player] = PlayerRating(player)
+            self.index.add(rating.key)
+        return rating
+
+    def _apply(self, rating: PlayerRating, delta: float, win: int, draw: int, loss: int):
+        self.index.remove(rating.key)
+        rating.rating += delta
+        rating.games += 1
+        rating.wins += win
+        rating.draws += draw
+        rating.losses += loss
+        self.index.add(rating.key)
+        pending = self.pending.get(rating.player)
+        if pending is None:
+            pending = self.pending[rating.player] = [0.0, 0, 0, 0, 0]
+        pending[0] += delta
+        pending[1] += 1
+        pending[2] += win
+        pending[3] += draw
+        pending[4] += loss
+
+    def record_result(self, player_a: str, player_b: str, score_a: float):
+        """Partida terminada entre dos jugadores: `score_a` es 1 si ganó A, 0.5 si empataron y 0 si ganó B"""
+        if player_a == player_b:
+            return
+        a, b = self._get(player_a), self._get(player_b)
+        delta_a = K_FACTOR * (score_a - expected_score(a.rating, b.rating))
+        delta_b = K_FACTOR * ((1.0 - score_a) - expected_score(b.rating, a.rating))
+        draw = int(score_a == 0.5)
+        self._apply(a, delta_a, int(score_a == 1.0), draw, int(score_a == 0.0))
+        self._apply(b, delta_b, int(score_a == 0.0), draw, int(score_a == 1.0))
+        self.version += 1
+        self.service._schedule()
+
+    def rank_of(self, player: str) -> Optional[Dict]:
+        """Posición (desde 1; empatados comparten posición) y estadísticas del jugador"""
+        rating = self.players.get(player)
+        if rating is None:
+            return None
+        return rating.to_json(self.index.count_above(rating.key) + 1)
+
+    def top(self, limit: int = DEFAULT_LIMIT, offset: int = 0) -> List[Dict]:
+        entries = []
+        rank = offset
+        previous: Optional[float] = None
+        for key in self.index.iterate(offset):
+            if len(entries) >= limit:
+                break
+            if key[0] != previous:
+                rank = self.index.count_above(key) + 1 if previous is None else len(entries) + offset + 1
+                previous = key[0]
+            entries.append(self.players[key[1]].to_json(rank))
+        return entries
+
+    def top_asset(self, limit: int = DEFAULT_LIMIT, offset: int = 0) -> Asset:
+        """Página del top ya codificada; se reutiliza mientras no cambie (y como mucho CACHE_TTL)"""
+        limit = max(1, min(limit, MAX_LIMIT))
+        offset = max(0, offset)
+        ahora = time.monotonic()
+        clave = (limit, offset)
+        cache = self._cache.get(clave)
+        if cache and (cache[0] == self.version or cache[1] > ahora):
+            return cache[2]
+        cuerpo = json.dumps({
+            "game": self.game,
+            "players": len(self.players),
+            "offset": offset,
+            "entries": self.top(limit, offset),
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        asset = Asset(f"leaderboard-{self.game}.json", "application/json", cuerpo)
+        if len(self._cache) >= 64:
+            self._cache.clear()
+        self._cache[clave] = (self.version, ahora + CACHE_TTL, asset)
+        return asset
+
+    def _load_all(self, rows: List[tuple]):
+        """Cargar la clasificación completa desde la base (al arrancar)"""
+        for player, rating, games, wins, draws, losses in rows:
+            self.players[player] = PlayerRating(player, rating, games, wins, draws, losses)
+        self.index.build([rating.key for rating in self.players.values()])
+        self.version += 1
+
+    def _load_row(self, player: str, rating: float, games: int, wins: int, draws: int, losses: int):
+        """Valores de la base para el jugador, más lo que aquí sigue pendiente de volcar"""
+        pending = self.pending.get(player)
+        if pending is not None:
+            rating += pending[0]
+            games += pending[1]
+            wins += pending[2]
+            draws += pending[3]
+            losses += pending[4]
+        actual = self.players.get(player)
+        if actual is not None:
+            if actual.rating == rating and actual.games == games:
+                return
+            self.index.remove(actual.key)
+        actual = self.players[player] = PlayerRating(player, rating, games, wins, draws, losses)
+        self.index.add(actual.key)
+        self.version += 1
+
+
+class _Store:
+    """Tabla de puntuaciones en SQLite (WAL); solo la usa un hilo a la vez"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS ratings (
+                game TEXT NOT NULL,
+                player TEXT NOT NULL,
+                rating REAL NOT NULL,
+                games INTEGER NOT NULL DEFAULT 0,
+                wins INTEGER NOT NULL DEFAULT 0,
+                draws INTEGER NOT NULL DEFAULT 0,
+                losses INTEGER NOT NULL DEFAULT 0,
+                batch INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (game, player)
+            );
+            CREATE INDEX IF NOT EXISTS ratings_batch ON ratings (batch);
+            CREATE TABLE IF NOT EXISTS batches (id INTEGER NOT NULL);
+            INSERT INTO batches (id) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM batches);
+        """)
+        self.lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: str) -> Tuple["_Store", List[tuple], int]:
+        """Abrir la base y leer todas las filas (se llama desde un hilo)"""
+        store = cls(path)
+        filas, ultimo = store.load()
+        return store, filas, ultimo
+
+    def load(self) -> Tuple[List[tuple], int]:
+        with self.lock:
+            filas = self.db.execute(
+                "SELECT game, player, rating, games, wins, draws, losses FROM ratings"
+            ).fetchall()
+            ultimo = self.db.execute("SELECT id FROM batches").fetchone()[0]
+        return filas, ultimo
+
+    def write(self, cambios: List[tuple]) -> Optional[int]:
+        """Sumar los cambios en un lote (todo o nada) y devolver su número (None si no hay cambios)"""
+        if not cambios:
+            return None
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                self.db.execute("UPDATE batches SET id = id + 1")
+                lote = self.db.execute("SELECT id FROM batches").fetchone()[0]
+                self.db.executemany(
+                    "INSERT OR IGNORE INTO ratings (game, player, rating) VALUES (?, ?, ?)",
+                    [(game, player, INITIAL_RATING) for game, player, *_ in cambios],
+                )
+                self.db.executemany(
+                    "UPDATE ratings SET rating = rating + ?, games = games + ?, wins = wins + ?,"
+                    " draws = draws + ?, losses = losses + ?, batch = ? WHERE game = ? AND player = ?",
+                    [(delta, games, wins, draws, losses, lote, game, player)
+                     for game, player, delta, games, wins, draws, losses in cambios],
+                )
+                self.db.execute("COMMIT")
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+        return lote
+
+    def changed_since(self, desde: int) -> Tuple[List[tuple], int]:
+        """Filas con lote mayor que `desde` y el último lote visto"""
+        with self.lock:
+            filas = self.db.execute(
+                "SELECT game, player, rating, games, wins, draws, losses, batch FROM ratings WHERE batch > ?",
+                (desde,),
+            ).fetchall()
+        ultimo = max([desde] + [fila[7] for fila in filas])
+        return [fila[:7] for fila in filas], ultimo
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class LeaderboardService:
+    """Clasificaciones de todos los juegos y su volcado por lotes a SQLite"""
+
+    def __init__(self, path: str = DB_PATH, flush_interval: float = FLUSH_INTERVAL):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.boards: Dict[str, Leaderboard] = {}
+        self._store: Optional[_Store] = None
+        self._opening: Optional[asyncio.Task] = None
+        self._last_batch = 0
+        self._task: Optional[asyncio.Task] = None
+
+        # Estadísticas
+        self.total_flushes = 0
+        self.total_rows = 0
+        self.flush_seconds = 0.0
+
+    async def _open(self):
+        """Abrir la base y cargar todas las clasificaciones (una sola vez aunque lo pidan varias tareas)"""
+        if self._store is not None:
+            return
+        if self._opening is None:
+            self._opening = asyncio.get_running_loop().create_task(self._load())
+        await self._opening
+
+    async def _load(self):
+        inicio = time.perf_counter()
+        try:
+            store, filas, ultimo = await asyncio.to_thread(_Store.open, self.path)
+        except BaseException:
+            # Se reintenta en el siguiente uso
+            self._opening = None
+            raise
+        por_juego: Dict[str, List[tuple]] = {}
+        for game, *fila in filas:
+            por_juego.setdefault(game, []).append(fila)
+        for game, filas_juego in por_juego.items():
+            board = self._board(game)
+            if board.players:
+                # Partidas terminadas antes de abrir la base: se suman a lo guardado
+                for fila in filas_juego:
+                    board._load_row(*fila)
+            else:
+                board._load_all(filas_juego)
+        self._store, self._last_batch = store, ultimo
+        log.info("🏆 Clasificación cargada: %d jugadores en %.1f ms", len(filas), (time.perf_counter() - inicio) * 1000)
+
+    def _board(self, game: str) -> Leaderboard:
+        board = self.boards.get(game)
+        if board is None:
+            board = self.boards[game] = Leaderboard(game, self)
+        return board
+
+    def for_game(self, game: str) -> Leaderboard:
+        """Clasificación del juego; vacía hasta que se abre la base"""
+        return self._board(game)
+
+    async def start(self):
+        """Abrir la base (en un hilo) y arrancar el volcado periódico"""
+        await self._open()
+        self._schedule()
+
+    def _schedule(self):
+        """Arrancar la tarea de volcado si no está en marcha.
+
+        Sin bucle en marcha (un script, un hilo) no hace nada: los cambios
+        quedan pendientes hasta el siguiente `start`, `flush` o `close`.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._flush_periodically())
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("❌ Error volcando la clasificación")
+
+    def _take_pending(self) -> List[tuple]:
+        cambios = []
+        for game, board in self.boards.items():
+            pending, board.pending = board.pending, {}
+            cambios.extend((game, player, *valores) for player, valores in pending.items())
+        return cambios
+
+    def _restore_pending(self, cambios: List[tuple]):
+        """Devolver a pendientes unos cambios que no se han podido volcar"""
+        for game, player, *valores in cambios:
+            pending = self._board(game).pending
+            actual = pending.get(player)
+            if actual is None:
+                pending[player] = valores
+            else:
+                for i, valor in enumerate(valores):
+                    actual[i] += valor
+
+    def _apply_rows(self, filas: List[tuple]):
+        for game, player, rating, games, wins, draws, losses in filas:
+            self._board(game)._load_row(player, rating, games, wins, draws, losses)
+
+    async def flush(self):
+        """Volcar los cambios pendientes en un hilo y recoger los que hayan volcado otros workers"""
+        await self._open()
+        cambios = self._take_pending()
+        inicio = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._store.write, cambios)
+        except Exception:
+            # El lote se ha deshecho entero: se reintenta en el siguiente volcado
+            self._restore_pending(cambios)
+            raise
+        filas, self._last_batch = await asyncio.to_thread(self._store.changed_since, self._last_batch)
+        self._apply_rows(filas)
+        if cambios:
+            self.total_flushes += 1
+            self.total_rows += len(cambios)
+            self.flush_seconds += time.perf_counter() - inicio
+
+    def close(self):
+        """Volcar lo pendiente de forma síncrona y cerrar la base (al apagar el servidor)"""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        cambios = self._take_pending()
+        if self._store is None:
+            if not cambios:
+                return
+            # Partidas terminadas sin haber llegado a abrir la base
+            self._store = _Store(self.path)
+        self._store.write(cambios)
+        self._store.close()
+        self._store = None
+        self._opening = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "path": self.path,
+            "games": {game: len(board.players) for game, board in self.boards.items()},
+            "pending": sum(len(board.pending) for board in self.boards.values()),
+            "flushes": self.total_flushes,
+            "rows_per_flush": round(self.total_rows / self.total_flushes, 2) if self.total_flushes else 0,
+            "flush_ms": round(self.flush_seconds / self.total_flushes * 1000, 2) if self.total_flushes else 0,
+            "last_batch": self._last_batch,
+        }
+
+
+_service = LeaderboardService()
+
+
+def for_game(game: str) -> Leaderboard:
+    """Clasificación del juego `game` (se rellena al abrir la base en `start`)"""
+    return _service.for_game(game)
+
+
+async def start():
+    """Cargar la base y arrancar el volcado periódico (desde el arranque del hub)"""
+    await _service.start()
+
+
+def close():
+    _service.close()
+
+
+def snapshot() -> Dict:
+    return _service.snapshot()
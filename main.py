@@ -1,14 +1,27 @@
 """
 Hub de Juegos - Portal centralizado para múltiples juegos
 """
+import asyncio
 import importlib
+import json
+import os
 import pkgutil
+import secrets
 from pathlib import Path
-from fastapi import FastAPI, Request
-from fastapi.staticfiles import StaticFiles
+from typing import Dict, List, Optional, Tuple
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse
+import leaderboard
+import metrics
 import registry
+from hub_logging import get_logger, setup_logging
+from assets import Asset, AssetCache, asset_response
+from monitor import loop_monitor, profiler
+
+# Logging de todo el hub (HUB_LOG_LEVEL, HUB_LOG_FORMAT, HUB_LOG_DEBUG_SAMPLE)
+setup_logging()
+log = get_logger("main")
 
 app = FastAPI(
     title="Hub de Juegos",
@@ -16,40 +29,139 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Archivos estáticos del hub en memoria, comprimidos y con URLs versionadas
+hub_assets = AssetCache(Path("static/hub"), "/static/hub")
+hub_assets.mount(app, "/static/hub")
+
 # Configurar templates
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["asset_url"] = hub_assets.url
 
-# Montar archivos estáticos del hub
-app.mount("/static/hub", StaticFiles(directory="static/hub"), name="hub_static")
-
-# Registrar todos los juegos
+# Registrar todos los juegos (solo manifiestos: cada juego se importa al usarse)
 games = registry.discover_games()
 
 # Montar cada juego bajo su propia ruta
 for game_name, game_app in games.items():
-    app.mount(f"/games/{game_name}", game_app, name=game_name)
-    print(f"✓ Juego registrado: {game_name} en /games/{game_name}")
+    app.mount(game_app.manifest.path, game_app, name=game_name)
+    log.info("✓ Juego registrado: %s en %s", game_name, game_app.manifest.path)
 
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    """Página principal del hub"""
+_warm_up_task = None
+
+@app.on_event("startup")
+async def start_games():
+    """Precargar los juegos en segundo plano sin retrasar el arranque del hub"""
+    global _warm_up_task
+    loop_monitor.start()
+    await leaderboard.start()
+    if registry.WARMUP_ENABLED:
+        _warm_up_task = asyncio.create_task(registry.warm_up(games))
+
+@app.on_event("shutdown")
+async def stop_games():
+    if _warm_up_task:
+        _warm_up_task.cancel()
+    loop_monitor.stop()
+    # Las apps montadas no reciben los eventos de parada: propagarlos
+    await registry.shutdown_games(games)
+    # Volcar las puntuaciones pendientes
+    leaderboard.close()
+
+# Portada y listado JSON ya renderizados: (generación del registro, portada, json)
+_hub_cache: Optional[Tuple[int, Asset, Asset]] = None
+
+def get_game_list() -> List[Dict]:
     game_list = []
     for game_name, game_app in games.items():
         game_list.append({
             "name": game_name,
-            "title": getattr(game_app, 'game_title', game_name.replace('_', ' ').title()),
-            "description": getattr(game_app, 'game_description', "Juego divertido"),
-            "path": f"/games/{game_name}"
+            "title": game_app.manifest.title,
+            "description": game_app.manifest.description,
+            "path": game_app.manifest.path
         })
-    
-    return templates.TemplateResponse(
-        "hub.html",
-        {
-            "request": request,
-            "games": game_list,
-            "total_games": len(games)
-        }
-    )
+    return game_list
+
+def get_hub_cache() -> Tuple[Asset, Asset]:
+    """Renderizar la portada y /api/games una sola vez por cambio del registro.
+
+    En modo desarrollo (HUB_DEV=1) se renderizan en cada petición para ver
+    los cambios de plantillas y estilos.
+    """
+    global _hub_cache
+    if _hub_cache is None or _hub_cache[0] != registry.generation or hub_assets.dev:
+        game_list = get_game_list()
+        html = templates.get_template("hub.html").render(games=game_list, total_games=len(game_list))
+        api = json.dumps({"games": game_list, "total_games": len(game_list)}, ensure_ascii=False)
+        _hub_cache = (
+            registry.generation,
+            Asset("hub.html", "text/html", html.encode("utf-8")),
+            Asset("games.json", "application/json", api.encode("utf-8")),
+        )
+    return _hub_cache[1], _hub_cache[2]
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    """Página principal del hub"""
+    return asset_response(request, get_hub_cache()[0])
+
+@app.get("/api/games")
+async def api_games(request: Request):
+    """Juegos disponibles en JSON (mismos datos que la portada)"""
+    return asset_response(request, get_hub_cache()[1])
+
+@app.get("/api/leaderboard/{game}")
+async def api_leaderboard(request: Request, game: str, limit: int = leaderboard.DEFAULT_LIMIT, offset: int = 0):
+    """Mejores jugadores del juego por puntuación Elo (respuesta cacheada, admite If-None-Match)"""
+    if game not in games:
+        raise HTTPException(status_code=404, detail="Juego no encontrado")
+    return asset_response(request, leaderboard.for_game(game).top_asset(limit, offset))
+
+@app.get("/api/leaderboard/{game}/players/{player}")
+async def api_leaderboard_player(game: str, player: str):
+    """Posición y estadísticas de un jugador en la clasificación del juego"""
+    if game not in games:
+        raise HTTPException(status_code=404, detail="Juego no encontrado")
+    entrada = leaderboard.for_game(game).rank_of(player)
+    if entrada is None:
+        raise HTTPException(status_code=404, detail="Jugador sin partidas clasificadas")
+    return entrada
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Métricas del hub y de todos los juegos en formato Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+# --- ADMINISTRACIÓN ---
+
+# Con HUB_ADMIN_TOKEN se exige en la cabecera X-Admin-Token; sin él, solo desde localhost
+ADMIN_TOKEN = os.environ.get("HUB_ADMIN_TOKEN")
+
+def require_admin(request: Request):
+    if ADMIN_TOKEN:
+        token = request.headers.get("x-admin-token", "")
+        if not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+            raise HTTPException(status_code=403, detail="Token de administración inválido")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=403, detail="Solo disponible desde localhost")
+
+@app.get("/admin/monitor", dependencies=[Depends(require_admin)])
+async def admin_monitor():
+    """Retraso del bucle, bloqueos con su pila y manejadores más lentos"""
+    return {
+        "loop": loop_monitor.snapshot(),
+        "profiler": profiler.snapshot(),
+        "games": registry.timing_report(games),
+        "leaderboard": leaderboard.snapshot(),
+    }
+
+@app.post("/admin/profiler", dependencies=[Depends(require_admin)])
+async def admin_profiler(enabled: Optional[bool] = None, reset: bool = False):
+    """Activar o desactivar el perfilador de manejadores y/o vaciar sus resultados"""
+    if enabled is not None:
+        profiler.enabled = enabled
+        log.info("🔬 Perfilador de manejadores %s", "activado" if enabled else "desactivado")
+    if reset:
+        profiler.reset()
+    return profiler.snapshot()
 
 @app.get("/favicon.ico")
 async def favicon():
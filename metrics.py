@@ -0,0 +1,267 @@
+"""
+Métricas del hub y de los juegos en formato de texto de Prometheus
+
+Contadores, gauges e histogramas de buckets fijos (un array de cuentas por
+serie, así que observar es una búsqueda binaria y un incremento). Las
+series con etiquetas se cachean: `familia.labels(...)` solo cuesta una
+búsqueda en un dict. Todo se actualiza desde el bucle de eventos, sin
+cerrojos; solo el registro de familias está protegido.
+
+Cada juego obtiene con `for_game(nombre)` un `GameMetrics` con las métricas
+comunes ya etiquetadas con `game="<nombre>"`.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Serie para estos valores de etiqueta (se crea la primera vez)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.label_names):
+                raise ValueError(f"{self.name} espera etiquetas {self.label_names}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values: Tuple[str, ...], child) -> Iterable[str]:
+        yield f"{self.name}{_format_labels(self.label_names, values)} {_format_value(child.get())}"
+
+
+class _Value:
+    __slots__ = ("value", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self.function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+    def set_function(self, function: Callable[[], float]):
+        """Calcular el valor al exportar en lugar de mantenerlo"""
+        self.function = function
+
+    def get(self) -> float:
+        return self.function() if self.function is not None else self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._collectors: List[Callable[[], Dict[Tuple[str, ...], float]]] = []
+
+    def _new_child(self):
+        return _Value()
+
+    def add_collector(self, collector: Callable[[], Dict[Tuple[str, ...], float]]):
+        """Función que, al exportar, devuelve varias series {valores de etiqueta: valor}"""
+        self._collectors.append(collector)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for collector in self._collectors:
+            try:
+                series = collector()
+            except Exception:
+                continue
+            for values, value in series.items():
+                lines.append(f"{self.name}{_format_labels(self.label_names, values)} {_format_value(value)}")
+        return lines
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self) -> "_Timer":
+        return _Timer(self)
+
+
+class _Timer:
+    """Context manager que observa la duración del bloque en segundos"""
+
+    __slots__ = ("child", "start")
+
+    def __init__(self, child: _HistogramChild):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _render_child(self, values: Tuple[str, ...], child: _HistogramChild) -> Iterable[str]:
+        acumulado = 0
+        for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+            acumulado += count
+            le = f'le="{_format_value(bound)}"'
+            yield f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {acumulado}"
+        etiquetas = _format_labels(self.label_names, values)
+        yield f"{self.name}_sum{etiquetas} {_format_value(child.sum)}"
+        yield f"{self.name}_count{etiquetas} {acumulado}"
+
+
+class MetricsRegistry:
+    """Familias de métricas del proceso; `render()` produce el texto para /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"La métrica {name} ya existe con otro tipo")
+            return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help, labels)
+
+    def gauge(self, name: str, help: str, labels: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help, labels, buckets)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+# Métricas comunes a todos los juegos, etiquetadas por juego
+GAME_REQUESTS = REGISTRY.counter("hub_game_requests_total", "Peticiones HTTP y WebSocket recibidas por cada juego", ("game", "type"))
+CONNECTIONS = REGISTRY.gauge("game_connections", "Conexiones WebSocket activas", ("game",))
+ROOMS = REGISTRY.gauge("game_rooms", "Salas por estado", ("game", "estado"))
+MESSAGES = REGISTRY.counter("game_messages_total", "Mensajes recibidos por tipo", ("game", "tipo"))
+BROADCAST_LATENCY = REGISTRY.histogram(
+    "game_broadcast_latency_seconds", "Tiempo desde que se encola un mensaje hasta que se entrega al socket", ("game",)
+)
+SEND_FAILURES = REGISTRY.counter("game_send_failures_total", "Envíos fallidos por motivo", ("game", "motivo"))
+
+
+class GameMetrics:
+    """Métricas comunes ya etiquetadas con el nombre de un juego"""
+
+    def __init__(self, game: str, message_types: Sequence[str] = ()):
+        self.game = game
+        # Solo los tipos conocidos tienen serie propia: un cliente no puede crear series arbitrarias
+        self.message_types = frozenset(message_types)
+        self.connections = CONNECTIONS.labels(game)
+        self.broadcast_latency = BROADCAST_LATENCY.labels(game)
+
+    def tipo(self, tipo: str) -> str:
+        """Etiqueta para un tipo de mensaje: los desconocidos se agrupan en 'otro'"""
+        if self.message_types and tipo not in self.message_types:
+            return "otro"
+        return tipo
+
+    def message(self, tipo: str):
+        return MESSAGES.labels(self.game, self.tipo(tipo))
+
+    def send_failure(self, motivo: str):
+        SEND_FAILURES.labels(self.game, motivo).inc()
+
+    def track_connections(self, function: Callable[[], float]):
+        self.connections.set_function(function)
+
+    def track_rooms(self, function: Callable[[], Dict[str, int]]):
+        """`function` devuelve {estado: número de salas} y se llama al exportar"""
+        game = self.game
+        ROOMS.add_collector(lambda: {(game, estado): n for estado, n in function().items()})
+
+
+_games: Dict[str, GameMetrics] = {}
+
+
+def for_game(game: str, message_types: Sequence[str] = ()) -> GameMetrics:
+    metrics = _games.get(game)
+    if metrics is None:
+        metrics = _games[game] = GameMetrics(game, message_types)
+    return metrics
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,254 @@
+"""
+Monitor del bucle de eventos y perfilado de manejadores
+
+`LoopMonitor` mide continuamente el retraso del bucle de asyncio (cuánto
+tarda en despertar una tarea que duerme `interval` segundos) y exporta la
+distribución en /metrics. Un hilo vigilante comprueba que el bucle siga
+despertando; si se queda bloqueado más de `stall_threshold`, captura la
+pila del hilo del bucle con `sys._current_frames()`, de modo que se ve qué
+código lo bloqueó sin adjuntar un depurador.
+
+`HandlerProfiler` cronometra cada manejador de mensajes (opt-in con
+HUB_PROFILE=1 o desde el endpoint de administración). Guarda las llamadas
+más lentas y, si una se alarga más de `slow_threshold`, el vigilante le
+adjunta la pila que estaba ejecutando en ese momento.
+
+Los manejadores esperan a los actores de las salas, así que las
+mediciones de varias tareas se solapan: cada tarea tiene su medición en
+curso y el vigilante solo atribuye la pila (o el bloqueo) a la de la tarea
+que está ejecutando el bucle.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+import metrics
+from hub_logging import get_logger
+
+log = get_logger("monitor")
+
+LOOP_LAG = metrics.REGISTRY.histogram(
+    "hub_event_loop_lag_seconds", "Retraso del bucle de eventos al despertar una tarea periódica",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+).labels()
+LOOP_STALLS = metrics.REGISTRY.counter("hub_event_loop_stalls_total", "Bloqueos del bucle detectados por el vigilante").labels()
+HANDLER_SECONDS = metrics.REGISTRY.histogram(
+    "game_handler_seconds", "Duración de cada manejador de mensajes (solo con el perfilador activo)", ("game", "tipo")
+)
+
+# Líneas de pila que se guardan por captura
+STACK_LIMIT = 30
+
+
+def _current_task() -> Optional[asyncio.Task]:
+    try:
+        return asyncio.current_task()
+    except RuntimeError:
+        # Fuera de un bucle (p. ej. desde código síncrono)
+        return None
+
+
+def _stack_of(thread_id: int) -> List[str]:
+    frame = sys._current_frames().get(thread_id)
+    if frame is None:
+        return []
+    return [linea.rstrip() for linea in traceback.format_stack(frame, limit=STACK_LIMIT)]
+
+
+class _NoMeasure:
+    """Medición vacía cuando el perfilador está desactivado"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_MEASURE = _NoMeasure()
+
+
+class _Measure:
+    __slots__ = ("profiler", "game", "tipo", "fields", "start", "stack", "task", "previous")
+
+    def __init__(self, profiler: "HandlerProfiler", game: str, tipo: str, fields: Dict):
+        self.profiler = profiler
+        self.game = game
+        self.tipo = tipo
+        self.fields = fields
+        self.stack: Optional[List[str]] = None
+
+    def __enter__(self):
+        in_flight = self.profiler._in_flight
+        self.task = _current_task()
+        self.previous = in_flight.get(self.task)
+        in_flight[self.task] = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        duration = time.perf_counter() - self.start
+        in_flight = self.profiler._in_flight
+        if self.previous is None:
+            in_flight.pop(self.task, None)
+        else:
+            in_flight[self.task] = self.previous
+        self.profiler._record(self, duration)
+        return False
+
+
+class HandlerProfiler:
+    """Tiempos por manejador y las `keep` llamadas más lentas con su pila"""
+
+    def __init__(self, enabled: bool = False, keep: int = 20, slow_threshold: float = 0.05):
+        self.enabled = enabled
+        self.keep = keep
+        self.slow_threshold = slow_threshold
+        # tarea -> medición en curso más interna de esa tarea
+        self._in_flight: Dict[Optional[asyncio.Task], _Measure] = {}
+        self._slowest: List = []
+        self._seq = itertools.count()
+
+    def measure(self, game: str, tipo: str, **fields):
+        """Context manager que cronometra un manejador (no hace nada si está desactivado)"""
+        if not self.enabled:
+            return _NO_MEASURE
+        return _Measure(self, game, str(tipo), fields)
+
+    def _record(self, measure: _Measure, duration: float):
+        HANDLER_SECONDS.labels(measure.game, measure.tipo).observe(duration)
+        if len(self._slowest) >= self.keep and duration <= self._slowest[0][0]:
+            return
+        entrada = (duration, next(self._seq), {
+            "game": measure.game,
+            "tipo": measure.tipo,
+            "ms": round(duration * 1000, 3),
+            "at": time.time(),
+            **measure.fields,
+            "stack": measure.stack,
+        })
+        if len(self._slowest) >= self.keep:
+            heapq.heapreplace(self._slowest, entrada)
+        else:
+            heapq.heappush(self._slowest, entrada)
+
+    def active(self, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[_Measure]:
+        """Medición de la tarea que está ejecutando `loop` ahora mismo (se puede llamar desde otro hilo)"""
+        if loop is None or not self._in_flight:
+            return None
+        return self._in_flight.get(asyncio.current_task(loop))
+
+    def sample_active(self, loop: Optional[asyncio.AbstractEventLoop], thread_id: int):
+        """Llamado por el vigilante: capturar la pila del manejador en curso si ya es lento"""
+        measure = self.active(loop)
+        if measure is not None and measure.stack is None:
+            if time.perf_counter() - measure.start > self.slow_threshold:
+                measure.stack = _stack_of(thread_id)
+
+    def reset(self):
+        self._slowest = []
+
+    def snapshot(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "in_flight": len(self._in_flight),
+            "slowest": [entrada for _, _, entrada in sorted(self._slowest, reverse=True)],
+        }
+
+
+class LoopMonitor:
+    """Retraso del bucle de eventos y vigilante de bloqueos"""
+
+    def __init__(self, profiler: HandlerProfiler, interval: float = 0.1,
+                 stall_threshold: float = 0.25, keep_stalls: int = 20):
+        self.profiler = profiler
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.stalls: Deque[Dict] = deque(maxlen=keep_stalls)
+        self.max_lag = 0.0
+        self.last_lag = 0.0
+        self._heartbeat = time.perf_counter()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._heartbeat = time.perf_counter()
+        self._stop.clear()
+        self._task = self._loop.create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _tick(self):
+        while True:
+            inicio = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            ahora = time.perf_counter()
+            lag = max(0.0, ahora - inicio - self.interval)
+            self._heartbeat = ahora
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            LOOP_LAG.observe(lag)
+
+    def _watch(self):
+        stall: Optional[Dict] = None
+        paso = min(self.stall_threshold, self.profiler.slow_threshold) / 4
+        while not self._stop.wait(paso):
+            if self.profiler.enabled:
+                self.profiler.sample_active(self._loop, self._loop_thread)
+
+            parado = time.perf_counter() - self._heartbeat - self.interval
+            if parado > self.stall_threshold and stall is None:
+                activo = self.profiler.active(self._loop)
+                stall = {
+                    "at": time.time(),
+                    "ms": None,
+                    "handler": None if activo is None else f"{activo.game}:{activo.tipo}",
+                    "stack": _stack_of(self._loop_thread),
+                }
+                self.stalls.append(stall)
+                LOOP_STALLS.inc()
+            elif parado <= self.stall_threshold and stall is not None:
+                # El bucle ha vuelto: el retraso del último despertar es lo que duró el bloqueo
+                stall["ms"] = round(self.last_lag * 1000, 1)
+                log.warning("🧊 Bucle de eventos bloqueado %.1f ms (manejador: %s)", stall["ms"], stall["handler"])
+                stall = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "stall_threshold_ms": self.stall_threshold * 1000,
+            "stalls": list(self.stalls),
+        }
+
+
+profiler = HandlerProfiler(
+    enabled=os.environ.get("HUB_PROFILE") == "1",
+    slow_threshold=float(os.environ.get("HUB_PROFILE_SLOW_MS", "50")) / 1000,
+)
+loop_monitor = LoopMonitor(
+    profiler,
+    stall_threshold=float(os.environ.get("HUB_STALL_MS", "250")) / 1000,
+)
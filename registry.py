@@ -1,40 +1,212 @@
 """
 Sistema de registro automático de juegos
+
+Cada juego declara sus metadatos en games/<juego>/manifest.json (título,
+descripción y ruta de montaje), así que el hub puede listarlos y montarlos
+sin importarlos. La app FastAPI de cada juego se importa la primera vez que
+recibe una petición o antes, en segundo plano, con `warm_up()`.
 """
+import asyncio
 import importlib
-import pkgutil
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Optional
+
 from fastapi import FastAPI
 
-def discover_games():
-    """Descubre y registra todos los juegos en la carpeta games/"""
+from hub_logging import get_logger
+from metrics import GAME_REQUESTS
+
+log = get_logger("registry")
+
+# Hilos para importar juegos en paralelo durante el calentamiento
+WARMUP_WORKERS = int(os.environ.get("HUB_WARMUP_WORKERS", "4"))
+# HUB_WARMUP=0 deja cada juego sin cargar hasta su primera petición
+WARMUP_ENABLED = os.environ.get("HUB_WARMUP", "1") != "0"
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+# Sube cada vez que se (re)descubren los juegos: invalida lo que el hub precalcula
+generation = 0
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WARMUP_WORKERS, thread_name_prefix="game-import")
+    return _executor
+
+
+class GameManifest:
+    """Metadatos de un juego leídos de su manifest.json"""
+
+    def __init__(self, name: str, title: Optional[str] = None, description: Optional[str] = None,
+                 path: Optional[str] = None, module: Optional[str] = None):
+        self.name = name
+        self.title = title or name.replace('_', ' ').replace('-', ' ').title()
+        self.description = description or "Juego divertido"
+        self.path = path or f"/games/{name}"
+        self.module = module or f"games.{name}"
+
+    @classmethod
+    def from_dir(cls, game_dir: Path) -> "GameManifest":
+        manifest_path = game_dir / "manifest.json"
+        data = {}
+        if manifest_path.exists():
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        return cls(
+            game_dir.name,
+            title=data.get("title"),
+            description=data.get("description"),
+            path=data.get("path"),
+            module=data.get("module"),
+        )
+
+
+class LazyGameApp:
+    """App ASGI que importa el juego la primera vez que se necesita.
+
+    Las apps montadas no reciben los eventos de arranque, así que al cargar
+    el juego se ejecutan aquí sus manejadores de startup (y `shutdown()`
+    ejecuta los de parada si llegó a arrancar).
+    """
+
+    def __init__(self, manifest: GameManifest):
+        self.manifest = manifest
+        self.app: Optional[FastAPI] = None
+        self.error: Optional[Exception] = None
+        self.import_seconds: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self._import_lock = threading.Lock()
+        self._start_lock: Optional[asyncio.Lock] = None
+        self._started = False
+
+    @property
+    def loaded(self) -> bool:
+        return self._started
+
+    def load(self) -> Optional[FastAPI]:
+        """Importar el módulo del juego (bloqueante; seguro desde varios hilos)"""
+        with self._import_lock:
+            if self.app is not None or self.error is not None:
+                return self.app
+            inicio = time.perf_counter()
+            try:
+                game_module = importlib.import_module(self.manifest.module)
+                if not hasattr(game_module, 'app'):
+                    raise ImportError(f"'{self.manifest.module}' no tiene 'app' FastAPI")
+                self.app = game_module.app
+            except Exception as e:
+                self.error = e
+                log.error("  ✗ Error cargando juego '%s': %s", self.manifest.name, e)
+            self.import_seconds = time.perf_counter() - inicio
+            return self.app
+
+    async def ensure_started(self) -> Optional[FastAPI]:
+        """Importar el juego en un hilo (si hace falta) y ejecutar su arranque en el bucle.
+
+        Devuelve None si el juego no se pudo importar o arrancar (ver `error`).
+        """
+        if self._started:
+            return self.app
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._started or self.error is not None:
+                return self.app if self._started else None
+            app = await asyncio.get_running_loop().run_in_executor(_get_executor(), self.load)
+            if app is None:
+                return None
+            inicio = time.perf_counter()
+            try:
+                await app.router.startup()
+            except Exception as e:
+                # Sin reintentos: el juego queda no disponible (503) como si no se hubiera importado
+                self.error = e
+                log.exception("  ✗ Error arrancando juego '%s'", self.manifest.name)
+                return None
+            self.startup_seconds = time.perf_counter() - inicio
+            self._started = True
+            log.info("  ⏱️  Juego '%s' listo: importación %.1f ms, arranque %.1f ms",
+                     self.manifest.name, self.import_seconds * 1000, self.startup_seconds * 1000)
+        return self.app
+
+    async def shutdown(self):
+        if self._started:
+            await self.app.router.shutdown()
+            self._started = False
+
+    async def __call__(self, scope, receive, send):
+        GAME_REQUESTS.labels(self.manifest.name, scope["type"]).inc()
+        app = await self.ensure_started()
+        if app is None:
+            if scope["type"] == "http":
+                await send({"type": "http.response.start", "status": 503,
+                            "headers": [(b"content-type", b"text/plain; charset=utf-8")]})
+                await send({"type": "http.response.body", "body": "Juego no disponible".encode()})
+            elif scope["type"] == "websocket":
+                await send({"type": "websocket.close", "code": 1011})
+            return
+        await app(scope, receive, send)
+
+    def timing(self) -> Dict:
+        return {
+            "loaded": self.loaded,
+            "import_ms": None if self.import_seconds is None else round(self.import_seconds * 1000, 1),
+            "startup_ms": None if self.startup_seconds is None else round(self.startup_seconds * 1000, 1),
+            "error": None if self.error is None else str(self.error),
+        }
+
+
+def discover_games() -> Dict[str, LazyGameApp]:
+    """Descubre todos los juegos en la carpeta games/ leyendo solo sus manifiestos"""
+    global generation
     games = {}
     games_dir = Path(__file__).parent / "games"
-    
-    print(f"🔍 Buscando juegos en: {games_dir}")
-    
-    # Buscar todas las carpetas en games/ que tengan __init__.py
-    for item in games_dir.iterdir():
+
+    log.info("🔍 Buscando juegos en: %s", games_dir)
+    inicio = time.perf_counter()
+
+    # Buscar todas las carpetas en games/ que sean paquetes o declaren un manifiesto
+    for item in sorted(games_dir.iterdir()):
         if item.is_dir() and not item.name.startswith('__') and not item.name.startswith('.'):
-            game_name = item.name
+            if not (item / "manifest.json").exists() and not (item / "__init__.py").exists():
+                continue
             try:
-                # Intentar importar el módulo del juego
-                module_path = f"games.{game_name}"
-                print(f"  Intentando cargar juego: {module_path}")
-                
-                game_module = importlib.import_module(module_path)
-                
-                # Buscar la app FastAPI en el módulo
-                if hasattr(game_module, 'app'):
-                    games[game_name] = game_module.app
-                    print(f"  ✓ Juego '{game_name}' cargado exitosamente")
-                else:
-                    print(f"  ✗ Juego '{game_name}' no tiene 'app' FastAPI")
-                    
-            except ImportError as e:
-                print(f"  ✗ Error importando juego '{game_name}': {e}")
-            except Exception as e:
-                print(f"  ✗ Error cargando juego '{game_name}': {e}")
-    
-    print(f"🎯 Total de juegos descubiertos: {len(games)}")
-    return games
\ No newline at end of file
+                manifest = GameManifest.from_dir(item)
+            except (OSError, ValueError) as e:
+                log.error("  ✗ Manifiesto inválido en '%s': %s", item.name, e)
+                continue
+            games[manifest.name] = LazyGameApp(manifest)
+            log.info("  ✓ Juego '%s' registrado (%s)", manifest.name, manifest.title)
+
+    log.info("🎯 Total de juegos descubiertos: %d en %.1f ms", len(games), (time.perf_counter() - inicio) * 1000)
+    generation += 1
+    return games
+
+
+async def warm_up(games: Dict[str, LazyGameApp]):
+    """Cargar y arrancar todos los juegos en paralelo, en segundo plano"""
+    inicio = time.perf_counter()
+    resultados = await asyncio.gather(*(game.ensure_started() for game in games.values()), return_exceptions=True)
+    for name, resultado in zip(games, resultados):
+        if isinstance(resultado, BaseException):
+            log.error("  ✗ Error precargando juego '%s': %r", name, resultado)
+    log.info("🔥 Juegos precargados en %.1f ms", (time.perf_counter() - inicio) * 1000)
+    for name, timing in timing_report(games).items():
+        log.info("   → %s: %s", name, timing)
+
+
+async def shutdown_games(games: Dict[str, LazyGameApp]):
+    for game in games.values():
+        await game.shutdown()
+
+
+def timing_report(games: Dict[str, LazyGameApp]) -> Dict[str, Dict]:
+    """Tiempos de importación y arranque de cada juego"""
+    return {name: game.timing() for name, game in games.items()}
@@ -0,0 +1,16 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture(autouse=True)
+def olvidar_conexiones():
+    """Las pruebas registran conexiones falsas en el módulo del juego: no dejarlas para las siguientes"""
+    yield
+    juego = sys.modules.get("games.3-in-row")
+    if juego is not None:
+        juego.conexiones.clear()
+        juego.jugador_sala.clear()
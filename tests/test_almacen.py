@@ -0,0 +1,100 @@
+import importlib
+import time
+
+import pytest
+
+almacen_mod = importlib.import_module("games.3-in-row.almacen")
+sala_mod = importlib.import_module("games.3-in-row.sala")
+
+
+@pytest.fixture(params=["memoria", "sqlite"])
+def almacen(request, tmp_path):
+    if request.param == "memoria":
+        almacen = almacen_mod.AlmacenMemoria()
+    else:
+        almacen = almacen_mod.AlmacenSQLite(str(tmp_path / "salas.sqlite3"))
+    yield almacen
+    almacen.cerrar()
+
+
+def test_espectadores_no_alargan_la_vida_de_la_sala(almacen):
+    sala = sala_mod.Sala("abcd1234", "clave", "ana")
+    vence = time.time() + 10
+    with almacen.bloqueo():
+        almacen.insertar(sala, vence, True)
+
+    assert almacen.cambiar_espectadores("abcd1234", 2).espectadores == 2
+    assert almacen.cambiar_espectadores("abcd1234", -5).espectadores == 0
+    assert almacen.cambiar_espectadores("no-existe", 1) is None
+
+    assert [s.id for s in almacen.expirar(vence + 1)] == ["abcd1234"]
+
+
+def test_cambiar_espectadores_no_guarda_la_sala(monkeypatch):
+    juego = importlib.import_module("games.3-in-row")
+    sala_id = juego.sala_manager.crear_sala("clave", "ana")
+
+    def guardar(*args):
+        raise AssertionError("guardar reprograma el vencimiento y escribe en el diario")
+
+    monkeypatch.setattr(juego.sala_manager.almacen, "guardar", guardar)
+    assert juego.sala_manager.cambiar_espectadores(sala_id, 1).espectadores == 1
+    assert juego.sala_manager.cambiar_espectadores(sala_id, -1).espectadores == 0
+
+
+def crear_salas(almacen, cuantas, creada=None):
+    salas = []
+    with almacen.bloqueo():
+        for i in range(cuantas):
+            sala = sala_mod.Sala(f"sala{i:04d}", "clave", f"jugador{i}")
+            if creada is not None:
+                sala.timestamp = creada
+            almacen.insertar(sala, time.time() + 600, True)
+            salas.append(sala)
+    return salas
+
+
+def recorrer_lobby(almacen, limite, creadas_desde=0.0):
+    ids, cursor = [], None
+    while True:
+        pagina, cursor = almacen.listar_publicas(limite, cursor, creadas_desde)
+        ids.extend(sala.id for sala in pagina)
+        if cursor is None:
+            return ids
+
+
+def test_lobby_paginado_por_cursor_en_orden_de_creacion(almacen):
+    salas = crear_salas(almacen, 7)
+    # Una sala que se llena deja el lobby; paginar no la repite ni se salta otras
+    with almacen.bloqueo():
+        almacen.guardar(salas[3], time.time() + 600, False)
+
+    esperadas = [sala.id for i, sala in enumerate(salas) if i != 3]
+    for limite in (1, 2, 4, 6, 10):
+        assert recorrer_lobby(almacen, limite) == esperadas
+
+    pagina, cursor = almacen.listar_publicas(6, None, 0.0)
+    assert len(pagina) == 6 and cursor is None
+
+
+def test_lobby_cursor_estable_aunque_cambien_salas_anteriores(almacen):
+    salas = crear_salas(almacen, 5)
+    pagina, cursor = almacen.listar_publicas(2, None, 0.0)
+    assert [sala.id for sala in pagina] == ["sala0000", "sala0001"]
+
+    # Entre página y página desaparece una sala ya vista y vuelve a abrirse otra
+    almacen.eliminar("sala0000")
+    with almacen.bloqueo():
+        almacen.guardar(salas[1], time.time() + 600, False)
+        almacen.guardar(salas[1], time.time() + 600, True)
+
+    pagina, cursor = almacen.listar_publicas(2, cursor, 0.0)
+    assert [sala.id for sala in pagina] == ["sala0002", "sala0003"]
+
+
+def test_lobby_oculta_salas_antiguas(almacen):
+    crear_salas(almacen, 2, creada=time.time() - 3600)
+    with almacen.bloqueo():
+        sala = sala_mod.Sala("reciente", "clave", "nuevo")
+        almacen.insertar(sala, time.time() + 600, True)
+    assert recorrer_lobby(almacen, 10, creadas_desde=time.time() - 600) == ["reciente"]
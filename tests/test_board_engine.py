@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from board_engine import VARIANTES, TableroK, Variante, apilar, ganadores_lote
+
+
+def jugar(tablero, jugadas):
+    for posicion, simbolo in jugadas:
+        tablero.colocar(tablero.resolver(posicion), simbolo)
+
+
+def test_variante_imposible():
+    with pytest.raises(ValueError):
+        Variante("rara", 3, 3, 4)
+
+
+@pytest.mark.parametrize("casillas", [
+    [0, 1, 2, 3, 4],            # fila
+    [0, 15, 30, 45, 60],        # columna
+    [0, 16, 32, 48, 64],        # diagonal
+    [4, 18, 32, 46, 60],        # antidiagonal
+])
+def test_gomoku_cinco_en_raya_en_cualquier_orden(casillas):
+    for orden in (casillas, casillas[::-1], casillas[2:] + casillas[:2]):
+        tablero = TableroK(VARIANTES["gomoku"])
+        jugar(tablero, [(p, "X") for p in orden[:-1]])
+        assert not any(tablero.gana_con(p, "X") for p in orden[:-1])
+        jugar(tablero, [(orden[-1], "X")])
+        assert tablero.gana_con(orden[-1], "X")
+        assert not tablero.gana_con(orden[-1], "O")
+
+
+def test_gomoku_linea_no_cruza_el_borde():
+    tablero = TableroK(VARIANTES["gomoku"])
+    # Columnas 12..14 de la fila 0 y 0..1 de la fila 1 son consecutivas en memoria
+    casillas = [12, 13, 14, 15, 16]
+    jugar(tablero, [(p, "X") for p in casillas])
+    assert not any(tablero.gana_con(p, "X") for p in casillas)
+
+
+def test_conecta_4_gravedad():
+    tablero = TableroK(VARIANTES["conecta-4"])
+    # Cualquier casilla de la columna 3 cae hasta la fila libre más baja
+    assert tablero.resolver(3) == 5 * 7 + 3
+    jugar(tablero, [(3, "X")])
+    assert tablero.resolver(10) == 4 * 7 + 3
+    for _ in range(5):
+        jugar(tablero, [(3, "O")])
+    assert tablero.resolver(3) is None
+    assert 3 not in [p % 7 for p in tablero.libres()]
+    assert len(tablero.libres()) == 6
+
+
+def test_conecta_4_diagonal():
+    tablero = TableroK(VARIANTES["conecta-4"])
+    jugar(tablero, [
+        (0, "X"),
+        (1, "O"), (1, "X"),
+        (2, "O"), (2, "O"), (2, "X"),
+        (3, "O"), (3, "O"), (3, "O"),
+    ])
+    posicion = tablero.resolver(3)
+    jugar(tablero, [(3, "X")])
+    assert tablero.gana_con(posicion, "X")
+
+
+def test_copia_independiente():
+    tablero = TableroK(VARIANTES["conecta-4"])
+    copia = tablero.copia()
+    jugar(copia, [(0, "X")])
+    assert tablero.ocupadas == 0 and tablero.resolver(0) == 35
+    assert copia.a_lista()[35] == "X"
+
+
+def test_ganadores_lote_coincide_con_gana_con():
+    pytest.importorskip("numpy")
+    aleatorio = random.Random(7)
+    variante = VARIANTES["conecta-4"]
+    tableros, esperados = [], []
+    for _ in range(200):
+        tablero = TableroK(variante)
+        ganador = 0
+        simbolo = "X"
+        while not tablero.lleno() and not ganador:
+            posicion = tablero.resolver(aleatorio.choice(tablero.libres()))
+            tablero.colocar(posicion, simbolo)
+            if tablero.gana_con(posicion, simbolo):
+                ganador = 1 if simbolo == "X" else 2
+            simbolo = "O" if simbolo == "X" else "X"
+        tableros.append(tablero)
+        esperados.append(ganador)
+
+    assert list(ganadores_lote(apilar(tableros), variante.en_raya)) == esperados
@@ -0,0 +1,112 @@
+import functools
+import importlib
+import random
+
+bot = importlib.import_module("games.3-in-row.bot")
+tablero_mod = importlib.import_module("games.3-in-row.tablero")
+Tablero = tablero_mod.Tablero
+
+
+@functools.lru_cache(maxsize=None)
+def negamax(mios, suyos):
+    """Referencia sin simetrías: puntuación de cada jugada con la misma escala que el bot"""
+    puntuadas = {}
+    for posicion in range(9):
+        if (mios | suyos) >> posicion & 1:
+            continue
+        nuevos = mios | 1 << posicion
+        libres = 9 - bin(nuevos | suyos).count("1")
+        if tablero_mod.es_ganadora(nuevos):
+            puntuadas[posicion] = 1 + libres
+        elif libres == 0:
+            puntuadas[posicion] = 0
+        else:
+            puntuadas[posicion] = -max(negamax(suyos, nuevos).values())
+    return puntuadas
+
+
+def posiciones():
+    """Todas las posiciones alcanzables en las que aún se puede jugar: (mios, suyos) del que mueve"""
+    vistas, pendientes = set(), [(0, 0)]
+    while pendientes:
+        mios, suyos = pendientes.pop()
+        if (mios, suyos) in vistas:
+            continue
+        vistas.add((mios, suyos))
+        for posicion in range(9):
+            if (mios | suyos) >> posicion & 1:
+                continue
+            nuevos = mios | 1 << posicion
+            if not tablero_mod.es_ganadora(nuevos) and (nuevos | suyos) != tablero_mod.TABLERO_LLENO:
+                pendientes.append((suyos, nuevos))
+    return vistas
+
+
+class AzarFijo:
+    """Nunca juega al azar y entre empates elige la primera jugada"""
+
+    def random(self):
+        return 1.0
+
+    def choice(self, opciones):
+        return opciones[0]
+
+
+def test_simetrias_comparten_clave():
+    aleatorio = random.Random(3)
+    for _ in range(200):
+        casillas = aleatorio.sample(range(9), aleatorio.randint(0, 8))
+        mios = sum(1 << p for p in casillas[::2])
+        suyos = sum(1 << p for p in casillas[1::2])
+        clave, _ = bot.canonica(mios, suyos)
+        for simetria in bot.SIMETRIAS:
+            permutar = lambda bits: sum(1 << simetria[p] for p in range(9) if bits >> p & 1)
+            assert bot.canonica(permutar(mios), permutar(suyos))[0] == clave
+
+
+def test_tabla_coincide_con_negamax_sin_simetrias():
+    tabla = bot.tabla()
+    todas = posiciones()
+    # Las posiciones equivalentes comparten entrada
+    assert len(tabla) == len({bot.canonica(m, s)[0] for m, s in todas}) < len(todas)
+    for mios, suyos in todas:
+        assert dict(tabla.puntuar(mios, suyos)) == negamax(mios, suyos)
+    assert max(negamax(0, 0).values()) == 0
+
+
+def test_bot_dificil_nunca_pierde():
+    def rival_prueba_todo(tablero, turno, simbolo_bot):
+        rival = "O" if simbolo_bot == "X" else "X"
+        if turno == simbolo_bot:
+            posicion = bot.elegir_jugada(tablero, simbolo_bot, "dificil", AzarFijo())
+            siguiente = tablero.copia()
+            siguiente.colocar(posicion, simbolo_bot)
+            if siguiente.gana_con(posicion, simbolo_bot) or siguiente.lleno():
+                return
+            rival_prueba_todo(siguiente, rival, simbolo_bot)
+            return
+        for posicion in tablero.libres():
+            siguiente = tablero.copia()
+            siguiente.colocar(posicion, rival)
+            assert not siguiente.gana_con(posicion, rival)
+            if not siguiente.lleno():
+                rival_prueba_todo(siguiente, simbolo_bot, simbolo_bot)
+
+    rival_prueba_todo(Tablero(), "X", "X")
+    rival_prueba_todo(Tablero(), "X", "O")
+
+
+def test_gana_antes_que_bloquear():
+    tablero = Tablero()
+    for posicion, simbolo in ((0, "X"), (3, "O"), (1, "X"), (4, "O")):
+        tablero.colocar(posicion, simbolo)
+    # X completa línea en 2 y O en 5: quien mueva gana en lugar de bloquear
+    assert bot.elegir_jugada(tablero, "X", "dificil", AzarFijo()) == 2
+    assert bot.elegir_jugada(tablero, "O", "dificil", AzarFijo()) == 5
+
+
+def test_sin_casillas_libres():
+    tablero = Tablero()
+    for posicion, simbolo in enumerate("XOXXOOOXX"):
+        tablero.colocar(posicion, simbolo)
+    assert bot.elegir_jugada(tablero, "O") is None
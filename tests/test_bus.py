@@ -0,0 +1,68 @@
+import asyncio
+import importlib
+
+bus_mod = importlib.import_module("games.3-in-row.bus")
+BusUnix = bus_mod.BusUnix
+
+
+def test_salida_acotada_sin_conexion():
+    bus = BusUnix("/no/existe.sock", salida_maxima=3)
+    bus.suscribir("sala")
+    for i in range(5):
+        bus.publicar("sala", f"mensaje {i}")
+    metricas = bus.metricas()
+    # Sin conexión la suscripción no se encola (se declara al conectar)
+    assert metricas["tramas_pendientes"] == 3
+    assert metricas["tramas_descartadas"] == 2
+    assert b"mensaje 4" in bus._salida[-1]
+
+
+def test_reconexion_fallida_se_reintenta(tmp_path, monkeypatch):
+    monkeypatch.setattr(bus_mod, "ESPERA_RECONEXION", 0.001)
+
+    async def probar():
+        recibidos = []
+        bus = BusUnix(str(tmp_path / "bus.sock"))
+        otro = BusUnix(str(tmp_path / "bus.sock"))
+        otro.al_recibir = lambda tema, texto: recibidos.append(texto)
+        await bus.iniciar()
+        await otro.iniciar()
+        otro.suscribir("sala")
+        # Que el broker haya aceptado las dos conexiones
+        while len(bus._broker._temas) < 2:
+            await asyncio.sleep(0.01)
+
+        conectar = otro._conectar
+        fallos = []
+
+        async def conectar_con_fallos():
+            if len(fallos) < 2:
+                fallos.append(1)
+                raise OSError("broker caído")
+            await conectar()
+
+        monkeypatch.setattr(otro, "_conectar", conectar_con_fallos)
+        # El broker corta la conexión del otro worker
+        for writer in list(bus._broker._temas):
+            writer.close()
+
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if otro._conectado and otro.reconexiones_fallidas == 2:
+                break
+        assert otro.reconexiones == 1
+        assert otro.reconexiones_fallidas == 2
+        assert not otro._tareas[1].done()
+
+        # Las suscripciones se han vuelto a declarar
+        for _ in range(100):
+            bus.publicar("sala", "hola")
+            await asyncio.sleep(0.01)
+            if recibidos:
+                break
+        assert recibidos and recibidos[0] == "hola"
+
+        await otro.detener()
+        await bus.detener()
+
+    asyncio.run(probar())
@@ -0,0 +1,113 @@
+import importlib
+import time
+
+diario_mod = importlib.import_module("games.3-in-row.diario")
+sala_mod = importlib.import_module("games.3-in-row.sala")
+
+
+def entrada(sala_id, vence):
+    return {"sala": sala_mod.Sala(sala_id, "clave", "ana").a_registro(), "vence": vence, "publica": True}
+
+
+def abrir(tmp_path, **opciones):
+    diario = diario_mod.Diario(str(tmp_path), sincronizar=False, **opciones)
+    recuperadas = {e["sala"]["id"]: e["vence"] for e in diario.recuperar()}
+    diario.iniciar()
+    return diario, recuperadas
+
+
+def caer(diario):
+    """Parar el hilo tras escribir lo pendiente pero sin instantánea, como si el proceso muriera"""
+    diario._compactar = lambda: None
+    diario.cerrar()
+
+
+def test_recupera_ultima_imagen_y_bajas(tmp_path):
+    diario, recuperadas = abrir(tmp_path)
+    assert recuperadas == {}
+    diario.anotar("a", entrada("a", 1.0))
+    diario.anotar("b", entrada("b", 1.0))
+    diario.anotar("a", entrada("a", 2.0))
+    diario.anotar_baja("b")
+    caer(diario)
+
+    diario, recuperadas = abrir(tmp_path)
+    assert recuperadas == {"a": 2.0}
+    assert diario.seq == 4
+    caer(diario)
+
+
+def test_linea_a_medio_escribir_se_corta(tmp_path):
+    diario, _ = abrir(tmp_path)
+    diario.anotar("a", entrada("a", 1.0))
+    caer(diario)
+    tamano = diario.ruta_diario.stat().st_size
+    with open(diario.ruta_diario, "ab") as fichero:
+        fichero.write(b'{"seq":2,"id":"b","entrada":{"sala"')
+
+    diario, recuperadas = abrir(tmp_path)
+    assert recuperadas == {"a": 1.0}
+    assert diario.ruta_diario.stat().st_size == tamano
+    # Lo anotado tras recuperar no queda detrás de la línea rota
+    diario.anotar("b", entrada("b", 3.0))
+    caer(diario)
+
+    diario, recuperadas = abrir(tmp_path)
+    assert recuperadas == {"a": 1.0, "b": 3.0}
+    caer(diario)
+
+
+def test_instantanea_mas_diario_posterior(tmp_path):
+    diario, _ = abrir(tmp_path)
+    diario.anotar("a", entrada("a", 1.0))
+    diario.anotar("b", entrada("b", 1.0))
+    diario.cerrar()
+    assert diario.total_instantaneas == 1
+    assert diario.ruta_diario.stat().st_size == 0
+
+    diario, recuperadas = abrir(tmp_path)
+    assert recuperadas == {"a": 1.0, "b": 1.0}
+    diario.anotar_baja("a")
+    diario.anotar("c", entrada("c", 2.0))
+    caer(diario)
+
+    diario, recuperadas = abrir(tmp_path)
+    assert recuperadas == {"b": 1.0, "c": 2.0}
+    assert diario.seq == 4
+    caer(diario)
+
+
+def test_anotaciones_ya_incluidas_en_la_instantanea_se_ignoran(tmp_path):
+    diario, _ = abrir(tmp_path)
+    diario.anotar("a", entrada("a", 1.0))
+    diario.anotar("b", entrada("b", 1.0))
+    caer(diario)
+    anterior = diario.ruta_diario.read_bytes()
+
+    diario, _ = abrir(tmp_path)
+    diario.anotar("a", entrada("a", 2.0))
+    diario.anotar_baja("b")
+    diario.cerrar()
+    # Caída entre escribir la instantánea y vaciar el diario: siguen las líneas viejas
+    diario.ruta_diario.write_bytes(anterior)
+
+    diario, recuperadas = abrir(tmp_path)
+    assert recuperadas == {"a": 2.0}
+    assert diario.seq == 4
+    caer(diario)
+
+
+def test_compacta_cada_n_anotaciones(tmp_path):
+    diario, _ = abrir(tmp_path, compactar_cada=10, lote_maximo=1)
+    for i in range(25):
+        diario.anotar(f"s{i % 3}", entrada(f"s{i % 3}", float(i)))
+    limite = time.monotonic() + 5
+    while diario.total_anotaciones < 25 and time.monotonic() < limite:
+        time.sleep(0.01)
+    caer(diario)
+    assert diario.total_instantaneas == 2
+
+    diario, recuperadas = abrir(tmp_path)
+    assert recuperadas == {"s0": 24.0, "s1": 22.0, "s2": 23.0}
+    assert diario.seq == 25
+    caer(diario)
@@ -0,0 +1,105 @@
+import asyncio
+import importlib
+
+emparejamiento_mod = importlib.import_module("games.3-in-row.emparejamiento")
+ColaEmparejamiento = emparejamiento_mod.ColaEmparejamiento
+
+
+class ConexionFalsa:
+    def __init__(self, jugador=None):
+        self.jugador = jugador
+        self.cerrada = False
+        self.token = None
+        self.recibidos = []
+
+    def enviar(self, mensaje, fusion=None):
+        self.recibidos.append(mensaje)
+
+    def encolar(self, texto, fusion=None):
+        self.recibidos.append(texto)
+
+
+def test_unirse_a_una_sala_cancela_la_busqueda():
+    juego = importlib.import_module("games.3-in-row")
+
+    async def probar():
+        sala_id = juego.sala_manager.crear_sala("clave", "gema")
+        conexion = ConexionFalsa("hugo")
+        assert juego.emparejamiento.buscar("hugo", conexion, "3-en-raya") is None
+
+        await juego.comando_unir(conexion, sala_id, "clave", "hugo")
+        assert not juego.emparejamiento.esperando("hugo")
+
+    asyncio.run(probar())
+
+
+def test_crear_una_sala_cancela_la_busqueda():
+    from test_sesiones import SocketFalso
+    juego = importlib.import_module("games.3-in-row")
+
+    async def probar():
+        socket = SocketFalso()
+        tarea = asyncio.create_task(juego.websocket_endpoint(socket, "temp", "ines"))
+        socket.escribir({"tipo": "buscar_partida"})
+        await socket.leer("buscando")
+        socket.escribir({"tipo": "crear_sala", "clave": "k"})
+        await socket.leer("sala_creada")
+        assert not juego.emparejamiento.esperando("ines")
+        socket.desconectar()
+        await tarea
+
+    asyncio.run(probar())
+
+
+def test_empareja_en_el_mismo_tramo():
+    cola = ColaEmparejamiento(ancho_tramo=200)
+    assert cola.buscar("ana", ConexionFalsa(), "3-en-raya", 1010) is None
+    assert cola.buscar("bea", ConexionFalsa(), "3-en-raya", 1190).jugador == "ana"
+    assert cola.buscar("carla", ConexionFalsa(), "3-en-raya", 1100) is None
+    assert cola.buscar("dani", ConexionFalsa(), "3-en-raya", 1000).jugador == "carla"
+    assert len(cola) == 0 and cola.total_emparejados == 2
+
+
+def test_tramos_vecinos_si_y_lejanos_no():
+    cola = ColaEmparejamiento(ancho_tramo=200)
+    cola.buscar("ana", ConexionFalsa(), "3-en-raya", 1000)
+    cola.buscar("bea", ConexionFalsa(), "3-en-raya", 1400)
+    # 1250 está en el tramo 6, vecino del 5 (ana) y del 7 (bea): primero se mira el inferior
+    assert cola.buscar("carla", ConexionFalsa(), "3-en-raya", 1250).jugador == "ana"
+    assert cola.buscar("dani", ConexionFalsa(), "3-en-raya", 2000) is None
+    assert cola.buscar("eva", ConexionFalsa(), "3-en-raya", 2199).jugador == "dani"
+    # bea (tramo 7) sigue en cola: carla encontró antes a ana y dani y eva están a más de un tramo
+    assert cola.esperando("bea")
+
+
+def test_colas_separadas_por_variante_y_sin_puntuacion():
+    cola = ColaEmparejamiento()
+    cola.buscar("ana", ConexionFalsa(), "3-en-raya", 1000)
+    assert cola.buscar("bea", ConexionFalsa(), "conecta-4", 1000) is None
+    assert cola.buscar("carla", ConexionFalsa(), "3-en-raya") is None
+    assert cola.buscar("dani", ConexionFalsa(), "3-en-raya").jugador == "carla"
+    assert cola.metricas()["colas"] == {"3-en-raya:5": 1, "conecta-4:5": 1}
+
+
+def test_descarta_esperas_con_la_conexion_cerrada():
+    cola = ColaEmparejamiento()
+    cerrada = ConexionFalsa()
+    cola.buscar("ana", cerrada, "3-en-raya", 1000)
+    cerrada.cerrada = True
+    assert cola.buscar("bea", ConexionFalsa(), "3-en-raya", 1000) is None
+    assert cola.buscar("carla", ConexionFalsa(), "3-en-raya", 1000).jugador == "bea"
+    assert len(cola) == 0
+
+
+def test_volver_a_buscar_sustituye_y_cancelar_respeta_la_conexion():
+    cola = ColaEmparejamiento()
+    primera, segunda = ConexionFalsa(), ConexionFalsa()
+    cola.buscar("ana", primera, "3-en-raya", 1000)
+    cola.buscar("ana", segunda, "3-en-raya", 2000)
+    assert len(cola) == 1
+    assert cola.metricas()["colas"] == {"3-en-raya:10": 1}
+
+    assert not cola.cancelar("ana", primera)
+    assert cola.cancelar("ana", segunda)
+    assert not cola.cancelar("ana")
+    assert cola.metricas()["colas"] == {}
@@ -0,0 +1,85 @@
+import asyncio
+import importlib
+
+espectadores_mod = importlib.import_module("games.3-in-row.espectadores")
+DifusorEspectadores = espectadores_mod.DifusorEspectadores
+
+
+class ConexionFalsa:
+    def __init__(self, cerrada=False):
+        self.cerrada = cerrada
+        self.recibidos = []
+
+    def encolar(self, texto, fusion=None):
+        self.recibidos.append(texto)
+        return True
+
+
+def test_sala_marcada_mientras_se_cede_el_bucle_se_envia():
+    async def probar():
+        difusor = DifusorEspectadores(lambda sala_id: f"trama {sala_id}", ventana=0.01, lote=1)
+        otra = ConexionFalsa()
+        difusor.suscribir("otra", otra)
+
+        class ConexionQueMarca(ConexionFalsa):
+            def encolar(self, texto, fusion=None):
+                # Otra sala cambia mientras la tarea reparte esta
+                difusor.marcar("otra")
+                return super().encolar(texto, fusion)
+
+        grande = [ConexionQueMarca() for _ in range(3)]
+        for conexion in grande:
+            difusor.suscribir("grande", conexion)
+
+        difusor.marcar("grande")
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+            if otra.recibidos:
+                break
+
+        assert otra.recibidos == ["trama otra"]
+        assert all(conexion.recibidos == ["trama grande"] for conexion in grande)
+        difusor.detener()
+
+    asyncio.run(probar())
+
+
+def test_conexiones_cerradas_y_salas_cerradas_siguen_suscritas():
+    async def probar():
+        difusor = DifusorEspectadores(lambda sala_id: None, ventana=0.01)
+        abierta, cerrada = ConexionFalsa(), ConexionFalsa(cerrada=True)
+        difusor.suscribir("sala", abierta)
+        difusor.suscribir("sala", cerrada)
+
+        difusor.marcar("sala")
+        await asyncio.sleep(0.03)
+
+        assert cerrada.recibidos == []
+        assert len(abierta.recibidos) == 1 and "sala_cerrada" in abierta.recibidos[0]
+        # Solo el endpoint de cada espectador lo quita (y descuenta su suscripción)
+        assert difusor.desuscribir("sala", cerrada)
+        assert difusor.desuscribir("sala", abierta)
+        assert len(difusor) == 0
+
+    asyncio.run(probar())
+
+
+def test_espectador_cerrado_se_descuenta_al_salir():
+    juego = importlib.import_module("games.3-in-row")
+
+    async def probar():
+        sala_id = juego.sala_manager.crear_sala("clave", "ana")
+        conexion = ConexionFalsa()
+        assert juego.comando_espectar(conexion, sala_id, "clave")
+        assert juego.sala_manager.obtener_info_sala(sala_id).espectadores == 1
+
+        # El envío se atasca y la conexión se cierra antes de la siguiente trama
+        conexion.cerrada = True
+        juego.espectadores.marcar(sala_id)
+        await juego.espectadores._tarea
+
+        juego.comando_dejar_de_espectar(conexion, sala_id)
+        assert juego.sala_manager.obtener_info_sala(sala_id).espectadores == 0
+        juego.espectadores.detener()
+
+    asyncio.run(probar())
@@ -0,0 +1,42 @@
+import asyncio
+import importlib
+import time
+
+juego = importlib.import_module("games.3-in-row")
+
+
+class ConexionFalsa:
+    def __init__(self):
+        self.codigo = None
+
+    def cerrar(self, codigo=1000):
+        self.codigo = codigo
+
+
+def test_el_worker_que_expira_avisa_a_los_demas(monkeypatch):
+    publicados = []
+    monkeypatch.setattr(juego.bus, "publicar", lambda tema, texto: publicados.append((tema, texto)))
+    sala_id = juego.sala_manager.crear_sala("clave", "jaime")
+
+    async def probar():
+        await juego.limpiar_salas(time.time() + 365 * 24 * 3600)
+
+    asyncio.run(probar())
+    avisos = [juego.codec.loads(texto) for tema, texto in publicados if tema == juego.TEMA_EXPIRADAS]
+    assert {"id": sala_id, "jugadores": ["jaime"]} in avisos
+
+
+def test_otro_worker_libera_a_sus_jugadores_de_la_sala_expirada():
+    # Lo que tiene otro worker: la sala ya borrada de la base, pero su jugador local aún asignado
+    conexion, otra = ConexionFalsa(), ConexionFalsa()
+    juego.conexiones["kike"] = conexion
+    juego.asignar_sala("kike", "sala-vieja")
+    juego.conexiones["lola"] = otra
+    juego.asignar_sala("lola", "sala-nueva")
+
+    juego.recibir_del_bus(juego.TEMA_EXPIRADAS, juego.codec.dumps({"id": "sala-vieja", "jugadores": ["kike", "lola"]}))
+
+    assert "kike" not in juego.jugador_sala and "kike" not in juego.conexiones
+    assert conexion.codigo == 1001
+    # Lola ya está en otra sala: no se toca
+    assert juego.jugador_sala["lola"] == "sala-nueva" and otra.codigo is None
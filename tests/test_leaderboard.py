@@ -0,0 +1,98 @@
+import asyncio
+import importlib
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+import leaderboard
+
+
+def test_importar_el_juego_no_abre_la_base(tmp_path):
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    entorno = {**os.environ, "PYTHONPATH": raiz}
+    entorno.pop("HUB_LEADERBOARD_DB", None)
+    subprocess.run([sys.executable, "-c", "import importlib; importlib.import_module('games.3-in-row')"],
+                   cwd=tmp_path, env=entorno, check=True, capture_output=True)
+    assert not os.listdir(tmp_path)
+
+
+def test_start_carga_y_suma_lo_jugado_antes(tmp_path):
+    ruta = str(tmp_path / "leaderboard.sqlite3")
+
+    async def probar():
+        anterior = leaderboard.LeaderboardService(ruta)
+        anterior.for_game("juego").record_result("ana", "bea", 1.0)
+        await anterior.flush()
+        anterior.close()
+
+        servicio = leaderboard.LeaderboardService(ruta)
+        board = servicio.for_game("juego")
+        assert not board.players
+        board.record_result("ana", "carla", 1.0)
+        await servicio.start()
+        assert board.players["ana"].games == 2
+        assert board.players["bea"].games == 1
+        servicio.close()
+
+    asyncio.run(probar())
+
+
+def test_volcado_fallido_deja_los_cambios_pendientes(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "leaderboard.sqlite3")
+
+    async def probar():
+        servicio = leaderboard.LeaderboardService(ruta)
+        await servicio.start()
+        board = servicio.for_game("juego")
+        board.record_result("ana", "bea", 1.0)
+
+        escribir = servicio._store.write
+
+        def fallar(cambios):
+            # Otra partida termina mientras el hilo escribe
+            board.record_result("ana", "bea", 0.5)
+            raise sqlite3.OperationalError("database is locked")
+
+        monkeypatch.setattr(servicio._store, "write", fallar)
+        with pytest.raises(sqlite3.OperationalError):
+            await servicio.flush()
+        assert board.pending["ana"][1] == 2
+        assert board.pending["bea"][3] == 1
+
+        monkeypatch.setattr(servicio._store, "write", escribir)
+        await servicio.flush()
+        assert not board.pending
+        servicio.close()
+
+        filas = dict(sqlite3.connect(ruta).execute("SELECT player, games FROM ratings").fetchall())
+        assert filas == {"ana": 2, "bea": 2}
+
+    asyncio.run(probar())
+
+
+def test_resultado_sin_bucle_queda_pendiente(tmp_path):
+    servicio = leaderboard.LeaderboardService(str(tmp_path / "leaderboard.sqlite3"))
+    board = servicio.for_game("juego")
+    # Desde código síncrono (sin bucle en marcha): no debe fallar
+    board.record_result("ana", "bea", 1.0)
+    assert board.players["ana"].games == 1
+    assert board.pending["ana"][1] == 1
+
+    asyncio.run(servicio.flush())
+    assert not board.pending
+    servicio.close()
+
+
+def test_solo_puntua_el_tres_en_raya_clasico():
+    juego = importlib.import_module("games.3-in-row")
+    antes = dict(juego.clasificacion.pending)
+    for variante in ("gomoku", "3-en-raya"):
+        sala = juego.sala_manager.crear_partida(f"{variante}-a", f"{variante}-b", variante)
+        sala.estado = "terminado"
+        sala.ganador = sala.jugador_a
+        juego.registrar_resultado(sala)
+    nuevos = set(juego.clasificacion.pending) - set(antes)
+    assert nuevos == {"3-en-raya-a", "3-en-raya-b"}
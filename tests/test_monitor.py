@@ -0,0 +1,56 @@
+import asyncio
+
+from monitor import HandlerProfiler
+
+
+def test_mediciones_solapadas_de_dos_manejadores():
+    profiler = HandlerProfiler(enabled=True)
+    vistas = {}
+
+    async def manejador(tipo, entra, sale):
+        with profiler.measure("juego", tipo):
+            await entra.wait()
+            # Lo que vería el vigilante mientras esta tarea ocupa el bucle
+            vistas[tipo] = profiler.active(asyncio.get_running_loop()).tipo
+            await sale.wait()
+
+    async def probar():
+        loop = asyncio.get_running_loop()
+        entra_a, sale_a, entra_b, sale_b = (asyncio.Event() for _ in range(4))
+        a = asyncio.create_task(manejador("A", entra_a, sale_a))
+        b = asyncio.create_task(manejador("B", entra_b, sale_b))
+        await asyncio.sleep(0)
+        assert profiler.snapshot()["in_flight"] == 2
+        # Ninguna de las dos tareas está ejecutándose: no hay manejador activo
+        assert profiler.active(loop) is None
+
+        # A empieza antes y termina antes que B: las mediciones no se anidan
+        entra_a.set()
+        entra_b.set()
+        await asyncio.sleep(0)
+        sale_a.set()
+        await a
+        assert profiler.snapshot()["in_flight"] == 1
+        sale_b.set()
+        await b
+
+        assert vistas == {"A": "A", "B": "B"}
+        assert profiler.active(loop) is None
+        assert profiler.snapshot()["in_flight"] == 0
+        assert sorted(entrada["tipo"] for entrada in profiler.snapshot()["slowest"]) == ["A", "B"]
+
+    asyncio.run(probar())
+
+
+def test_mediciones_anidadas_en_la_misma_tarea():
+    profiler = HandlerProfiler(enabled=True)
+
+    async def probar():
+        loop = asyncio.get_running_loop()
+        with profiler.measure("juego", "fuera"):
+            with profiler.measure("juego", "dentro"):
+                assert profiler.active(loop).tipo == "dentro"
+            assert profiler.active(loop).tipo == "fuera"
+        assert profiler.active(loop) is None
+
+    asyncio.run(probar())
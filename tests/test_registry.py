@@ -0,0 +1,47 @@
+import asyncio
+import sys
+import types
+
+from fastapi import FastAPI
+
+import registry
+
+
+def juego_que_falla_al_arrancar(nombre):
+    app = FastAPI()
+    arranques = []
+
+    @app.on_event("startup")
+    async def arrancar():
+        arranques.append(1)
+        raise RuntimeError("sin base de datos")
+
+    modulo = types.ModuleType(nombre)
+    modulo.app = app
+    sys.modules[nombre] = modulo
+    return registry.LazyGameApp(registry.GameManifest("roto", module=nombre)), arranques
+
+
+def test_arranque_fallido_se_guarda_y_no_se_reintenta():
+    juego, arranques = juego_que_falla_al_arrancar("juego_roto_test")
+
+    async def probar():
+        assert await juego.ensure_started() is None
+        assert await juego.ensure_started() is None
+
+    asyncio.run(probar())
+    assert arranques == [1]
+    assert not juego.loaded
+    assert juego.timing()["error"] == "sin base de datos"
+
+
+def test_warm_up_no_se_detiene_por_un_juego_roto():
+    roto, _ = juego_que_falla_al_arrancar("juego_roto_warm_test")
+
+    class Explota(registry.LazyGameApp):
+        async def ensure_started(self):
+            raise RuntimeError("inesperado")
+
+    otro = Explota(registry.GameManifest("otro", module="no_existe"))
+    asyncio.run(registry.warm_up({"roto": roto, "otro": otro}))
+    assert roto.error is not None
@@ -0,0 +1,28 @@
+import importlib
+
+sala_mod = importlib.import_module("games.3-in-row.sala")
+Sala = sala_mod.Sala
+
+
+def test_cargar_registro_anterior_a_las_sesiones():
+    sala = Sala("abcd1234", "clave", "ana")
+    sala.agregar_jugador("bea", "O")
+    sala.tablero.colocar(4, "X")
+    registro = sala.a_registro()
+    # Así guardaban las salas el diario y SQLite antes de los tokens y los espectadores
+    for campo in ("token_a", "token_b", "suspendido_a", "suspendido_b", "espectadores"):
+        del registro[campo]
+
+    cargada = Sala.desde_registro(registro)
+
+    assert cargada.jugadores == ["ana", "bea"]
+    assert cargada.tablero.a_lista() == sala.tablero.a_lista()
+    assert cargada.token_de("ana") is None and cargada.token_de("bea") is None
+    assert cargada.suspendidos == []
+    assert cargada.espectadores == 0
+
+
+def test_registro_actual_conserva_tokens():
+    sala = Sala("abcd1234", "clave", "ana")
+    cargada = Sala.desde_registro(sala.a_registro())
+    assert cargada.token_de("ana") == sala.token_de("ana")
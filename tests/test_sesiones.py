@@ -0,0 +1,164 @@
+import asyncio
+import importlib
+import json
+
+from fastapi import WebSocketDisconnect
+
+juego = importlib.import_module("games.3-in-row")
+
+
+class ConexionFalsa:
+    def __init__(self, jugador=None):
+        self.jugador = jugador
+        self.cerrada = False
+        self.token = None
+        self.recibidos = []
+
+    def enviar(self, mensaje, fusion=None):
+        self.recibidos.append(mensaje)
+        return True
+
+    def encolar(self, texto, fusion=None):
+        self.recibidos.append(json.loads(texto))
+        return True
+
+    def tipos(self):
+        return [mensaje["tipo"] for mensaje in self.recibidos]
+
+
+def partida_suspendida():
+    """Sala de ana (X, empieza) y bea con el puesto de ana suspendido"""
+    sala = juego.sala_manager.crear_partida("ana", "bea")
+    sala.turno = "X"
+    token = sala.token_de("ana")
+    juego.sala_manager.suspender_jugador(sala.id, "ana", 30, token)
+    return sala, token
+
+
+def test_conexion_nueva_no_juega_por_un_puesto_suspendido():
+    async def probar():
+        sala, _ = partida_suspendida()
+        intrusa = ConexionFalsa()
+        await juego.comando_movimiento(intrusa, sala.id, "ana", 0)
+
+        assert intrusa.tipos() == ["error"]
+        assert intrusa.recibidos[0]["mensaje"] == juego.MENSAJE_SIN_SESION
+        assert juego.sala_manager.obtener_info_sala(sala.id).tablero.a_lista()[0] == ""
+
+        # Un token equivocado tampoco devuelve el puesto
+        await juego.comando_reanudar(intrusa, sala.id, "ana", "otro", 0)
+        assert intrusa.tipos()[-1] == "reanudacion_fallida"
+        await juego.comando_movimiento(intrusa, sala.id, "ana", 0)
+        assert intrusa.tipos()[-1] == "error"
+
+    asyncio.run(probar())
+
+
+def test_conexion_reanudada_juega():
+    async def probar():
+        sala, token = partida_suspendida()
+        conexion = ConexionFalsa()
+        await juego.comando_reanudar(conexion, sala.id, "ana", token, 0)
+        assert "reanudado" in conexion.tipos()
+        assert conexion.token == token
+
+        await juego.comando_movimiento(conexion, sala.id, "ana", 0)
+        assert "error" not in conexion.tipos()
+        assert juego.sala_manager.obtener_info_sala(sala.id).tablero.a_lista()[0] == "X"
+
+    asyncio.run(probar())
+
+
+def test_otra_conexion_no_juega_aunque_el_puesto_este_activo():
+    async def probar():
+        sala = juego.sala_manager.crear_partida("carla", "dani")
+        sala.turno = "X"
+        intrusa = ConexionFalsa()
+        await juego.comando_movimiento(intrusa, sala.id, "carla", 0)
+        assert intrusa.tipos() == ["error"]
+
+    asyncio.run(probar())
+
+
+def test_error_al_terminar_la_gracia_se_registra(monkeypatch, caplog):
+    async def fallar(sala_id, jugador):
+        raise RuntimeError("almacén caído")
+
+    monkeypatch.setattr(juego, "GRACIA_RECONEXION", 0)
+    monkeypatch.setattr(juego, "comando_fin_gracia", fallar)
+    monkeypatch.setattr(juego.log, "propagate", True)
+    with caplog.at_level("ERROR"):
+        asyncio.run(juego.esperar_fin_gracia("sala", "ana"))
+    assert "Error al terminar la gracia" in caplog.text
+
+
+class SocketFalso:
+    """WebSocket para llamar al endpoint sin servidor: se le escribe con `escribir`"""
+
+    def __init__(self):
+        self.entrada = asyncio.Queue()
+        self.salida = asyncio.Queue()
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        texto = await self.entrada.get()
+        if texto is None:
+            raise WebSocketDisconnect(1000)
+        return texto
+
+    async def send_text(self, texto):
+        await self.salida.put(json.loads(texto))
+
+    async def close(self, code=1000):
+        pass
+
+    def escribir(self, mensaje):
+        self.entrada.put_nowait(json.dumps(mensaje))
+
+    def desconectar(self):
+        self.entrada.put_nowait(None)
+
+    async def leer(self, tipo):
+        while True:
+            mensaje = await asyncio.wait_for(self.salida.get(), 1)
+            if mensaje["tipo"] == tipo:
+                return mensaje
+
+
+def test_impostor_que_se_conecta_y_se_va_no_suspende_el_puesto(monkeypatch):
+    monkeypatch.setattr(juego, "GRACIA_RECONEXION", 30)
+
+    async def probar():
+        eva, fran, impostor = SocketFalso(), SocketFalso(), SocketFalso()
+        tareas = [asyncio.create_task(juego.websocket_endpoint(eva, "temp", "eva"))]
+        eva.escribir({"tipo": "crear_sala", "clave": "k"})
+        sala_id = (await eva.leer("sala_creada"))["sala_id"]
+        tareas.append(asyncio.create_task(juego.websocket_endpoint(fran, sala_id, "fran")))
+        fran.escribir({"tipo": "unir_sala", "clave": "k"})
+        await fran.leer("unido_exitoso")
+        registrada = juego.conexiones["eva"]
+
+        tareas.append(asyncio.create_task(juego.websocket_endpoint(impostor, sala_id, "eva")))
+        impostor.escribir({"tipo": "salir"})
+        assert (await impostor.leer("error"))["mensaje"] == juego.MENSAJE_SIN_SESION
+        assert juego.conexiones["eva"] is registrada
+        impostor.desconectar()
+        await tareas.pop()
+
+        sala = juego.sala_manager.obtener_info_sala(sala_id)
+        assert sala.jugadores == ["eva", "fran"]
+        assert sala.suspendidos == []
+        assert juego.conexiones["eva"] is registrada
+        assert juego.jugador_sala["eva"] == sala_id
+
+        # Eva sigue recibiendo las difusiones de su sala
+        fran.escribir({"tipo": "salir"})
+        await eva.leer("jugador_desconectado")
+
+        eva.desconectar()
+        fran.desconectar()
+        await asyncio.gather(*tareas)
+
+    asyncio.run(probar())
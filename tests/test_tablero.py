@@ -0,0 +1,59 @@
+import importlib
+import itertools
+
+tablero_mod = importlib.import_module("games.3-in-row.tablero")
+Tablero = tablero_mod.Tablero
+
+LINEAS = (
+    (0, 1, 2), (3, 4, 5), (6, 7, 8),
+    (0, 3, 6), (1, 4, 7), (2, 5, 8),
+    (0, 4, 8), (2, 4, 6),
+)
+
+
+def test_lineas_por_casilla():
+    for posicion, lineas in enumerate(tablero_mod.LINEAS_POR_CASILLA):
+        esperadas = {sum(1 << i for i in linea) for linea in LINEAS if posicion in linea}
+        assert set(lineas) == esperadas
+    # Esquinas 3, bordes 2 y el centro 4
+    assert [len(l) for l in tablero_mod.LINEAS_POR_CASILLA] == [3, 2, 3, 2, 4, 2, 3, 2, 3]
+
+
+def test_gana_con_coincide_con_recorrer_todas_las_lineas():
+    # Todas las formas de tener entre 0 y 5 fichas de X en el tablero
+    for cuantas in range(6):
+        for casillas in itertools.combinations(range(9), cuantas):
+            tablero = Tablero()
+            for posicion in casillas:
+                tablero.colocar(posicion, "X")
+            for posicion in casillas:
+                esperado = any(
+                    posicion in linea and all(i in casillas for i in linea) for linea in LINEAS
+                )
+                assert tablero.gana_con(posicion, "X") == esperado
+                assert not tablero.gana_con(posicion, "O")
+            assert tablero.es_ganador("X") == any(all(i in casillas for i in l) for l in LINEAS)
+
+
+def test_libres_resolver_y_a_lista():
+    tablero = Tablero()
+    for posicion, simbolo in ((4, "X"), (0, "O"), (8, "X")):
+        tablero.colocar(posicion, simbolo)
+
+    assert list(tablero.libres()) == [1, 2, 3, 5, 6, 7]
+    assert tablero.a_lista() == ["O", "", "", "", "X", "", "", "", "X"]
+    assert tablero.resolver(4) is None
+    assert tablero.resolver(9) is None
+    assert tablero.resolver("1") is None
+    assert tablero.resolver(1) == 1
+    assert not tablero.lleno()
+
+
+def test_copia_independiente_y_tablero_lleno():
+    tablero = Tablero()
+    copia = tablero.copia()
+    for posicion in range(9):
+        copia.colocar(posicion, "XO"[posicion % 2])
+
+    assert copia.lleno() and list(copia.libres()) == []
+    assert tablero.x == tablero.o == 0
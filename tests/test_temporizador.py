@@ -0,0 +1,71 @@
+import importlib
+
+temporizador = importlib.import_module("games.3-in-row.temporizador")
+
+
+def rueda(ranuras=8):
+    return temporizador.RuedaTemporizadores(resolucion=1.0, ranuras=ranuras, ahora=0.0)
+
+
+def test_vence_cada_clave_en_su_tick():
+    ruedita = rueda()
+    ruedita.programar("a", 2.5)
+    ruedita.programar("b", 4.0)
+
+    assert ruedita.avanzar(2.0) == []
+    assert ruedita.avanzar(3.0) == ["a"]
+    assert ruedita.avanzar(5.0) == ["b"]
+    assert len(ruedita) == 0
+
+
+def test_vencimientos_mas_alla_de_una_vuelta_esperan_a_la_suya():
+    ruedita = rueda(ranuras=8)
+    # Comparten ranura con el tick 3 pero vencen dos y tres vueltas después
+    ruedita.programar("cerca", 3.0)
+    ruedita.programar("lejos", 19.0)
+    ruedita.programar("muy_lejos", 27.0)
+
+    assert ruedita.avanzar(4.0) == ["cerca"]
+    assert ruedita.avanzar(12.0) == []
+    assert ruedita.avanzar(20.0) == ["lejos"]
+    assert "muy_lejos" in ruedita
+    assert ruedita.avanzar(28.0) == ["muy_lejos"]
+
+
+def test_ttl_por_encima_de_la_vuelta_por_defecto():
+    ruedita = temporizador.RuedaTemporizadores(ahora=0.0)
+    ruedita.programar("sala", 600.0)
+
+    for ahora in range(1, 601, 50):
+        assert ruedita.avanzar(float(ahora)) == []
+    assert ruedita.avanzar(601.0) == ["sala"]
+
+
+def test_retraso_de_varias_vueltas_vence_todo_una_sola_vez():
+    ruedita = rueda(ranuras=4)
+    for i in range(10):
+        ruedita.programar(i, float(i))
+
+    assert sorted(ruedita.avanzar(100.0)) == list(range(10))
+    assert ruedita.avanzar(200.0) == []
+
+
+def test_reprogramar_y_cancelar():
+    ruedita = rueda()
+    ruedita.programar("a", 2.0)
+    ruedita.programar("a", 6.0)
+    ruedita.programar("b", 2.0)
+    ruedita.cancelar("b")
+    ruedita.cancelar("inexistente")
+
+    assert ruedita.avanzar(3.0) == []
+    assert len(ruedita) == 1
+    assert ruedita.avanzar(7.0) == ["a"]
+
+
+def test_vencimiento_pasado_cae_en_el_proximo_tick():
+    ruedita = rueda()
+    ruedita.avanzar(10.0)
+    ruedita.programar("tarde", 1.0)
+
+    assert ruedita.avanzar(11.0) == ["tarde"]